@@ -0,0 +1,106 @@
+import argparse
+import time
+
+import numpy as np
+
+from kg_core.threshold import bernsen_threshold, sliding_max, sliding_min
+
+
+def bernsen_reference(image, window_size=15, contrast_threshold=15):
+    # Исходная попиксельная реализация, оставлена для проверки совпадения результатов
+    half_size = window_size // 2
+    output = np.zeros(image.shape, dtype=np.uint8)
+
+    for i in range(half_size, image.shape[0] - half_size):
+        for j in range(half_size, image.shape[1] - half_size):
+            local_region = image[i - half_size:i + half_size + 1, j - half_size:j + half_size + 1]
+            max_val = int(np.max(local_region))
+            min_val = int(np.min(local_region))
+            contrast = max_val - min_val
+            mid_gray = (max_val + min_val) // 2
+
+            if contrast < contrast_threshold:
+                output[i, j] = 255 if mid_gray > 127 else 0
+            else:
+                output[i, j] = 255 if image[i, j] > mid_gray else 0
+    return output
+
+
+def check_sliding(rng):
+    # Окна длиннее оси дают пустой результат, а не ошибку broadcast
+    array = rng.integers(0, 256, (5, 7), dtype=np.uint8)
+    for axis in (0, 1):
+        length = array.shape[axis]
+        for size in range(1, length + 3):
+            for func, reduce in ((sliding_max, np.max), (sliding_min, np.min)):
+                windows = [reduce(np.take(array, range(start, start + size), axis=axis), axis=axis)
+                           for start in range(length - size + 1)]
+                expected = (np.stack(windows, axis=axis) if windows
+                            else np.moveaxis(np.empty((0, array.shape[1 - axis]), dtype=array.dtype), 0, axis))
+                if not np.array_equal(func(array, size, axis), expected):
+                    raise AssertionError(f"{func.__name__} differs for size={size} axis={axis}")
+
+
+def check_parity(rng):
+    shapes = [(1, 1), (7, 40), (15, 15), (16, 31), (64, 48), (97, 131)]
+    for shape in shapes:
+        image = rng.integers(0, 256, shape, dtype=np.uint8)
+        for window_size in (1, 2, 3, 14, 15, 21):
+            for contrast_threshold in (0, 15, 80, 256):
+                expected = bernsen_reference(image, window_size, contrast_threshold)
+                actual = bernsen_threshold(image, window_size, contrast_threshold)
+                if not np.array_equal(expected, actual):
+                    raise AssertionError(f"mismatch for shape={shape} window={window_size} "
+                                         f"contrast={contrast_threshold}")
+
+    # 16-битные сканы и float-изображения из .npy: значения выше 32767 и дробные уровни
+    images = [rng.integers(0, 60001, (40, 40), dtype=np.uint16),
+              rng.integers(-1000, 1000, (33, 29), dtype=np.int16),
+              rng.uniform(0, 255, (40, 40)), rng.uniform(-300, 300, (31, 37)).astype(np.float32)]
+    for image in images:
+        for window_size in (1, 3, 14, 15):
+            for contrast_threshold in (0, 15, 80, 20000):
+                expected = bernsen_reference(image, window_size, contrast_threshold)
+                actual = bernsen_threshold(image, window_size, contrast_threshold)
+                if not np.array_equal(expected, actual):
+                    raise AssertionError(f"mismatch for dtype={image.dtype} window={window_size} "
+                                         f"contrast={contrast_threshold}")
+    print("parity: ok")
+
+
+def measure(func, *args, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bernsen thresholding parity check and timing")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[512, 2048, 4000])
+    parser.add_argument("--windows", type=int, nargs="+", default=[3, 15, 31, 63])
+    parser.add_argument("--reference-size", type=int, default=256)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    check_sliding(rng)
+    check_parity(rng)
+
+    image = rng.integers(0, 256, (args.reference_size, args.reference_size), dtype=np.uint8)
+    reference = measure(bernsen_reference, image, repeat=1)
+    vectorized = measure(bernsen_threshold, image)
+    print(f"{args.reference_size}x{args.reference_size}: reference {reference:.3f}s, "
+          f"vectorized {vectorized:.4f}s ({reference / vectorized:.0f}x)")
+
+    for size in args.sizes:
+        image = rng.integers(0, 256, (size, size), dtype=np.uint8)
+        for window_size in args.windows:
+            elapsed = measure(bernsen_threshold, image, window_size)
+            print(f"{size}x{size} window={window_size:3d}: {elapsed:.4f}s "
+                  f"({image.size / elapsed / 1e6:.1f} Mpixel/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import argparse
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from kg_core import operations
+from kg_core.cache import ResultCache, content_hash
+
+
+def timed(func, *args, repeat=1, **kwargs):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        timings.append(time.perf_counter() - start)
+    return result, statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Filter result cache: hash cost, memory and disk hits, eviction")
+    parser.add_argument("--size", type=int, nargs=2, default=[2000, 3000], metavar=("HEIGHT", "WIDTH"))
+    parser.add_argument("--operation", default="bernsen", choices=list(operations.OPERATIONS))
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    height, width = args.size
+    image = rng.integers(0, 256, (height, width), dtype=np.uint8)
+
+    _, hashing = timed(content_hash, image, repeat=5)
+    print(f"content hash {height}x{width}: {hashing * 1000:.1f} ms ({image.nbytes / hashing / 1e9:.2f} GB/s)")
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ResultCache(directory=directory)
+        expected, compute = timed(operations.run, args.operation, image)
+        result, miss = timed(cache.run, args.operation, image)
+        if not np.array_equal(result, expected):
+            raise AssertionError("cached result differs from a direct run")
+        _, hit = timed(cache.run, args.operation, image, repeat=20)
+        defaults = operations.normalize_params(args.operation)
+        if cache.key(args.operation, image, **defaults) != cache.key(args.operation, image):
+            raise AssertionError("explicit default parameters give a different key")
+
+        # Массив только для чтения снова сделали записываемым и поменяли: кэш не должен вернуть старое
+        edited = image.copy()
+        edited.setflags(write=False)
+        cache.run(args.operation, edited)
+        edited.setflags(write=True)
+        edited[:height // 2] = 255 - edited[:height // 2]
+        edited.setflags(write=False)
+        if not np.array_equal(cache.run(args.operation, edited), operations.run(args.operation, edited)):
+            raise AssertionError("stale result for an array changed in place")
+
+        # Новый процесс видит только дисковый уровень
+        cold = ResultCache(directory=directory)
+        result, disk_hit = timed(cold.run, args.operation, image)
+        if not np.array_equal(result, expected):
+            raise AssertionError("result read from disk differs from a direct run")
+        print("parity: ok")
+
+        print(f"{args.operation}: compute {compute * 1000:.1f} ms, miss {miss * 1000:.1f} ms (compute + store)")
+        print(f"  memory hit (content hashed):  {hit * 1e3:.2f} ms")
+        print(f"  disk hit in a fresh cache:    {disk_hit * 1000:.1f} ms")
+        print(f"  {cache.report()}")
+
+    # Бюджет на три результата при пяти разных входах по кругу: LRU вытесняет каждый раз
+    small = [rng.integers(0, 256, (256, 256), dtype=np.uint8) for _ in range(5)]
+    cache = ResultCache(budget=3 * small[0].nbytes)
+    for _ in range(3):
+        for item in small:
+            cache.run("points", item)
+    for item in small[-3:]:
+        cache.run("points", item)
+    print(f"eviction: {cache.report()}")
+
+
+if __name__ == "__main__":
+    main()
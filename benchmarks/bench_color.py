@@ -0,0 +1,112 @@
+import argparse
+import time
+
+import numpy as np
+
+from kg_core import color
+
+
+# Скалярные формулы в том виде, в каком их показывает ColorConverterApp
+def reference_rgb_to_cmyk_unit(r, g, b):
+    k = 1 - max(r, g, b)
+    if k < 1:
+        c = (1 - r - k) / (1 - k)
+        m = (1 - g - k) / (1 - k)
+        y = (1 - b - k) / (1 - k)
+    else:
+        c = m = y = 0
+    return tuple(int(f"{value * 100:.0f}") for value in (c, m, y, k))
+
+
+def reference_rgb_to_hsv_unit(r, g, b):
+    mx = max(r, g, b)
+    mn = min(r, g, b)
+    diff = mx - mn
+    if diff == 0:
+        h = 0
+    elif mx == r:
+        h = (60 * ((g - b) / diff) + 360) % 360
+    elif mx == g:
+        h = (60 * ((b - r) / diff) + 120) % 360
+    else:
+        h = (60 * ((r - g) / diff) + 240) % 360
+    s = 0 if mx == 0 else (diff / mx) * 100
+    return int(h), int(s), int(mx * 100)
+
+
+def reference_hsv_to_rgb_unit(h, s, v):
+    h = h % 360
+    s = s / 100.0
+    v = v / 100.0
+    if s == 0:
+        return v, v, v
+    i = int(h / 60) % 6
+    f = (h / 60) - i
+    p = v * (1 - s)
+    q = v * (1 - f * s)
+    t = v * (1 - (1 - f) * s)
+    return [(v, t, p), (q, v, p), (p, v, t), (p, q, v), (t, p, v), (v, p, q)][i]
+
+
+def reference_cmyk_to_rgb(c, m, y, k):
+    c, m, y, k = c / 100.0, m / 100.0, y / 100.0, k / 100.0
+    return int(255 * (1 - c) * (1 - k)), int(255 * (1 - m) * (1 - k)), int(255 * (1 - y) * (1 - k))
+
+
+def check(name, func, reference, inputs):
+    actual = func(inputs)
+    for values, result in zip(inputs, actual):
+        expected = reference(*(int(value) for value in values))
+        if tuple(int(value) for value in result) != tuple(expected):
+            raise AssertionError(f"{name}{tuple(values)}: expected {expected}, got {tuple(result)}")
+
+
+def check_parity(rng, samples):
+    rgb = rng.integers(0, 256, (samples, 3))
+    rgb[:256] = np.arange(256)[:, None]
+    cmyk = rng.integers(0, 101, (samples, 4))
+    hsv = np.column_stack([rng.integers(0, 361, samples), rng.integers(0, 101, (samples, 2))])
+
+    check("rgb_to_cmyk", color.rgb_to_cmyk,
+          lambda r, g, b: reference_rgb_to_cmyk_unit(r / 255.0, g / 255.0, b / 255.0), rgb)
+    check("rgb_to_hsv", color.rgb_to_hsv,
+          lambda r, g, b: reference_rgb_to_hsv_unit(r / 255.0, g / 255.0, b / 255.0), rgb)
+    check("cmyk_to_rgb", color.cmyk_to_rgb, reference_cmyk_to_rgb, cmyk)
+    check("cmyk_to_hsv", color.cmyk_to_hsv,
+          lambda c, m, y, k: reference_rgb_to_hsv_unit((1 - c / 100.0) * (1 - k / 100.0),
+                                                       (1 - m / 100.0) * (1 - k / 100.0),
+                                                       (1 - y / 100.0) * (1 - k / 100.0)), cmyk)
+    check("hsv_to_rgb", color.hsv_to_rgb,
+          lambda h, s, v: tuple(int(value * 255) for value in reference_hsv_to_rgb_unit(h, s, v)), hsv)
+    check("hsv_to_cmyk", color.hsv_to_cmyk,
+          lambda h, s, v: reference_rgb_to_cmyk_unit(*reference_hsv_to_rgb_unit(h, s, v)), hsv)
+    print(f"parity: ok ({samples} samples per conversion)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vectorized color conversion parity check and throughput")
+    parser.add_argument("--samples", type=int, default=20000)
+    parser.add_argument("--size", type=int, nargs=2, default=[3000, 4000], metavar=("HEIGHT", "WIDTH"))
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    check_parity(rng, args.samples)
+
+    height, width = args.size
+    images = {
+        "rgb": rng.integers(0, 256, (height, width, 3), dtype=np.uint8),
+        "cmyk": rng.integers(0, 101, (height, width, 4), dtype=np.uint8),
+        "hsv": np.dstack([rng.integers(0, 361, (height, width)),
+                          rng.integers(0, 101, (height, width, 2))]).astype(np.uint16),
+    }
+    conversions = [("rgb", color.rgb_to_cmyk), ("rgb", color.rgb_to_hsv), ("cmyk", color.cmyk_to_rgb),
+                   ("cmyk", color.cmyk_to_hsv), ("hsv", color.hsv_to_rgb), ("hsv", color.hsv_to_cmyk)]
+    for source, func in conversions:
+        start = time.perf_counter()
+        func(images[source])
+        elapsed = time.perf_counter() - start
+        print(f"{func.__name__:12s} {height}x{width}: {elapsed:.3f}s ({height * width / elapsed / 1e6:.1f} Mpixel/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from kg_core import color
+from kg_core.color_lut import ColorLUT
+
+
+def worker_gather(directory, seed):
+    # Воркер открывает те же файлы через mmap; таблицы не пересылаются между процессами
+    start = time.perf_counter()
+    lut = ColorLUT(directory, build=False)
+    opened = time.perf_counter() - start
+    rgb = np.random.default_rng(seed).integers(0, 256, (1000, 1000, 3), dtype=np.uint8)
+    lut.rgb_to_cmyk(rgb)
+    return opened
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RGB lookup table build/load cost and gather throughput")
+    parser.add_argument("--directory", default=None, help="table directory (a temporary one by default)")
+    parser.add_argument("--size", type=int, nargs=2, default=[3000, 4000], metavar=("HEIGHT", "WIDTH"))
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temporary:
+        directory = args.directory or temporary
+
+        lut = ColorLUT(directory)
+        print(f"build: {lut.build_seconds:.2f}s")
+        lut = ColorLUT(directory)
+        print(f"load (mmap): {lut.load_seconds * 1000:.2f} ms")
+
+        rng = np.random.default_rng(0)
+        sample = rng.integers(0, 256, (200000, 3), dtype=np.uint8)
+        if not (np.array_equal(lut.rgb_to_cmyk(sample), color.rgb_to_cmyk(sample))
+                and np.array_equal(lut.rgb_to_hsv(sample), color.rgb_to_hsv(sample))):
+            raise AssertionError("lookup tables disagree with kg_core.color")
+        # Одиночный пиксель и изображение - те же формы, что у kg_core.color
+        for pixel in ([10, 20, 30], sample[:7].reshape(7, 1, 3)):
+            for lookup, convert in [(lut.rgb_to_cmyk, color.rgb_to_cmyk), (lut.rgb_to_hsv, color.rgb_to_hsv)]:
+                expected = convert(pixel)
+                actual = lookup(pixel)
+                if actual.shape != np.shape(expected) or not np.array_equal(actual, expected):
+                    raise AssertionError(f"lookup of {np.shape(pixel)} input differs from kg_core.color")
+        print("parity: ok")
+
+        height, width = args.size
+        image = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+        for name, vectorized, gathered in [("rgb_to_cmyk", color.rgb_to_cmyk, lut.rgb_to_cmyk),
+                                           ("rgb_to_hsv", color.rgb_to_hsv, lut.rgb_to_hsv)]:
+            timings = []
+            for func in (vectorized, gathered):
+                start = time.perf_counter()
+                func(image)
+                timings.append(time.perf_counter() - start)
+            print(f"{name} {height}x{width}: vectorized {height * width / timings[0] / 1e6:.1f} Mpixel/s, "
+                  f"lut {height * width / timings[1] / 1e6:.1f} Mpixel/s")
+
+        with ProcessPoolExecutor(args.workers) as pool:
+            opened = list(pool.map(worker_gather, [directory] * args.workers, range(args.workers)))
+        print(f"{args.workers} workers: open tables in {max(opened) * 1000:.2f} ms (worst)")
+
+
+if __name__ == "__main__":
+    main()
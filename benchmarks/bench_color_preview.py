@@ -0,0 +1,62 @@
+import argparse
+import statistics
+import threading
+import time
+
+import numpy as np
+
+from kg_core.color_preview import MODES, PreviewEngine, decompose, render
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Live color preview: proxy latency, full refine and cancellation")
+    parser.add_argument("--size", type=int, nargs=2, default=[4000, 6000], metavar=("HEIGHT", "WIDTH"))
+    parser.add_argument("--ticks", type=int, default=30, help="slider values per mode")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    small = rng.integers(0, 256, (300, 400, 3), dtype=np.uint8)
+    engine = PreviewEngine(small, strip_rows=7)
+    for mode in MODES:
+        generation, _ = engine.request(mode=mode, hue_shift=40, saturation=1.3)
+        if not np.array_equal(engine.refine(generation, mode=mode, hue_shift=40, saturation=1.3),
+                              render(decompose(small), mode=mode, hue_shift=40, saturation=1.3)):
+            raise AssertionError(f"strip refine differs from a whole-image render in mode {mode!r}")
+    generation, _ = engine.request()
+    if np.abs(engine.refine(generation).astype(np.int16) - small).max() > 1:
+        raise AssertionError("identity adjustment changes the image by more than one level")
+    print("parity: ok")
+
+    height, width = args.size
+    image = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+    start = time.perf_counter()
+    engine = PreviewEngine(image)
+    print(f"{height}x{width}: open {(time.perf_counter() - start) * 1000:.1f} ms, proxy {engine.proxy.shape[:2]}")
+
+    for mode in MODES:
+        latencies = []
+        for hue in np.linspace(-180, 180, args.ticks):
+            start = time.perf_counter()
+            engine.request(mode=mode, hue_shift=hue)
+            latencies.append(time.perf_counter() - start)
+        print(f"proxy {mode:>10}: median {statistics.median(latencies) * 1000:.1f} ms, "
+              f"worst {max(latencies) * 1000:.1f} ms")
+
+    generation, _ = engine.request(hue_shift=30)
+    start = time.perf_counter()
+    engine.refine(generation, hue_shift=30)
+    print(f"full refine: {time.perf_counter() - start:.2f}s")
+
+    # Новый запрос посреди фонового расчёта: сколько ещё работает устаревший воркер
+    generation, _ = engine.request(hue_shift=60)
+    worker = threading.Thread(target=engine.refine, args=(generation,), kwargs={"hue_shift": 60})
+    worker.start()
+    time.sleep(0.2)
+    start = time.perf_counter()
+    engine.request(hue_shift=90)
+    worker.join()
+    print(f"stale refine stopped {(time.perf_counter() - start) * 1000:.1f} ms after a newer request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import argparse
+import time
+
+from kg_core import color
+from kg_core.color_state import ColorState, RateCounter
+
+
+def legacy_tick(rgb):
+    # Старый обработчик: две независимые конверсии и перезапись всех полей CMYK и HSV на каждый сигнал
+    cmyk = [int(value) for value in color.rgb_to_cmyk(rgb)]
+    hsv = [int(value) for value in color.rgb_to_hsv(rgb)]
+    return 2 * (len(rgb) + len(cmyk) + len(hsv))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Slider drag: per-signal updates vs one coalesced update per frame")
+    parser.add_argument("--signals-per-frame", type=int, default=20)
+    parser.add_argument("--sweeps", type=int, default=4)
+    args = parser.parse_args()
+
+    # Протяжка всех трёх ползунков RGB от 0 до 255 и обратно
+    drag = []
+    for _ in range(args.sweeps):
+        for channel in range(3):
+            for value in list(range(256)) + list(range(255, -1, -1)):
+                rgb = [128, 128, 128]
+                rgb[channel] = value
+                drag.append(rgb)
+
+    start = time.perf_counter()
+    legacy_writes = sum(legacy_tick(rgb) for rgb in drag)
+    legacy = time.perf_counter() - start
+
+    state = ColorState()
+    counter = RateCounter()
+    writes = 0
+    start = time.perf_counter()
+    for frame in range(0, len(drag), args.signals_per_frame):
+        # До таймера доходит только последнее значение пачки
+        rgb = drag[min(frame + args.signals_per_frame, len(drag)) - 1]
+        changes = state.set("rgb", rgb)
+        writes += 2 * sum(len(channels) for channels in changes.values())
+        counter.tick()
+    coalesced = time.perf_counter() - start
+
+    if state.values["cmyk"] != tuple(int(value) for value in color.rgb_to_cmyk(drag[-1])) \
+            or state.values["hsv"] != tuple(int(value) for value in color.rgb_to_hsv(drag[-1])):
+        raise AssertionError("ColorState disagrees with kg_core.color")
+    print("parity: ok")
+
+    print(f"{len(drag)} signals, {args.signals_per_frame} per frame")
+    print(f"per signal: {legacy * 1000:.1f} ms, {legacy_writes} widget writes")
+    print(f"coalesced:  {coalesced * 1000:.1f} ms, {writes} widget writes ({legacy / coalesced:.1f}x faster), "
+          f"{counter.rate():.0f} updates/s")
+
+
+if __name__ == "__main__":
+    main()
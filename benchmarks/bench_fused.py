@@ -0,0 +1,97 @@
+import argparse
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from kg_core import filters
+
+
+SEPARATE = {"points": filters.point_detection, "lines45": filters.line_detection_45,
+            "gradient": filters.gradient_detection}
+
+
+def separate(image, detections):
+    return {name: SEPARATE[name](image) for name in detections}
+
+
+def check_parity(rng):
+    for shape in [(1, 1), (1, 5), (2, 3), (5, 1), (37, 53), (300, 401)]:
+        image = rng.integers(0, 256, shape, dtype=np.uint8)
+        grad_x = cv2.Sobel(image, cv2.CV_64F, 1, 0, ksize=3)
+        grad_y = cv2.Sobel(image, cv2.CV_64F, 0, 1, ksize=3)
+        # Старый gradient_detection переполняет uint8 выше 255; сравнение идёт с насыщенным вариантом
+        expected = {"points": filters.point_detection(image), "lines45": filters.line_detection_45(image),
+                    "gradient": np.uint8(np.minimum(cv2.magnitude(grad_x, grad_y), 255))}
+        for strip_rows in (1, 7, 64):
+            fused = filters.fused_detection(image, strip_rows=strip_rows)
+            for name in filters.DETECTIONS:
+                if not np.array_equal(fused[name], expected[name]):
+                    raise AssertionError(f"fused {name} differs for shape={shape} strip_rows={strip_rows}")
+
+        absolute = filters.fused_detection(image, ("points",), mode="abs")["points"]
+        response = cv2.filter2D(image.astype(np.float32), -1, filters.POINT_KERNEL.astype(np.float32))
+        if not np.array_equal(absolute, np.minimum(np.abs(response), 255).astype(np.uint8)):
+            raise AssertionError(f"fused points in abs mode differ for shape={shape}")
+    print("parity: ok")
+
+
+def traffic(pixels, detections, strip_rows):
+    # Оценка обмена с памятью в байтах: полные плоскости, которые пишутся и потом читаются снова
+    separate_bytes = 0
+    if "points" in detections:
+        separate_bytes += 2 * pixels
+    if "lines45" in detections:
+        separate_bytes += 2 * pixels
+    if "gradient" in detections:
+        # Два Sobel в float64, модуль в float64, приведение к uint8
+        separate_bytes += 2 * (pixels + 8 * pixels) + (16 * pixels + 8 * pixels) + (8 * pixels + pixels)
+    # Совмещённый проход читает каждую полосу с двумя строками перекрытия и пишет только результаты
+    fused_bytes = pixels * (strip_rows + 2) / strip_rows + len(detections) * pixels
+    return separate_bytes, fused_bytes
+
+
+def peak_allocation(func, *args, **kwargs):
+    tracemalloc.start()
+    func(*args, **kwargs)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fused point/line/gradient pass vs three separate filters")
+    parser.add_argument("--size", type=int, nargs=2, default=[4000, 6000], metavar=("HEIGHT", "WIDTH"))
+    parser.add_argument("--strip-rows", type=int, default=filters.STRIP_ROWS)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    check_parity(rng)
+
+    height, width = args.size
+    image = rng.integers(0, 256, (height, width), dtype=np.uint8)
+    pixels = height * width
+    for detections in [filters.DETECTIONS, ("gradient",), ("points", "lines45")]:
+        timings = {"separate": [], "fused": []}
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            separate(image, detections)
+            timings["separate"].append(time.perf_counter() - start)
+            start = time.perf_counter()
+            filters.fused_detection(image, detections, strip_rows=args.strip_rows)
+            timings["fused"].append(time.perf_counter() - start)
+
+        separate_bytes, fused_bytes = traffic(pixels, detections, args.strip_rows)
+        separate_peak = peak_allocation(separate, image, detections)
+        fused_peak = peak_allocation(filters.fused_detection, image, detections, strip_rows=args.strip_rows)
+        print(f"{'+'.join(detections)} on {height}x{width}:")
+        print(f"  separate: {min(timings['separate']) * 1000:.0f} ms, ~{separate_bytes / 1e6:.0f} MB traffic, "
+              f"peak allocation {separate_peak / 1e6:.0f} MB")
+        print(f"  fused:    {min(timings['fused']) * 1000:.0f} ms, ~{fused_bytes / 1e6:.0f} MB traffic, "
+              f"peak allocation {fused_peak / 1e6:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
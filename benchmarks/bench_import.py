@@ -0,0 +1,33 @@
+import subprocess
+import sys
+
+GUI_MODULES = ("PyQt5", "tkinter", "matplotlib")
+
+SCRIPT = """
+import sys
+import time
+start = time.perf_counter()
+import kg_core
+elapsed = time.perf_counter() - start
+loaded = [name for name in {modules!r} if name in sys.modules]
+print(elapsed)
+print(",".join(loaded))
+"""
+
+
+def main():
+    # Каждый замер в отдельном процессе, чтобы импорт был действительно "холодным"
+    timings = []
+    for _ in range(5):
+        output = subprocess.run([sys.executable, "-c", SCRIPT.format(modules=GUI_MODULES)],
+                                check=True, capture_output=True, text=True).stdout.splitlines()
+        timings.append(float(output[0]))
+        if len(output) > 1 and output[1]:
+            raise AssertionError(f"importing kg_core loaded GUI modules: {output[1]}")
+
+    print(f"import kg_core: best {min(timings) * 1000:.1f} ms, worst {max(timings) * 1000:.1f} ms")
+    print("no GUI modules loaded")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import argparse
+import time
+
+import numpy as np
+
+from kg_core import operations
+from kg_core.incremental import changed_rectangles, recompute_regions
+
+OPERATIONS = tuple(operations.OPERATIONS)
+
+
+def edit(image, rng, rectangles):
+    edited = image.copy()
+    for y0, y1, x0, x1 in rectangles:
+        edited[y0:y1, x0:x1] = rng.integers(0, 256, (y1 - y0, x1 - x0), dtype=np.uint8)
+    return edited
+
+
+def random_rectangles(rng, shape, count, largest):
+    rectangles = []
+    for _ in range(count):
+        height, width = rng.integers(1, largest + 1, 2)
+        y0, x0 = rng.integers(0, shape[0]), rng.integers(0, shape[1])
+        rectangles.append((y0, min(y0 + height, shape[0]), x0, min(x0 + width, shape[1])))
+    return rectangles
+
+
+def check_parity(rng):
+    # Правки у краёв, пересекающиеся и соседние прямоугольники, чётные и нечётные окна
+    for shape in [(1, 1), (9, 300), (257, 131), (400, 513)]:
+        image = rng.integers(0, 256, shape, dtype=np.uint8)
+        for operation in OPERATIONS:
+            for params in ([{"window_size": 3}, {"window_size": 16}, {}] if operation in ("bernsen", "niblack")
+                           else [{}]):
+                previous = operations.run(operation, image, **params)
+                for count, largest in [(1, 1), (3, 20), (12, 40), (2, 400)]:
+                    rectangles = random_rectangles(rng, shape, count, largest)
+                    edited = edit(image, rng, rectangles)
+                    expected = operations.run(operation, edited, **params)
+                    for dirty in (rectangles, changed_rectangles(image, edited, 16)):
+                        actual = recompute_regions(operation, edited, previous, dirty, **params)
+                        if not np.array_equal(expected, actual):
+                            raise AssertionError(f"{operation} {params} {shape}: mismatch for {dirty}")
+
+
+def best_time(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental recompute of edited regions vs a full recompute")
+    parser.add_argument("--size", type=int, nargs=2, default=[4000, 6000], metavar=("HEIGHT", "WIDTH"))
+    parser.add_argument("--operations", nargs="+", default=list(OPERATIONS), choices=OPERATIONS)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    check_parity(rng)
+
+    height, width = args.size
+    image = rng.integers(0, 256, (height, width), dtype=np.uint8)
+    for operation in args.operations:
+        previous = operations.run(operation, image)
+        full = best_time(lambda: operations.run(operation, image), args.repeat)
+        print(f"{operation} {height}x{width}: full recompute {full * 1000:.0f} ms")
+        for side in (16, 64, 256, 1024):
+            # Правка не должна выходить за изображение: слишком большие для --size стороны пропускаются
+            if side > min(height - height // 2, width - width // 3):
+                continue
+            rectangles = [(height // 2, height // 2 + side, width // 3, width // 3 + side)]
+            edited = edit(image, rng, rectangles)
+            # Результат обновляется на месте: копия предыдущего (24 МБ) заслонила бы стоимость маленьких правок
+            output = previous.copy()
+            incremental = best_time(lambda: recompute_regions(operation, edited, output, rectangles, out=output),
+                                    args.repeat)
+            if not np.array_equal(output, operations.run(operation, edited)):
+                raise AssertionError(f"{operation}: {side}x{side} edit differs from a full recompute")
+            print(f"  {side:>4}x{side:<4} edit: {incremental * 1000:7.2f} ms ({full / incremental:.0f}x faster)")
+    print("parity: ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from kg_core import threshold
+from kg_core.integral import IntegralImage
+
+
+def reference_mean_std(image, window_size):
+    # Прямой подсчёт по каждому окну в float64: окно window_size x window_size с якорем window_size // 2,
+    # пиксели за краем берутся отражением BORDER_REFLECT_101, как у cv2.blur
+    def window(index, length):
+        start = index - window_size // 2
+        return [cv2.borderInterpolate(position, length, cv2.BORDER_REFLECT_101)
+                for position in range(start, start + window_size)]
+
+    values = image.astype(np.float64)
+    mean = np.empty(image.shape)
+    std = np.empty(image.shape)
+    for i in range(image.shape[0]):
+        rows = window(i, image.shape[0])
+        for j in range(image.shape[1]):
+            region = values[np.ix_(rows, window(j, image.shape[1]))]
+            mean[i, j] = region.mean()
+            std[i, j] = region.std()
+    return mean, std
+
+
+def check_statistics(rng):
+    # 16-битные и float-изображения из .npy тоже: точные int64-таблицы до 16 бит, float64 для остальных,
+    # окно 301 на 16-битном изображении уже не помещает n * sum(I^2) в int64
+    images = [rng.integers(0, 256, shape, dtype=np.uint8) for shape in [(1, 1), (9, 40), (33, 27)]]
+    images += [rng.integers(0, 65536, (21, 30), dtype=np.uint16), rng.integers(-32768, 32768, (17, 9), dtype=np.int16),
+               rng.uniform(-1e3, 1e3, (19, 23)), rng.uniform(0, 1, (12, 31)).astype(np.float32),
+               rng.integers(0, 1 << 32, (11, 13), dtype=np.uint32), rng.integers(0, 2, (10, 10)).astype(bool)]
+    for image in images:
+        integral = IntegralImage(image)
+        scale = max(1.0, float(np.abs(image.astype(np.float64)).max()))
+        for window_size in (1, 3, 4, 15, 50) + ((301,) if image.dtype == np.uint16 else ()):
+            expected_mean, expected_std = reference_mean_std(image, window_size)
+            mean, std = integral.mean_std(window_size)
+            if not (np.allclose(mean, expected_mean, rtol=0, atol=1e-9 * scale)
+                    and np.allclose(std, expected_std, rtol=0, atol=1e-6 * scale)):
+                raise AssertionError(f"statistics differ for {image.dtype} {image.shape} window={window_size}")
+            if not np.allclose(mean, cv2.blur(image.astype(np.float64), (window_size, window_size)), rtol=0,
+                               atol=1e-9 * scale):
+                raise AssertionError(f"mean differs from cv2.blur for {image.dtype} {image.shape} "
+                                     f"window={window_size}")
+        for name in ("niblack_threshold", "sauvola_threshold", "wolf_threshold"):
+            getattr(threshold, name)(image, 15)
+    print("statistics: ok")
+
+
+def measure(func, *args, **kwargs):
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Integral-image Niblack/Sauvola/Wolf thresholds")
+    parser.add_argument("--size", type=int, default=3000)
+    parser.add_argument("--windows", type=int, nargs="+", default=[3, 15, 51, 151])
+    parser.add_argument("--ks", type=float, nargs="+", default=[-0.4, -0.2, 0.0, 0.2])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    check_statistics(rng)
+
+    image = rng.integers(0, 256, (args.size, args.size), dtype=np.uint8)
+    # Таблицы строятся при первом запросе окна, с полями под это окно
+    elapsed = measure(lambda: IntegralImage(image).window_sums(max(args.windows)))
+    print(f"{args.size}x{args.size}: tables built in {elapsed:.3f}s")
+    for name in ("niblack_threshold", "sauvola_threshold", "wolf_threshold"):
+        func = getattr(threshold, name)
+        for window_size in args.windows:
+            elapsed = measure(func, image, window_size)
+            print(f"    {name} window={window_size:3d}: {elapsed:.3f}s ({image.size / elapsed / 1e6:.1f} Mpixel/s)")
+
+    # Перебор k и размеров окна: таблицы и статистики окна переиспользуются
+    fresh = 0.0
+    for window_size in args.windows:
+        for k in args.ks:
+            fresh += measure(threshold.niblack_threshold, image, window_size, k)
+    start = time.perf_counter()
+    integral = IntegralImage(image)
+    for window_size in args.windows:
+        for k in args.ks:
+            threshold.niblack_threshold(image, window_size, k, integral=integral)
+    shared = time.perf_counter() - start
+    print(f"niblack sweep ({len(args.windows) * len(args.ks)} combinations): "
+          f"fresh tables {fresh:.3f}s, shared tables {shared:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
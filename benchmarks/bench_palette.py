@@ -0,0 +1,69 @@
+import argparse
+import time
+
+import numpy as np
+
+from kg_core.palette import PaletteIndex, kmeans, median_cut, to_space
+
+
+def brute_force(points, palette_points, chunk_size=2048):
+    result = np.empty(len(points), dtype=np.int64)
+    for start in range(0, len(points), chunk_size):
+        chunk = points[start:start + chunk_size]
+        distances = ((palette_points[None, :, :] - chunk[:, None, :]) ** 2).sum(axis=-1)
+        result[start:start + chunk_size] = distances.argmin(axis=1)
+    return result
+
+
+def synthetic_photo(rng, height, width):
+    # Плавные градиенты с шумом: много уникальных цветов, но далеко не 2^24
+    y, x = np.mgrid[0:height, 0:width]
+    base = np.stack([x / width * 255, y / height * 255, (x + y) / (width + height) * 255], axis=-1)
+    return np.clip(base + rng.normal(0, 12, base.shape), 0, 255).astype(np.uint8)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nearest palette color: grid index vs brute force")
+    parser.add_argument("--size", type=int, nargs=2, default=[2000, 3000], metavar=("HEIGHT", "WIDTH"))
+    parser.add_argument("--palettes", type=int, nargs="+", default=[256, 4096])
+    parser.add_argument("--brute-sample", type=int, default=50000, help="pixels timed with brute force")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    height, width = args.size
+    image = synthetic_photo(rng, height, width)
+    sample = image.reshape(-1, 3)[rng.choice(height * width, args.brute_sample, replace=False)]
+    print(f"{height}x{width}, {len(np.unique(image.reshape(-1, 3), axis=0))} unique colors")
+
+    for colors in args.palettes:
+        start = time.perf_counter()
+        cut = median_cut(image, colors)
+        cut_time = time.perf_counter() - start
+        start = time.perf_counter()
+        palette = kmeans(image, colors, iterations=4)
+        print(f"{colors} colors: median cut {cut_time:.2f}s ({len(cut)} entries), "
+              f"k-means {time.perf_counter() - start:.2f}s")
+
+        for space in ("rgb", "hsv"):
+            start = time.perf_counter()
+            index = PaletteIndex(palette, space)
+            build = time.perf_counter() - start
+
+            expected = brute_force(to_space(sample, space), index.points)
+            if not np.array_equal(index.nearest(sample), expected):
+                raise AssertionError(f"index disagrees with brute force for {colors} colors in {space}")
+
+            start = time.perf_counter()
+            brute_force(to_space(sample, space), index.points)
+            brute = len(sample) / (time.perf_counter() - start)
+            start = time.perf_counter()
+            index.nearest(image)
+            indexed = height * width / (time.perf_counter() - start)
+            print(f"  {space}: build {build * 1000:.0f} ms, {index.candidates.shape[1]} candidates per cell, "
+                  f"brute force {brute / 1e6:.2f} Mpixel/s, index {indexed / 1e6:.2f} Mpixel/s "
+                  f"({indexed / brute:.0f}x)")
+    print("parity: ok")
+
+
+if __name__ == "__main__":
+    main()
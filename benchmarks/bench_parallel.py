@@ -0,0 +1,49 @@
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from kg_core import operations, parallel
+
+
+def measure(func, *args, repeat=3, **kwargs):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scaling curve of the parallel strip scheduler")
+    parser.add_argument("--size", type=int, default=4000)
+    parser.add_argument("--workers", type=int, nargs="+", default=None)
+    parser.add_argument("--backends", nargs="+", default=["thread", "process"])
+    parser.add_argument("--operations", nargs="+", default=list(operations.OPERATIONS))
+    args = parser.parse_args()
+
+    # Внутренний пул OpenCV отключён, чтобы мерить масштабирование самого планировщика
+    cv2.setNumThreads(1)
+    max_workers = parallel.default_workers()
+    worker_counts = args.workers or sorted({w for w in (1, 2, 4, 8, 16) if w <= max_workers} | {max_workers})
+
+    image = np.random.default_rng(0).integers(0, 256, (args.size, args.size), dtype=np.uint8)
+    print(f"{args.size}x{args.size}, {max_workers} cores")
+    for operation in args.operations:
+        expected = operations.run(operation, image)
+        serial = measure(operations.run, operation, image)
+        print(f"{operation}: serial {serial:.3f}s")
+        for backend in args.backends:
+            for workers in worker_counts:
+                if not np.array_equal(expected, parallel.apply_parallel(operation, image, workers=workers,
+                                                                         backend=backend)):
+                    raise AssertionError(f"{operation} differs with backend={backend} workers={workers}")
+                elapsed = measure(parallel.apply_parallel, operation, image, workers=workers, backend=backend)
+                print(f"    {backend:7s} workers={workers:2d}: {elapsed:.3f}s, speedup {serial / elapsed:.2f}x, "
+                      f"efficiency {serial / elapsed / workers:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import argparse
+import time
+
+import numpy as np
+
+from kg_core import raster
+
+
+def star_polygon(rng, vertices, center, radius):
+    angles = np.sort(rng.uniform(0, 2 * np.pi, vertices))
+    radii = radius * rng.uniform(0.3, 1.0, vertices)
+    return np.column_stack([center + radii * np.cos(angles), center + radii * np.sin(angles)]).round().astype(np.int64)
+
+
+def naive_mask(rings, shape, rule):
+    # Проверка каждого пикселя лучом вправо по всем рёбрам: O(пиксели * рёбра)
+    ys, xs = np.mgrid[0:shape[0], 0:shape[1]]
+    winding = np.zeros(shape, dtype=np.int64)
+    for ring in rings:
+        for (x0, y0), (x1, y1) in zip(ring.tolist(), np.roll(ring, -1, axis=0).tolist()):
+            if y0 == y1:
+                continue
+            direction = 1 if y1 > y0 else -1
+            (x_low, y_low), (x_high, y_high) = ((x0, y0), (x1, y1)) if y1 > y0 else ((x1, y1), (x0, y0))
+            crosses = (ys >= y_low) & (ys < y_high)
+            numerator = x_low * (y_high - y_low) + (ys - y_low) * (x_high - x_low)
+            winding += direction * (crosses & (numerator > xs * (y_high - y_low)))
+    return (winding % 2 == 1) if rule == "evenodd" else (winding != 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scanline polygon fill vs per-pixel point-in-polygon")
+    parser.add_argument("--vertices", type=int, default=10000)
+    parser.add_argument("--naive-size", type=int, default=200)
+    parser.add_argument("--size", type=int, default=4096)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    size = args.naive_size
+    rings = [star_polygon(rng, args.vertices, size / 2, size / 2 - 2),
+             star_polygon(rng, args.vertices // 10, size / 2, size / 6)]
+    for rule in ("evenodd", "nonzero"):
+        start = time.perf_counter()
+        expected = naive_mask(rings, (size, size), rule)
+        naive = time.perf_counter() - start
+        start = time.perf_counter()
+        actual = raster.polygon_mask(rings, (size, size), rule, outline=False)
+        scanline = time.perf_counter() - start
+        if not np.array_equal(expected, actual):
+            raise AssertionError(f"{rule}: {np.count_nonzero(expected != actual)} pixels differ from the naive test")
+        print(f"{rule} {size}x{size}, {sum(map(len, rings))} vertices: naive {naive:.2f}s, "
+              f"scanline {scanline * 1000:.1f} ms ({naive / scanline:.0f}x)")
+
+    size = args.size
+    rings = [star_polygon(rng, args.vertices, size / 2, size / 2 - 2),
+             star_polygon(rng, args.vertices // 10, size / 2, size / 6)]
+    start = time.perf_counter()
+    spans = raster.polygon_spans(rings)
+    elapsed = time.perf_counter() - start
+    print(f"evenodd {size}x{size}, {sum(map(len, rings))} vertices with outline: {len(spans)} spans "
+          f"in {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
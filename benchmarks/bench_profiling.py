@@ -0,0 +1,109 @@
+import argparse
+import json
+import os
+import pickle
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from kg_core import profiling, raster, threshold
+
+
+def per_call(func, args, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        func(*args)
+    return (time.perf_counter() - start) / calls
+
+
+def check_overlap():
+    # Этапы двух потоков, открытые одновременно, не должны приписывать себе чужие байты
+    recorder = profiling.enable(track_allocations=True)
+    inside = threading.Barrier(2)
+
+    def work(name, size):
+        with profiling.stage(name):
+            inside.wait()
+            buffer = np.ones(size, dtype=np.uint8)
+            inside.wait()
+            del buffer
+    workers = [threading.Thread(target=work, args=(f"thread{i}", (i + 1) << 20)) for i in range(2)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    with profiling.stage("alone"):
+        np.ones(1 << 20, dtype=np.uint8)
+    profiling.disable()
+
+    events = {name: args for name, _, _, _, args in recorder.events}
+    if any("temporary_bytes" in events[f"thread{i}"] or events[f"thread{i}"].get("allocations") != "overlapped"
+           for i in range(2)):
+        raise AssertionError(f"overlapping stages kept allocation figures: {events}")
+    if events["alone"].get("temporary_bytes", 0) < 1 << 20:
+        raise AssertionError(f"a stage without overlap lost its allocation figure: {events['alone']}")
+    print("overlapping stages: ok")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Instrumentation overhead when disabled and enabled")
+    parser.add_argument("--calls", type=int, default=200000)
+    args = parser.parse_args()
+
+    # Обёрнутые функции должны по-прежнему пересылаться в пул процессов
+    if pickle.loads(pickle.dumps(threshold.bernsen_threshold)) is not threshold.bernsen_threshold:
+        raise AssertionError("instrumented functions no longer pickle by reference")
+
+    # Короткий отрезок: почти всё время уходит на сам вызов, так что обёртка видна лучше всего
+    segment = (0, 0, 3, 1)
+    bare = per_call(raster.bresenham.__wrapped__, segment, args.calls)
+    disabled = per_call(raster.bresenham, segment, args.calls)
+    start = time.perf_counter()
+    for _ in range(args.calls):
+        with profiling.stage("noop"):
+            pass
+    disabled_stage = (time.perf_counter() - start) / args.calls
+
+    recorder = profiling.enable()
+    timed = per_call(raster.bresenham, segment, args.calls)
+    profiling.disable()
+    if len(recorder.events) != args.calls:
+        raise AssertionError(f"expected {args.calls} events, got {len(recorder.events)}")
+
+    profiling.enable(track_allocations=True)
+    calls = args.calls // 10
+    tracked = per_call(raster.bresenham, segment, calls)
+    recorder = profiling.disable()
+
+    print(f"bresenham{segment}: bare {bare * 1e9:.0f} ns, disabled wrapper +{(disabled - bare) * 1e9:.0f} ns, "
+          f"disabled stage() {disabled_stage * 1e9:.0f} ns")
+    print(f"enabled: +{(timed - bare) * 1e9:.0f} ns per call, "
+          f"with allocation tracking +{(tracked - bare) * 1e9:.0f} ns")
+
+    image = np.random.default_rng(0).integers(0, 256, (2000, 3000), dtype=np.uint8)
+    timings = []
+    for enabled in (False, True):
+        if enabled:
+            recorder = profiling.enable(track_allocations=True)
+        start = time.perf_counter()
+        threshold.niblack_threshold(image)
+        timings.append(time.perf_counter() - start)
+    profiling.disable()
+    print(f"niblack 2000x3000: {timings[0] * 1000:.1f} ms plain, {timings[1] * 1000:.1f} ms with allocation tracking")
+    print(recorder.summary())
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "trace.json")
+        recorder.write_chrome_trace(path)
+        with open(path) as file:
+            events = json.load(file)["traceEvents"]
+        if not events or events[0]["ph"] != "X" or "temporary_bytes" not in events[0]["args"]:
+            raise AssertionError("chrome trace is missing complete events with allocation data")
+    print("trace: ok")
+    check_overlap()
+
+
+if __name__ == "__main__":
+    main()
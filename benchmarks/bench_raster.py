@@ -0,0 +1,174 @@
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from kg_core import raster
+
+
+def random_segments(rng, count, extent, max_length):
+    start = rng.integers(-extent, extent, (count, 2))
+    return np.hstack([start, start + rng.integers(-max_length, max_length + 1, (count, 2))])
+
+
+def check_lines(rng):
+    special = [(0, 0, 0, 0), (0, 0, 5, 0), (0, 0, -5, 0), (0, 0, 0, 5), (0, 0, 0, -5), (0, 0, 4, 4),
+               (0, 0, -4, 4), (3, -2, -7, 9), (10, 10, 3, 4), (0, 0, 1, 100), (0, 0, 100, -1)]
+    segments = np.vstack([special, random_segments(rng, 5000, 100, 60)])
+    points, offsets = raster.bresenham_batch(segments)
+    for i, segment in enumerate(segments):
+        expected = raster.bresenham(*(int(value) for value in segment))
+        actual = [tuple(point) for point in points[offsets[i]:offsets[i + 1]].tolist()]
+        if actual != expected:
+            raise AssertionError(f"bresenham_batch differs for segment {tuple(segment)}")
+    print("lines: ok")
+
+
+def check_circles(rng):
+    for x_center, y_center, radius in [(0, 0, 0), (0, 0, 1), (5, -3, 7), (-20, 11, 50)] + \
+            [tuple(value) for value in rng.integers(-50, 50, (50, 3)) if value[2] >= 0]:
+        expected = set(raster.bresenham_circle(x_center, y_center, radius))
+        outline = raster.circle_outline(x_center, y_center, radius)
+        if set(map(tuple, outline.tolist())) != expected or len(outline) != len(expected):
+            raise AssertionError(f"circle_outline differs for {(x_center, y_center, radius)}")
+
+        spans = raster.circle_spans(x_center, y_center, radius)
+        for y, x_start, x_end in spans.tolist():
+            row = sorted(x for x, outline_y in expected if outline_y == y)
+            if (x_start, x_end) != (row[0], row[-1]):
+                raise AssertionError(f"circle_spans row {y} differs for {(x_center, y_center, radius)}")
+
+    for a, b in [(0, 0), (0, 5), (5, 0), (1, 1), (10, 3), (3, 10), (40, 25)]:
+        outline = raster.ellipse_outline(0, 0, a, b)
+        spans = raster.ellipse_spans(0, 0, a, b)
+        shape = (2 * b + 3, 2 * a + 3)
+        mask = raster.spans_to_mask(spans + [b + 1, a + 1, a + 1], shape)
+        if not mask[outline[:, 1] + b + 1, outline[:, 0] + a + 1].all():
+            raise AssertionError(f"ellipse fill does not cover its outline for a={a} b={b}")
+        if a and b:
+            error = (outline[:, 0] / a) ** 2 + (outline[:, 1] / b) ** 2
+            if np.abs(np.sqrt(error) - 1).max() > 1.5 / min(a, b):
+                raise AssertionError(f"ellipse outline strays from the curve for a={a} b={b}")
+
+    mask = np.zeros((64, 80), dtype=np.uint8)
+    centers = rng.integers(-10, 90, (40, 2))
+    expected = np.zeros_like(mask)
+    for x_center, y_center in centers.tolist():
+        raster.fill_spans(expected, raster.circle_spans(x_center, y_center, 6))
+    if not np.array_equal(raster.stamp_disks(mask, centers, 6), expected):
+        raise AssertionError("stamp_disks differs from per-disk fill_spans")
+    print("circles and ellipses: ok")
+
+
+def inside(points, clip):
+    return [(x, y) for x, y in points if clip[0] <= x <= clip[2] and clip[1] <= y <= clip[3]]
+
+
+def check_streaming(rng):
+    clips = [None, (0, 0, 20, 20), (-5, -30, 5, 30), (-100, 3, 100, 3), (50, 50, 60, 60)]
+    for segment in np.vstack([[(0, 0, 0, 0), (0, 0, 30, 7), (10, -4, -25, 9), (3, 3, 3, -40)],
+                              random_segments(rng, 2000, 40, 60)]).tolist():
+        expected = raster.bresenham(*segment)
+        for clip in clips:
+            actual = list(raster.iter_line(*segment, clip=clip))
+            if actual != (expected if clip is None else inside(expected, clip)):
+                raise AssertionError(f"iter_line differs for segment {tuple(segment)} clip={clip}")
+
+    for x_center, y_center, radius in [(0, 0, 0), (0, 0, 1), (3, -2, 17)] + \
+            [tuple(value) for value in rng.integers(-30, 30, (200, 3)).tolist() if value[2] >= 0]:
+        expected = raster.bresenham_circle(x_center, y_center, radius)
+        for clip in clips:
+            actual = list(raster.iter_circle(x_center, y_center, radius, clip=clip))
+            if actual != (expected if clip is None else inside(expected, clip)):
+                raise AssertionError(f"iter_circle differs for {(x_center, y_center, radius)} clip={clip}")
+    print("streaming: ok")
+
+
+def check_wu(rng):
+    segments = random_segments(rng, 500, 50, 40)
+    points, coverage, offsets = raster.wu_line_batch(segments)
+    for i, (x1, y1, x2, y2) in enumerate(segments.tolist()):
+        chunk = points[offsets[i]:offsets[i + 1]]
+        weights = coverage[offsets[i]:offsets[i + 1]]
+        # На каждом шаге по главной оси покрытие в сумме равно 1, концы закрашены полностью
+        along = chunk[:, 0] if abs(x2 - x1) > abs(y2 - y1) else chunk[:, 1]
+        steps = max(abs(x2 - x1), abs(y2 - y1)) + 1
+        totals = np.bincount(along - along.min(), weights=weights)
+        if len(totals) != steps or not np.allclose(totals, 1, atol=1e-6):
+            raise AssertionError(f"wu_line_batch coverage does not sum to 1 per step for {(x1, y1, x2, y2)}")
+        ends = {tuple(point) for point, weight in zip(chunk.tolist(), weights) if weight == 1}
+        if not {(x1, y1), (x2, y2)} <= ends:
+            raise AssertionError(f"wu_line_batch endpoints are not fully covered for {(x1, y1, x2, y2)}")
+
+    for radius in range(0, 40):
+        points, coverage, _ = raster.wu_circle_batch([(0, 0, radius)])
+        distance = np.hypot(points[:, 0], points[:, 1])
+        if len(points) != len(np.unique(points, axis=0)) or np.abs(distance - radius).max() >= 1.5:
+            raise AssertionError(f"wu_circle_batch is off for radius {radius}")
+    print("wu: ok")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rasterizer parity checks and throughput")
+    parser.add_argument("--segments", type=int, default=200000)
+    parser.add_argument("--max-length", type=int, default=64)
+    parser.add_argument("--disks", type=int, default=200000)
+    parser.add_argument("--disk-radius", type=int, default=8)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    check_lines(rng)
+    check_circles(rng)
+    check_streaming(rng)
+    check_wu(rng)
+
+    segments = random_segments(rng, args.segments, 2048, args.max_length)
+    start = time.perf_counter()
+    for segment in segments.tolist():
+        raster.bresenham(*segment)
+    loop = time.perf_counter() - start
+    start = time.perf_counter()
+    points, _ = raster.bresenham_batch(segments)
+    batch = time.perf_counter() - start
+    target = np.zeros((4096, 4096), dtype=np.uint8)
+    start = time.perf_counter()
+    raster.draw_points(target, points + 2048)
+    draw = time.perf_counter() - start
+    print(f"{args.segments} segments, {len(points)} pixels: python loop {args.segments / loop:.0f} segments/s, "
+          f"batch {args.segments / batch:.0f} segments/s ({loop / batch:.1f}x), "
+          f"draw {len(points) / draw / 1e6:.1f} Mpixel/s")
+
+    mask = np.zeros((4096, 4096), dtype=np.uint8)
+    centers = rng.integers(0, 4096, (args.disks, 2))
+    start = time.perf_counter()
+    raster.stamp_disks(mask, centers, args.disk_radius)
+    stamp = time.perf_counter() - start
+    print(f"{args.disks} disks of radius {args.disk_radius}: {args.disks / stamp:.0f} disks/s")
+
+    wu_segments = random_segments(rng, args.segments, 2048, args.max_length) + 2048
+    wu_circles = np.column_stack([rng.integers(0, 4096, (args.disks, 2)), rng.integers(0, 64, args.disks)])
+    for name, draw, primitives in [("wu lines", raster.draw_wu_lines, wu_segments),
+                                   ("wu circles", raster.draw_wu_circles, wu_circles)]:
+        for dtype in (np.float32, np.uint8):
+            buffer = np.zeros((4096, 4096), dtype=dtype)
+            start = time.perf_counter()
+            draw(buffer, primitives)
+            elapsed = time.perf_counter() - start
+            print(f"{name} into {np.dtype(dtype).name}: {len(primitives) / elapsed:.0f} primitives/s")
+
+    viewport = (0, 0, 1919, 1079)
+    for name, chunks in [("line (0,0)-(10^7,3)", raster.iter_line_chunks(0, 0, 10 ** 7, 3, clip=viewport)),
+                         ("circle r=10^7", raster.iter_circle_chunks(10 ** 7, 500, 10 ** 7, clip=viewport))]:
+        tracemalloc.start()
+        start = time.perf_counter()
+        visible = sum(len(chunk) for chunk in chunks)
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{name} clipped to 1920x1080: {visible} visible pixels in {elapsed * 1000:.1f} ms, "
+              f"peak {peak / 1e6:.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from kg_core import raster
+from kg_core.render import AXIS, BACKGROUND, PALETTE, POINT, PointRaster, to_ppm
+
+
+def patch_redraw(points, x_min, y_min, x_max, y_max, size):
+    # Прежний путь RasterizationApp.plot_points: по прямоугольнику на каждую точку
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.patches as patches
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    figure = Figure(figsize=(size / 100, size / 100), dpi=100)
+    canvas = FigureCanvasAgg(figure)
+    ax = figure.add_subplot(111)
+    for (x, y) in points:
+        ax.add_patch(patches.Rectangle((x - 0.5, y - 0.5), 1, 1, color='red'))
+    ax.set_xlim(x_min - 10, x_max + 10)
+    ax.set_ylim(y_min - 10, y_max + 10)
+    ax.axhline(0, color='black', linewidth=0.5, ls='--')
+    ax.axvline(0, color='black', linewidth=0.5, ls='--')
+    ax.grid()
+    ax.set_aspect('equal', adjustable='box')
+    canvas.draw()
+
+
+def buffer_redraw(point_raster, size, zoom, center):
+    return to_ppm(point_raster.render(size, size, zoom, *center))
+
+
+def dense_render(point_raster, points, coverage, width, height, zoom, center_x, center_y):
+    # Эталон: буфер на всю рамку точек и выборка строк и столбцов окна из него
+    pixels = np.full(point_raster.shape, BACKGROUND, dtype=np.uint16)
+    if point_raster.x_min <= 0 <= point_raster.x_max:
+        pixels[:, -point_raster.x_min] = AXIS
+    if point_raster.y_min <= 0 <= point_raster.y_max:
+        pixels[point_raster.y_max, :] = AXIS
+    buffer_points = np.column_stack([points[:, 0] - point_raster.x_min, point_raster.y_max - points[:, 1]])
+    if coverage is None:
+        raster.draw_points(pixels, buffer_points, POINT)
+    else:
+        levels = raster.accumulate_coverage(np.zeros(point_raster.shape, dtype=np.uint8), buffer_points, coverage)
+        pixels[levels > 0] = levels[levels > 0]
+
+    screen_x = (np.arange(width) + 0.5 - width / 2) / zoom
+    screen_y = (np.arange(height) + 0.5 - height / 2) / zoom
+    columns = np.floor(center_x + screen_x + 0.5).astype(np.int64) - point_raster.x_min
+    rows = point_raster.y_max - np.floor(center_y - screen_y + 0.5).astype(np.int64)
+    view = pixels.take(np.clip(rows, 0, pixels.shape[0] - 1), axis=0)
+    view = view.take(np.clip(columns, 0, pixels.shape[1] - 1), axis=1)
+    view[(rows < 0) | (rows >= pixels.shape[0]), :] = BACKGROUND
+    view[:, (columns < 0) | (columns >= pixels.shape[1])] = BACKGROUND
+    return PALETTE[view]
+
+
+def check_render():
+    points = [(0, 0), (3, 2), (-4, 5)]
+    point_raster = PointRaster(points, -4, 0, 3, 5, padding=1)
+    rgb = point_raster.render(point_raster.shape[1], point_raster.shape[0], 1.0, *point_raster.center)
+    drawn = {(x, y) for x in range(-5, 5) for y in range(-1, 7)
+             if tuple(rgb[point_raster.y_max - y, x - point_raster.x_min]) == (255, 0, 0)}
+    if drawn != set(points):
+        raise AssertionError(f"expected {sorted(points)}, rendered {sorted(drawn)}")
+
+    rng = np.random.default_rng(0)
+    for wu in (False, True):
+        if wu:
+            points, coverage, _ = raster.wu_line_batch(rng.integers(-60, 60, (20, 4)))
+        else:
+            points, coverage = np.array(raster.bresenham_batch(rng.integers(-60, 60, (20, 4)))[0]), None
+        point_raster = PointRaster(points, -10, -10, 10, 10, coverage=coverage)
+        for zoom, center in [(point_raster.fit_zoom(97, 61), point_raster.center), (0.37, (5.2, -3.7)),
+                             (3.0, (-20.4, 11.6)), (11.0, (0.0, 0.0)), (2.0, (400.0, 400.0))]:
+            expected = dense_render(point_raster, points, coverage, 97, 61, zoom, *center)
+            if not np.array_equal(point_raster.render(97, 61, zoom, *center), expected):
+                raise AssertionError(f"render differs from the dense buffer at zoom {zoom}, center {center}")
+
+    # Память растёт с числом точек, а не с площадью рамки: диагональ 20000 x 20000 - это 20 тысяч точек
+    points = raster.bresenham(0, 0, 20000, 20000)
+    tracemalloc.start()
+    point_raster = PointRaster(points, 0, 0, 20000, 20000)
+    point_raster.render(800, 600, point_raster.fit_zoom(800, 600), *point_raster.center)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    if peak > 20 * 1024 * 1024:
+        raise AssertionError(f"a 20000-pixel diagonal peaked at {peak / 1e6:.0f} MB")
+    print(f"render: ok (20000-pixel diagonal peaks at {peak / 1e6:.1f} MB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Redraw time: matplotlib patches vs a NumPy buffer")
+    parser.add_argument("--radii", type=int, nargs="+", default=[10, 100, 500, 2000])
+    parser.add_argument("--size", type=int, default=600, help="viewport size in screen pixels")
+    parser.add_argument("--skip-patches", action="store_true")
+    args = parser.parse_args()
+
+    check_render()
+    for radius in args.radii:
+        points = raster.bresenham_circle(0, 0, radius)
+        bounds = (-radius, -radius, radius, radius)
+
+        start = time.perf_counter()
+        point_raster = PointRaster(points, *bounds)
+        build = time.perf_counter() - start
+        zoom = point_raster.fit_zoom(args.size, args.size)
+        redraws = []
+        for factor, shift in [(1, 0), (4, radius / 2), (16, -radius / 3)]:
+            start = time.perf_counter()
+            buffer_redraw(point_raster, args.size, zoom * factor, (shift, shift))
+            redraws.append(time.perf_counter() - start)
+        line = (f"radius {radius:5d} ({len(points)} points): buffer build {build * 1000:.1f} ms, "
+                f"redraw {max(redraws) * 1000:.1f} ms")
+
+        if not args.skip_patches:
+            start = time.perf_counter()
+            patch_redraw(points, *bounds, args.size)
+            line += f", patches {(time.perf_counter() - start) * 1000:.0f} ms"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
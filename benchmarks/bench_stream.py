@@ -0,0 +1,123 @@
+import argparse
+import threading
+import tracemalloc
+
+import numpy as np
+
+from kg_core import filters, operations
+from kg_core.stream import STREAM_FILTERS, FramePipeline, SyntheticSource, create_filter
+
+PER_FRAME_LIMIT = 4096
+
+
+class CheckSink:
+    # Сверяет каждый кадр с однократным вызовом обычного фильтра; gradient сверяется с насыщающим fused_detection
+    def __init__(self, source, names):
+        self.texture = source.texture
+        self.step = source.step
+        self.width = source.shape[1]
+        self.names = names
+        self.checked = 0
+
+    def write(self, index, outputs):
+        offset = index * self.step
+        frame = self.texture[:, offset:offset + self.width]
+        for name in self.names:
+            if name == "gradient":
+                expected = filters.fused_detection(frame, ("gradient",))["gradient"]
+            else:
+                expected = operations.run(name, frame)
+            if not np.array_equal(outputs[name], expected):
+                raise AssertionError(f"{name}: frame {index} differs from the single-image filter")
+        self.checked += 1
+
+    def close(self):
+        pass
+
+
+class Failure(Exception):
+    pass
+
+
+class FailingSink:
+    def write(self, index, outputs):
+        if index == 3:
+            raise Failure("sink")
+
+    def close(self):
+        pass
+
+
+def failing_filter(image, out):
+    raise Failure("filter")
+
+
+class FailingSource(SyntheticSource):
+    def read(self, buffer):
+        if self.position == 3:
+            raise Failure("source")
+        return super().read(buffer)
+
+
+def check_failures():
+    # Ошибка любой стадии должна выйти из run(), а не подвесить его на join
+    for stage in ("sink", "filter", "source"):
+        for realtime in (False, True):
+            source = (FailingSource if stage == "source" else SyntheticSource)((60, 80), frames=50, fps=1000.0)
+            pipeline = FramePipeline(source, ["points"], FailingSink() if stage == "sink" else None, slots=2,
+                                     realtime=realtime)
+            if stage == "filter":
+                pipeline.filters["points"] = failing_filter
+            raised = []
+
+            def run():
+                try:
+                    pipeline.run()
+                except Failure as error:
+                    raised.append(str(error))
+            worker = threading.Thread(target=run, daemon=True)
+            worker.start()
+            worker.join(5)
+            if worker.is_alive() or raised != [stage]:
+                raise AssertionError(f"failing {stage} (realtime={realtime}): run() did not raise, got {raised}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Frame streaming: parity, per-frame allocations, sustained fps")
+    parser.add_argument("--size", type=int, nargs=2, default=[1080, 1920], metavar=("HEIGHT", "WIDTH"))
+    parser.add_argument("--frames", type=int, default=60)
+    parser.add_argument("--fps", type=float, default=30.0, help="source rate for the realtime run")
+    parser.add_argument("--operations", nargs="+", default=["niblack", "gradient"], choices=list(STREAM_FILTERS))
+    args = parser.parse_args()
+    shape = tuple(args.size)
+
+    source = SyntheticSource((120, 160), frames=12, step=7)
+    sink = CheckSink(source, list(STREAM_FILTERS))
+    FramePipeline(source, list(STREAM_FILTERS), sink, slots=3).run()
+    if sink.checked != 12:
+        raise AssertionError(f"expected 12 frames, got {sink.checked}")
+    check_failures()
+
+    # Второй и последующие кадры не должны выделять ничего, кроме мелочи на вызовы
+    frame = np.random.default_rng(0).integers(0, 256, shape, dtype=np.uint8)
+    output = np.empty(shape, dtype=np.uint8)
+    for name in args.operations:
+        apply = create_filter(name, shape)
+        apply(frame, output)
+        tracemalloc.start()
+        apply(frame, output)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        if peak > PER_FRAME_LIMIT:
+            raise AssertionError(f"{name}: {peak} bytes allocated per frame")
+        print(f"{name}: {peak} bytes allocated per frame (frame is {frame.nbytes / 1e6:.1f} MB)")
+
+    stats = FramePipeline(SyntheticSource(shape, args.frames), args.operations).run()
+    print(f"{shape[0]}x{shape[1]} {'+'.join(args.operations)}, as fast as possible: {stats.report()}")
+    stats = FramePipeline(SyntheticSource(shape, args.frames, args.fps), args.operations, realtime=True).run()
+    print(f"realtime source at {args.fps:g} fps: {stats.report()}")
+    print("parity: ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+import argparse
+import time
+
+import numpy as np
+
+from kg_core import operations, sweep
+
+GRIDS = {
+    "bernsen": {"window_size": [7, 15, 31], "contrast_threshold": [5, 15, 30, 60]},
+    "niblack": {"window_size": [7, 15, 31], "k": [-0.4, -0.2, 0.0, 0.2]},
+    "sauvola": {"window_size": [7, 15, 31], "k": [0.2, 0.35, 0.5], "r": [64, 128]},
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parameter sweep with shared intermediates vs naive reruns")
+    parser.add_argument("--size", type=int, default=2000)
+    args = parser.parse_args()
+
+    image = np.random.default_rng(0).integers(0, 256, (args.size, args.size), dtype=np.uint8)
+    for operation, grid in GRIDS.items():
+        start = time.perf_counter()
+        params_list, stack = sweep.sweep(operation, image, **grid)
+        shared = time.perf_counter() - start
+
+        start = time.perf_counter()
+        naive = [operations.run(operation, image, **params) for params in params_list]
+        fresh = time.perf_counter() - start
+
+        if not all(np.array_equal(expected, actual) for expected, actual in zip(naive, stack)):
+            raise AssertionError(f"{operation} sweep differs from naive runs")
+        print(f"{operation} {args.size}x{args.size}, {len(params_list)} combinations: "
+              f"naive {fresh:.3f}s, sweep {shared:.3f}s ({fresh / shared:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from kg_core import operations, tiling
+
+OPERATIONS = tuple(operations.OPERATIONS)
+
+RSS_SCRIPT = """
+import resource
+import sys
+import numpy as np
+from kg_core import operations, tiling
+
+operation, input_path, output_path, tile_size = sys.argv[1:5]
+if int(tile_size):
+    tiling.process_file(operation, input_path, output_path, int(tile_size))
+else:
+    np.save(output_path, operations.run(operation, np.load(input_path)))
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def check_parity(rng):
+    for shape in [(1, 1), (5, 300), (257, 131), (600, 513)]:
+        image = rng.integers(0, 256, shape, dtype=np.uint8)
+        for operation in OPERATIONS:
+            for params in ([{"window_size": 3}, {"window_size": 16}, {}] if operation in ("bernsen", "niblack")
+                           else [{}]):
+                expected = operations.run(operation, image, **params)
+                for tile_size in (1, 7, 64, 100):
+                    if shape[0] * shape[1] > 20000 and tile_size < 64:
+                        continue
+                    actual = tiling.apply_tiled(operation, image, tile_size=tile_size, **params)
+                    if not np.array_equal(expected, actual):
+                        raise AssertionError(f"{operation} {params} differs for shape={shape} tile={tile_size}")
+    print("parity: ok")
+
+
+def peak_rss(operation, input_path, output_path, tile_size):
+    output = subprocess.run([sys.executable, "-c", RSS_SCRIPT, operation, input_path, output_path, str(tile_size)],
+                            check=True, capture_output=True, text=True).stdout
+    return int(output) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiled memory-mapped processing: parity and peak RSS")
+    parser.add_argument("--size", type=int, default=8000)
+    parser.add_argument("--tile-sizes", type=int, nargs="+", default=[512, 1024, 2048])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    check_parity(rng)
+
+    with tempfile.TemporaryDirectory() as directory:
+        input_path = os.path.join(directory, "input.npy")
+        image = np.lib.format.open_memmap(input_path, mode="w+", dtype=np.uint8, shape=(args.size, args.size))
+        for y in range(0, args.size, 1024):
+            image[y:y + 1024] = rng.integers(0, 256, image[y:y + 1024].shape, dtype=np.uint8)
+        image.flush()
+        del image
+
+        for operation in OPERATIONS:
+            untiled_path = os.path.join(directory, f"{operation}_full.npy")
+            print(f"{operation} {args.size}x{args.size}: untiled peak RSS "
+                  f"{peak_rss(operation, input_path, untiled_path, 0):.0f} MB")
+            for tile_size in args.tile_sizes:
+                tiled_path = os.path.join(directory, f"{operation}_{tile_size}.npy")
+                start = time.perf_counter()
+                rss = peak_rss(operation, input_path, tiled_path, tile_size)
+                elapsed = time.perf_counter() - start
+                identical = np.array_equal(np.load(untiled_path, mmap_mode="r"), np.load(tiled_path, mmap_mode="r"))
+                print(f"    tile {tile_size}: peak RSS {rss:.0f} MB, {elapsed:.2f}s, identical={identical}")
+                os.remove(tiled_path)
+            os.remove(untiled_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+import argparse
+import json
+import math
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from collections import namedtuple
+
+import numpy as np
+
+from kg_core import color, filters, raster, threshold
+from kg_core.color_state import ColorState
+from kg_core.render import PointRaster
+
+# Сводный прогон горячих путей всех трёх лабораторных без GUI. Каждый случай - функция setup(масштаб),
+# которая готовит данные и возвращает (замеряемая функция, число обработанных единиц). Результат пишется
+# в JSON; при заданном базовом файле прогон падает, если что-то замедлилось больше допустимого.
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+DEFAULT_SIZES = (1, 4, 16)
+# Быстрые случаи повторяются, пока суммарно не наберётся MIN_TIME: минимум по 3 прогонам в доли
+# миллисекунды слишком шумный для порога в 25%
+MIN_TIME = 0.2
+MAX_REPEAT = 1000
+
+Case = namedtuple("Case", ["name", "unit", "setup"])
+
+
+def synthetic_image(megapixels, seed=0):
+    # Кадр 4:3 со случайными пикселями: для порогов и фильтров худший случай, без плоских областей
+    width = round(math.sqrt(megapixels * 1e6 * 4 / 3))
+    height = round(megapixels * 1e6 / width)
+    return np.random.default_rng(seed).integers(0, 256, (height, width), dtype=np.uint8)
+
+
+def image_case(func):
+    def setup(megapixels):
+        image = synthetic_image(megapixels)
+        return lambda: func(image), image.size
+    return setup
+
+
+def random_segments(count, extent=50, seed=1):
+    return np.random.default_rng(seed).integers(-extent, extent, (count, 4))
+
+
+def bresenham_loop(count):
+    segments = random_segments(count).tolist()
+    return lambda: [raster.bresenham(*segment) for segment in segments], count
+
+
+def bresenham_batch(count):
+    segments = random_segments(count)
+    return lambda: raster.bresenham_batch(segments), count
+
+
+def circle_loop(count):
+    radii = np.random.default_rng(2).integers(1, 300, count).tolist()
+    return lambda: [raster.bresenham_circle(0, 0, radius) for radius in radii], count
+
+
+def wu_lines(count):
+    segments = random_segments(count)
+    return lambda: raster.wu_line_batch(segments), count
+
+
+def plot_points(count):
+    # Путь lab_03.plot_points: разреженный растр отрезка из count точек и один кадр окна 800x600
+    points = np.array(raster.bresenham(0, 0, count - 1, count // 3))
+
+    def run():
+        image = PointRaster(points, 0, 0, count - 1, count // 3)
+        return image.render(800, 600, image.fit_zoom(800, 600), *image.center)
+    return run, count
+
+
+def random_colors(count, channels, high, seed=3):
+    return np.random.default_rng(seed).integers(0, high + 1, (count, channels))
+
+
+def color_case(func, channels, high):
+    def setup(count):
+        colors = random_colors(count, channels, high)
+        return lambda: func(colors), count
+    return setup
+
+
+def slider_updates(count):
+    # Путь ColorConverterApp: один пересчёт ColorState на каждое значение ползунка
+    values = random_colors(count, 3, 255).tolist()
+
+    def run():
+        state = ColorState()
+        for rgb in values:
+            state.set("rgb", rgb)
+    return run, count
+
+
+IMAGE_CASES = [
+    Case("bernsen", "pixel", image_case(threshold.bernsen_threshold)),
+    Case("niblack", "pixel", image_case(threshold.niblack_threshold)),
+    Case("sauvola", "pixel", image_case(threshold.sauvola_threshold)),
+    Case("points", "pixel", image_case(filters.point_detection)),
+    Case("lines45", "pixel", image_case(filters.line_detection_45)),
+    Case("gradient", "pixel", image_case(filters.gradient_detection)),
+    Case("fused", "pixel", image_case(filters.fused_detection)),
+]
+FIXED_CASES = [
+    (Case("bresenham", "segment", bresenham_loop), 20000),
+    (Case("bresenham_batch", "segment", bresenham_batch), 100000),
+    (Case("bresenham_circle", "circle", circle_loop), 2000),
+    (Case("wu_lines", "segment", wu_lines), 50000),
+    (Case("plot_points", "point", plot_points), 100000),
+    (Case("rgb_to_cmyk", "color", color_case(color.rgb_to_cmyk, 3, 255)), 1000000),
+    (Case("rgb_to_hsv", "color", color_case(color.rgb_to_hsv, 3, 255)), 1000000),
+    (Case("hsv_to_rgb", "color", color_case(color.hsv_to_rgb, 3, 100)), 1000000),
+    (Case("cmyk_to_rgb", "color", color_case(color.cmyk_to_rgb, 4, 100)), 1000000),
+    (Case("slider_updates", "update", slider_updates), 2000),
+]
+
+
+def plan(sizes):
+    for case in IMAGE_CASES:
+        for megapixels in sizes:
+            yield f"{case.name}/{megapixels:g}MP", case, megapixels
+    for case, count in FIXED_CASES:
+        yield f"{case.name}/{count}", case, count
+
+
+def measure(case, scale, repeat):
+    func, units = case.setup(scale)
+    func()
+    timings = []
+    while len(timings) < repeat or (sum(timings) < MIN_TIME and len(timings) < MAX_REPEAT):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    # Пиковая память - отдельным прогоном: tracemalloc видит буферы numpy, но замедляет питоновский код
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    seconds = min(timings)
+    return {"seconds": seconds, "throughput": units / seconds, "unit": f"{case.unit}/s", "peak_bytes": peak}
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare(results, baseline, threshold, memory_threshold):
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        time_ratio = current["seconds"] / previous["seconds"]
+        memory_ratio = current["peak_bytes"] / max(previous["peak_bytes"], 1)
+        flags = []
+        if time_ratio > 1 + threshold:
+            flags.append("SLOWER")
+        if memory_ratio > 1 + memory_threshold:
+            flags.append("MORE MEMORY")
+        print(f"  {name:<28} time x{time_ratio:.2f}  memory x{memory_ratio:.2f}  {' '.join(flags)}")
+        if flags:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless benchmark suite with a stored baseline")
+    parser.add_argument("--sizes", type=float, nargs="+", default=list(DEFAULT_SIZES),
+                        help="synthetic image sizes in megapixels (100 needs several GB of RAM)")
+    parser.add_argument("-k", "--filter", nargs="+", default=None,
+                        help="run only cases whose name contains one of these")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("-o", "--output", default=None, help="write results as JSON")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown, 0.25 = 25%%")
+    parser.add_argument("--memory-threshold", type=float, default=0.25, help="allowed peak memory growth")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name, case, scale in plan(args.sizes):
+        if args.filter and not any(pattern in name for pattern in args.filter):
+            continue
+        results[name] = measure(case, scale, args.repeat)
+        result = results[name]
+        print(f"{name:<28} {result['seconds'] * 1000:10.2f} ms {result['throughput']:14.0f} {result['unit']:<10} "
+              f"peak {result['peak_bytes'] / 1e6:8.1f} MB", flush=True)
+
+    report = {"environment": environment(), "results": results}
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    print(f"compared with {args.baseline} ({baseline['environment']['timestamp']}):")
+    regressions = compare(results, baseline["results"], args.threshold, args.memory_threshold)
+    if regressions:
+        print(f"{len(regressions)} regressions: {', '.join(regressions)}")
+        return 1
+    print("no regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
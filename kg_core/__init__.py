@@ -0,0 +1,6 @@
+from kg_core.color import cmyk_to_hsv, cmyk_to_rgb, hsv_to_cmyk, hsv_to_rgb, rgb_to_cmyk, rgb_to_hsv
+from kg_core.filters import fused_detection, gradient_detection, line_detection_45, point_detection
+from kg_core.integral import IntegralImage
+from kg_core.raster import bresenham, bresenham_circle
+from kg_core.threshold import (bernsen_threshold, niblack_threshold, sauvola_threshold, sliding_max, sliding_min,
+                               wolf_threshold)
@@ -0,0 +1,190 @@
+import argparse
+import glob
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import cv2
+
+from kg_core import operations
+from kg_core.cache import ResultCache
+
+# Конвейер: чтение и декодирование в пуле потоков -> фильтры в пуле процессов -> запись в пуле потоков.
+# Число изображений "в полёте" ограничено семафором, поэтому память не растёт с количеством файлов.
+# С --cache-dir процессы-фильтры делят дисковый кэш результатов: одинаковые входы считаются один раз.
+# Выходы повторяют путь входа относительно общего корня шаблонов, поэтому одноимённые файлы
+# из разных папок не затирают друг друга.
+
+_cache = None
+
+
+def _pattern_root(pattern):
+    # Папка до первого компонента с *, ? или [
+    parts = []
+    for part in os.path.normpath(pattern).split(os.sep)[:-1]:
+        if glob.has_magic(part):
+            break
+        parts.append(part)
+    return os.path.abspath(os.sep.join(parts) or os.curdir)
+
+
+def input_root(patterns):
+    return os.path.commonpath([_pattern_root(pattern) for pattern in patterns])
+
+
+def iter_paths(patterns):
+    # Файл, попавший под несколько шаблонов, обрабатывается один раз
+    seen = set()
+    for pattern in patterns:
+        for path in glob.iglob(pattern, recursive=True):
+            if os.path.isfile(path) and os.path.abspath(path) not in seen:
+                seen.add(os.path.abspath(path))
+                yield path
+
+
+def decode(path):
+    image = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    if image is None:
+        raise ValueError(f"unable to load image {path!r}")
+    return image, os.path.getsize(path)
+
+
+def init_worker(cache_dir):
+    global _cache
+    _cache = ResultCache(directory=cache_dir) if cache_dir else None
+
+
+def apply_operations(image, names):
+    run = _cache.run if _cache is not None else operations.run
+    return [(name, run(name, image)) for name in names]
+
+
+def output_stem(output_dir, root, path):
+    relative = os.path.relpath(os.path.abspath(path), root)
+    if relative.startswith(os.pardir + os.sep):
+        raise ValueError(f"{path!r} is outside the input root {root!r}")
+    return os.path.join(output_dir, os.path.splitext(relative)[0])
+
+
+def encode(output_dir, root, path, extension, results):
+    stem = output_stem(output_dir, root, path)
+    os.makedirs(os.path.dirname(stem), exist_ok=True)
+    written = 0
+    for name, result in results:
+        output_path = f"{stem}_{name}.{extension}"
+        if not cv2.imwrite(output_path, result):
+            raise ValueError(f"unable to write image {output_path!r}")
+        written += os.path.getsize(output_path)
+    return written
+
+
+class BatchStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.images = 0
+        self.failed = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.started = time.perf_counter()
+
+    def record(self, bytes_read, bytes_written):
+        with self.lock:
+            self.images += 1
+            self.bytes_read += bytes_read
+            self.bytes_written += bytes_written
+
+    def record_failure(self, path, error):
+        with self.lock:
+            self.failed += 1
+        print(f"{path}: {error}", file=sys.stderr)
+
+    def report(self):
+        elapsed = time.perf_counter() - self.started
+        return (f"processed {self.images} images ({self.failed} failed) in {elapsed:.2f}s: "
+                f"{self.images / elapsed:.1f} images/s, {self.bytes_read / elapsed / 1e6:.1f} MB/s read, "
+                f"{self.bytes_written / elapsed / 1e6:.1f} MB/s written")
+
+
+class BatchPipeline:
+    def __init__(self, names, output_dir, extension="png", workers=None, io_threads=4, max_in_flight=None,
+                 cache_dir=None):
+        for name in names:
+            operations.get_operation(name)
+        self.names = names
+        self.output_dir = output_dir
+        self.extension = extension
+        self.workers = workers or os.cpu_count() or 1
+        self.io_threads = io_threads
+        self.max_in_flight = max_in_flight or 2 * (self.workers + io_threads)
+        self.cache_dir = cache_dir
+        self.stats = BatchStats()
+
+    def run(self, paths, root=None):
+        # root - папка, относительно которой пути входов повторяются в output_dir
+        self.root = os.path.abspath(root or os.curdir)
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.slots = threading.BoundedSemaphore(self.max_in_flight)
+        with ThreadPoolExecutor(self.io_threads) as self.decode_pool, \
+                ProcessPoolExecutor(self.workers, initializer=init_worker, initargs=(self.cache_dir,)) \
+                as self.filter_pool, \
+                ThreadPoolExecutor(self.io_threads) as self.encode_pool:
+            for path in paths:
+                # Обратное давление: новый файл читается только когда освободился слот
+                self.slots.acquire()
+                self.decode_pool.submit(decode, path).add_done_callback(
+                    lambda future, path=path: self._decoded(path, future))
+            for _ in range(self.max_in_flight):
+                self.slots.acquire()
+        return self.stats
+
+    def _fail(self, path, error):
+        self.stats.record_failure(path, error)
+        self.slots.release()
+
+    def _decoded(self, path, future):
+        try:
+            image, bytes_read = future.result()
+            self.filter_pool.submit(apply_operations, image, self.names).add_done_callback(
+                lambda future: self._filtered(path, bytes_read, future))
+        except Exception as error:
+            self._fail(path, error)
+
+    def _filtered(self, path, bytes_read, future):
+        try:
+            results = future.result()
+            encoded = self.encode_pool.submit(encode, self.output_dir, self.root, path, self.extension, results)
+            encoded.add_done_callback(lambda future: self._encoded(path, bytes_read, future))
+        except Exception as error:
+            self._fail(path, error)
+
+    def _encoded(self, path, bytes_read, future):
+        try:
+            self.stats.record(bytes_read, future.result())
+        except Exception as error:
+            self.stats.record_failure(path, error)
+        self.slots.release()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch image segmentation over files matched by glob patterns")
+    parser.add_argument("inputs", nargs="+", help="input glob patterns, e.g. 'scans/**/*.png'")
+    parser.add_argument("-o", "--output-dir", required=True)
+    parser.add_argument("-p", "--operations", nargs="+", default=["bernsen"], choices=list(operations.OPERATIONS))
+    parser.add_argument("-f", "--format", default="png", help="output image extension")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="filter processes (default: CPU count)")
+    parser.add_argument("--io-threads", type=int, default=4, help="decode and encode threads each")
+    parser.add_argument("--max-in-flight", type=int, default=None, help="images held in memory at once")
+    parser.add_argument("--cache-dir", default=None, help="share filter results between runs through this directory")
+    args = parser.parse_args(argv)
+
+    pipeline = BatchPipeline(args.operations, args.output_dir, args.format, args.workers, args.io_threads,
+                             args.max_in_flight, args.cache_dir)
+    stats = pipeline.run(iter_paths(args.inputs), input_root(args.inputs))
+    print(stats.report())
+    return 1 if stats.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
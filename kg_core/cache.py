@@ -0,0 +1,118 @@
+import hashlib
+import os
+import threading
+import zipfile
+from collections import OrderedDict
+
+import numpy as np
+
+from kg_core import operations
+
+# Запоминание результатов фильтров. Ключ - хэш содержимого изображения (форма, тип и байты пикселей),
+# имя операции и параметры. В памяти держится LRU с бюджетом в байтах, а при заданном каталоге
+# результаты ещё и пишутся на диск сжатыми .npz, чтобы их видели другие процессы и следующие запуски.
+
+DEFAULT_BUDGET = 256 << 20
+# np.savez_compressed жмёт с уровнем 6, что на шумных картах порогов в 10 раз медленнее уровня 1
+COMPRESS_LEVEL = 1
+
+
+def content_hash(image):
+    image = np.ascontiguousarray(image)
+    digest = hashlib.blake2b(f"{image.dtype.str}{image.shape}".encode(), digest_size=16)
+    digest.update(image.data)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    def __init__(self, budget=DEFAULT_BUDGET, directory=None):
+        self.budget = budget
+        self.directory = directory
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def key(self, name, image, **params):
+        # Хэш считается по байтам каждый раз: запомнить его по id нельзя, массив только для чтения
+        # можно снова сделать записываемым через setflags и поменять на месте
+        params = operations.normalize_params(name, **params)
+        description = f"{content_hash(image)}:{name}:{sorted(params.items())!r}"
+        return hashlib.blake2b(description.encode(), digest_size=16).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.npz")
+
+    def get(self, key):
+        with self.lock:
+            result = self.entries.get(key)
+            if result is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return result
+
+        if self.directory and os.path.exists(self._path(key)):
+            with np.load(self._path(key)) as stored:
+                result = self._remember(key, stored["result"])
+            with self.lock:
+                self.disk_hits += 1
+            return result
+
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, result):
+        result = self._remember(key, result)
+        if self.directory:
+            # Как и таблицы color_lut: запись во временный файл и атомарное переименование
+            path = self._path(key)
+            temporary_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with zipfile.ZipFile(temporary_path, "w", zipfile.ZIP_DEFLATED,
+                                 compresslevel=COMPRESS_LEVEL) as archive, \
+                    archive.open("result.npy", "w", force_zip64=True) as file:
+                np.lib.format.write_array(file, result)
+            os.replace(temporary_path, path)
+        return result
+
+    def _remember(self, key, result):
+        # Закэшированный массив отдаётся всем вызывающим, поэтому он только для чтения
+        result = np.asarray(result)
+        if not result.flags.owndata:
+            result = result.copy()
+        result.setflags(write=False)
+        if result.nbytes > self.budget:
+            return result
+        with self.lock:
+            if key in self.entries:
+                self.bytes -= self.entries.pop(key).nbytes
+            self.entries[key] = result
+            self.bytes += result.nbytes
+            while self.bytes > self.budget:
+                _, evicted = self.entries.popitem(last=False)
+                self.bytes -= evicted.nbytes
+                self.evictions += 1
+        return result
+
+    def run(self, name, image, **params):
+        key = self.key(name, image, **params)
+        result = self.get(key)
+        if result is None:
+            result = self.put(key, operations.run(name, image, **params))
+        return result
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def report(self):
+        requests = self.hits + self.disk_hits + self.misses
+        rate = (self.hits + self.disk_hits) / requests if requests else 0.0
+        return (f"cache: {self.hits} hits, {self.disk_hits} disk hits, {self.misses} misses ({rate:.0%} hit rate), "
+                f"{self.evictions} evictions, {len(self.entries)} entries, {self.bytes / 1e6:.1f} MB in memory")
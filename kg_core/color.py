@@ -0,0 +1,107 @@
+import numpy as np
+
+# Все функции работают с массивами формы (..., 3) или (..., 4) в тех же единицах, что и ползунки
+# ColorConverterApp: RGB 0..255, CMYK в процентах, H в градусах, S и V в процентах.
+# Результат округляется так же, как его показывают поля ввода.
+
+
+def _channels(values, count):
+    values = np.asarray(values)
+    if values.shape[-1] != count:
+        raise ValueError(f"expected {count} channels in the last axis, got shape {values.shape}")
+    return [values[..., i].astype(np.float64) for i in range(count)]
+
+
+def _rgb_to_cmyk_unit(r, g, b):
+    k = 1 - np.maximum(np.maximum(r, g), b)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        c = np.where(k < 1, (1 - r - k) / (1 - k), 0.0)
+        m = np.where(k < 1, (1 - g - k) / (1 - k), 0.0)
+        y = np.where(k < 1, (1 - b - k) / (1 - k), 0.0)
+    return c, m, y, k
+
+
+def _cmyk_to_rgb_unit(c, m, y, k):
+    return (1 - c) * (1 - k), (1 - m) * (1 - k), (1 - y) * (1 - k)
+
+
+def _rgb_to_hsv_unit(r, g, b):
+    mx = np.maximum(np.maximum(r, g), b)
+    mn = np.minimum(np.minimum(r, g), b)
+    diff = mx - mn
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        h = np.select(
+            [diff == 0, mx == r, mx == g],
+            [0.0, (60 * ((g - b) / diff) + 360) % 360, (60 * ((b - r) / diff) + 120) % 360],
+            (60 * ((r - g) / diff) + 240) % 360,
+        )
+        s = np.where(mx == 0, 0.0, diff / mx)
+    return h, s, mx
+
+
+def _hsv_to_rgb_unit(h, s, v):
+    h = h % 360
+    i = np.trunc(h / 60) % 6
+    f = (h / 60) - i
+    p = v * (1 - s)
+    q = v * (1 - f * s)
+    t = v * (1 - (1 - f) * s)
+
+    sectors = [i == 0, i == 1, i == 2, i == 3, i == 4]
+    r = np.select(sectors, [v, q, p, p, t], v)
+    g = np.select(sectors, [t, v, v, q, p], p)
+    b = np.select(sectors, [p, p, t, v, v], q)
+    return r, g, b
+
+
+def _rgb_from_unit(r, g, b):
+    return np.stack([np.trunc(r * 255), np.trunc(g * 255), np.trunc(b * 255)], axis=-1).astype(np.uint8)
+
+
+def _cmyk_from_unit(c, m, y, k):
+    # Поля CMYK форматируются через f"{x * 100:.0f}", то есть округление к ближайшему чётному
+    return np.rint(np.stack([c, m, y, k], axis=-1) * 100).astype(np.uint8)
+
+
+def _hsv_from_unit(h, s, v):
+    return np.stack([np.trunc(h), np.trunc(s * 100), np.trunc(v * 100)], axis=-1).astype(np.uint16)
+
+
+def _rgb_unit(rgb):
+    r, g, b = _channels(rgb, 3)
+    return r / 255.0, g / 255.0, b / 255.0
+
+
+def _cmyk_unit(cmyk):
+    c, m, y, k = _channels(cmyk, 4)
+    return c / 100.0, m / 100.0, y / 100.0, k / 100.0
+
+
+def _hsv_unit(hsv):
+    h, s, v = _channels(hsv, 3)
+    return h, s / 100.0, v / 100.0
+
+
+def rgb_to_cmyk(rgb):
+    return _cmyk_from_unit(*_rgb_to_cmyk_unit(*_rgb_unit(rgb)))
+
+
+def cmyk_to_rgb(cmyk):
+    return _rgb_from_unit(*_cmyk_to_rgb_unit(*_cmyk_unit(cmyk)))
+
+
+def rgb_to_hsv(rgb):
+    return _hsv_from_unit(*_rgb_to_hsv_unit(*_rgb_unit(rgb)))
+
+
+def hsv_to_rgb(hsv):
+    return _rgb_from_unit(*_hsv_to_rgb_unit(*_hsv_unit(hsv)))
+
+
+def cmyk_to_hsv(cmyk):
+    return _hsv_from_unit(*_rgb_to_hsv_unit(*_cmyk_to_rgb_unit(*_cmyk_unit(cmyk))))
+
+
+def hsv_to_cmyk(hsv):
+    return _cmyk_from_unit(*_rgb_to_cmyk_unit(*_hsv_to_rgb_unit(*_hsv_unit(hsv))))
@@ -0,0 +1,91 @@
+import os
+import time
+
+import numpy as np
+
+from kg_core import color
+
+# Входной RGB всегда 8-битный, поэтому все 2^24 ответа можно посчитать заранее.
+# Таблицы хранятся в .npy и открываются через mmap: несколько процессов читают
+# одни и те же страницы из page cache без копирования.
+
+TABLE_SIZE = 1 << 24
+CHUNK_SIZE = 1 << 20
+# Строка таблицы дополняется до 4 каналов, чтобы читать её одним машинным словом через np.take
+TABLES = {
+    "cmyk": (color.rgb_to_cmyk, 4, np.uint8, np.uint32),
+    "hsv": (color.rgb_to_hsv, 3, np.uint16, np.uint64),
+}
+
+
+def default_directory():
+    return os.environ.get("KG_CORE_LUT_DIR", os.path.join(os.path.expanduser("~"), ".cache", "kg_core"))
+
+
+def table_path(directory, name):
+    return os.path.join(directory, f"rgb_to_{name}.npy")
+
+
+def _all_rgb(start, stop):
+    index = np.arange(start, stop, dtype=np.uint32)
+    return np.stack([index >> 16, (index >> 8) & 0xFF, index & 0xFF], axis=-1).astype(np.uint8)
+
+
+def build_table(directory, name):
+    convert, channels, dtype, _ = TABLES[name]
+    os.makedirs(directory, exist_ok=True)
+    path = table_path(directory, name)
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+
+    table = np.lib.format.open_memmap(temporary_path, mode="w+", dtype=dtype, shape=(TABLE_SIZE, 4))
+    for start in range(0, TABLE_SIZE, CHUNK_SIZE):
+        table[start:start + CHUNK_SIZE, :channels] = convert(_all_rgb(start, start + CHUNK_SIZE))
+    table.flush()
+    del table
+    # Переименование атомарно, так что параллельные процессы не увидят недописанный файл
+    os.replace(temporary_path, path)
+    return path
+
+
+def rgb_index(rgb):
+    rgb = np.asarray(rgb)
+    if rgb.shape[-1] != 3:
+        raise ValueError(f"expected 3 channels in the last axis, got shape {rgb.shape}")
+    rgb = rgb.astype(np.uint32)
+    return (rgb[..., 0] << 16) | (rgb[..., 1] << 8) | rgb[..., 2]
+
+
+class ColorLUT:
+    def __init__(self, directory=None, build=True):
+        self.directory = directory or default_directory()
+        self.build_seconds = 0.0
+        self.load_seconds = 0.0
+        self.tables = {}
+        self.words = {}
+
+        for name in TABLES:
+            path = table_path(self.directory, name)
+            if not os.path.exists(path):
+                if not build:
+                    raise FileNotFoundError(path)
+                start = time.perf_counter()
+                build_table(self.directory, name)
+                self.build_seconds += time.perf_counter() - start
+
+            start = time.perf_counter()
+            self.tables[name] = np.load(path, mmap_mode="r")
+            self.words[name] = self.tables[name].view(TABLES[name][3]).reshape(TABLE_SIZE)
+            self.load_seconds += time.perf_counter() - start
+
+    def lookup(self, name, rgb):
+        _, channels, dtype, _ = TABLES[name]
+        index = rgb_index(rgb)
+        # У одного пикселя индекс - скаляр, а view со сменой размера элемента требует хотя бы одну ось
+        gathered = np.take(self.words[name], np.atleast_1d(index)).view(dtype).reshape(index.shape + (4,))
+        return gathered[..., :channels]
+
+    def rgb_to_cmyk(self, rgb):
+        return self.lookup("cmyk", rgb)
+
+    def rgb_to_hsv(self, rgb):
+        return self.lookup("hsv", rgb)
@@ -0,0 +1,92 @@
+import numpy as np
+
+from kg_core import color
+
+# Живой предпросмотр цветовых преобразований для целой фотографии. На каждое движение ползунка
+# синхронно считается уменьшенная копия (её HSV разложен заранее, остаётся только обратное
+# преобразование), а полное разрешение досчитывается полосами в фоне. Каждый запрос получает
+# номер поколения; фоновый расчёт проверяет его между полосами и бросает устаревшую работу.
+
+PROXY_SIDE = 512
+STRIP_ROWS = 64
+MODES = ("rgb", "cyan", "magenta", "yellow", "black", "hue", "saturation", "value")
+
+
+def make_proxy(image, max_side=PROXY_SIDE):
+    # Прореживание без интерполяции: это просто view, и оно не зависит от размера исходника
+    step = max(1, -(-max(image.shape[:2]) // max_side))
+    return np.ascontiguousarray(image[::step, ::step])
+
+
+def decompose(rgb):
+    rgb = np.asarray(rgb)
+    if rgb.shape[-1] != 3:
+        raise ValueError(f"expected 3 channels in the last axis, got shape {rgb.shape}")
+    unit = np.float32(1 / 255)
+    return color._rgb_to_hsv_unit(rgb[..., 0] * unit, rgb[..., 1] * unit, rgb[..., 2] * unit)
+
+
+def adjust(h, s, v, hue_shift=0, saturation=1.0, value=1.0):
+    return (h + np.float32(hue_shift)) % 360, np.clip(s * np.float32(saturation), 0, 1), \
+        np.clip(v * np.float32(value), 0, 1)
+
+
+def _hsv_channel(h, s, v, n):
+    # Та же секторная формула, что в color._hsv_to_rgb_unit, только без np.select по шести секторам
+    k = (h / 60 + n) % 6
+    return v - v * s * np.clip(np.minimum(k, 4 - k), 0, 1)
+
+
+def compose(h, s, v, mode="rgb"):
+    if mode == "hue":
+        channels = [h / 360]
+    elif mode == "saturation":
+        channels = [s]
+    elif mode in ("value", "black"):
+        # K = 1 - max(R, G, B) = 1 - V; краска показывается как на печатной форме: больше краски - темнее
+        channels = [v]
+    elif mode == "rgb":
+        channels = [_hsv_channel(h, s, v, n) for n in (5, 3, 1)]
+    elif mode in ("cyan", "magenta", "yellow"):
+        # 1 - C = R / max(R, G, B), и max(R, G, B) = V
+        n = (5, 3, 1)[MODES.index(mode) - 1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            channels = [np.where(v > 0, _hsv_channel(h, s, v, n) / v, 1)]
+    else:
+        raise ValueError(f"unknown preview mode {mode!r}, expected one of {', '.join(MODES)}")
+
+    gray = [np.trunc(channel * 255).astype(np.uint8) for channel in channels]
+    return np.stack(gray * 3 if len(gray) == 1 else gray, axis=-1)
+
+
+def render(hsv, mode="rgb", hue_shift=0, saturation=1.0, value=1.0):
+    return compose(*adjust(*hsv, hue_shift, saturation, value), mode)
+
+
+class PreviewEngine:
+    def __init__(self, image, max_side=PROXY_SIDE, strip_rows=STRIP_ROWS):
+        self.image = image
+        self.proxy = make_proxy(image, max_side)
+        self.proxy_hsv = decompose(self.proxy)
+        self.strip_rows = strip_rows
+        # Пишется только из GUI-потока; присваивание int атомарно, поэтому воркерам хватает чтения
+        self.generation = 0
+
+    def request(self, **params):
+        self.generation += 1
+        return self.generation, render(self.proxy_hsv, **params)
+
+    def cancel(self):
+        self.generation += 1
+
+    def is_current(self, generation):
+        return generation == self.generation
+
+    def refine(self, generation, **params):
+        output = np.empty(self.image.shape[:2] + (3,), dtype=np.uint8)
+        for top in range(0, self.image.shape[0], self.strip_rows):
+            if not self.is_current(generation):
+                return None
+            strip = self.image[top:top + self.strip_rows]
+            output[top:top + self.strip_rows] = render(decompose(strip), **params)
+        return output if self.is_current(generation) else None
@@ -0,0 +1,60 @@
+import time
+from collections import deque
+
+from kg_core import color
+from kg_core.profiling import instrument
+
+# Единственное состояние цвета для ColorConverterApp. Значения хранятся в тех же единицах, что и ползунки;
+# модель, которую двигал пользователь, берётся как есть, а две другие пересчитываются из неё.
+MODELS = ("rgb", "cmyk", "hsv")
+CONVERSIONS = {
+    "rgb": {"cmyk": color.rgb_to_cmyk, "hsv": color.rgb_to_hsv},
+    "cmyk": {"rgb": color.cmyk_to_rgb, "hsv": color.cmyk_to_hsv},
+    "hsv": {"rgb": color.hsv_to_rgb, "cmyk": color.hsv_to_cmyk},
+}
+
+
+class ColorState:
+    def __init__(self, rgb=(128, 128, 128)):
+        self.values = {"rgb": (), "cmyk": (), "hsv": ()}
+        self.set("rgb", rgb)
+
+    @property
+    def rgb(self):
+        return self.values["rgb"]
+
+    @instrument()
+    def set(self, model, values):
+        # Возвращает только изменившиеся каналы: {модель: [(индекс, значение), ...]}
+        updated = {model: tuple(int(value) for value in values)}
+        for target, convert in CONVERSIONS[model].items():
+            updated[target] = tuple(int(value) for value in convert(updated[model]))
+
+        changes = {}
+        for name, new in updated.items():
+            old = self.values[name]
+            channels = [(i, value) for i, value in enumerate(new) if i >= len(old) or old[i] != value]
+            if channels:
+                changes[name] = channels
+            self.values[name] = new
+        return changes
+
+
+class RateCounter:
+    def __init__(self, window=1.0):
+        self.window = window
+        self.times = deque()
+
+    def tick(self, now=None):
+        now = time.perf_counter() if now is None else now
+        self.times.append(now)
+        self._expire(now)
+
+    def rate(self, now=None):
+        now = time.perf_counter() if now is None else now
+        self._expire(now)
+        return len(self.times) / self.window
+
+    def _expire(self, now):
+        while self.times and self.times[0] <= now - self.window:
+            self.times.popleft()
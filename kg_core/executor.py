@@ -0,0 +1,129 @@
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from kg_core import profiling
+from kg_core.color_preview import make_proxy
+from kg_core.incremental import changed_rectangles, recompute_regions
+from kg_core.operations import get_operation, halo_width
+from kg_core.tiling import apply_tile, tiles
+
+# Фильтры для GUI в фоновом потоке. Каждый запрос получает номер поколения, новый запрос отменяет
+# предыдущий: полное разрешение считается тайлами с перекрытием halo (результат тот же, что и
+# у целого кадра), и между тайлами проверяется, не устарело ли поколение. Сначала отдаётся
+# результат на уменьшенной копии, затем полный. GUI забирает сообщения через poll() из своего
+# цикла событий (в Tk - через root.after), так что главный поток никогда не ждёт вычислений.
+
+PREVIEW_SIDE = 512
+TILE_SIZE = 512
+
+
+class FilterExecutor:
+    def __init__(self, workers=1, cache=None, preview_side=PREVIEW_SIDE, tile_size=TILE_SIZE):
+        self.pool = ThreadPoolExecutor(workers)
+        self.cache = cache
+        self.preview_side = preview_side
+        self.tile_size = tile_size
+        self.messages = queue.SimpleQueue()
+        # Пишется только из GUI-потока; воркеры лишь сравнивают с ним своё поколение
+        self.generation = 0
+        self.running = 0
+
+    def submit(self, name, image, **params):
+        get_operation(name)
+        self.generation += 1
+        self.running += 1
+        self.pool.submit(self._run, self.generation, self._compute, name, image, params)
+        return self.generation
+
+    def submit_changes(self, name, previous_image, image, previous_result, **params):
+        # Изображение поправили: сравнение с прежним и пересчёт изменившихся блоков тоже идут в воркере
+        get_operation(name)
+        self.generation += 1
+        self.running += 1
+        self.pool.submit(self._run, self.generation, self._compute_changes, name, image, params, previous_image,
+                         previous_result)
+        return self.generation
+
+    def cancel(self):
+        self.generation += 1
+
+    def is_current(self, generation):
+        return generation == self.generation
+
+    @property
+    def busy(self):
+        return self.running > 0
+
+    def poll(self):
+        # Возвращает [(стадия, результат)] текущего поколения; стадии - "preview", "final" и "error"
+        delivered = []
+        while True:
+            try:
+                generation, stage, result = self.messages.get_nowait()
+            except queue.Empty:
+                return delivered
+            if stage == "done":
+                self.running -= 1
+            elif self.is_current(generation):
+                delivered.append((stage, result))
+
+    def shutdown(self):
+        self.cancel()
+        self.pool.shutdown(wait=True)
+
+    def _run(self, generation, compute, *args):
+        try:
+            compute(generation, *args)
+        except Exception as error:
+            self.messages.put((generation, "error", error))
+        finally:
+            self.messages.put((generation, "done", None))
+
+    def _from_cache(self, generation, name, image, params):
+        # Возвращает (ключ, найден ли результат); найденный сразу уходит в GUI
+        if self.cache is None:
+            return None, False
+        key = self.cache.key(name, image, **params)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.messages.put((generation, "final", cached))
+        return key, cached is not None
+
+    def _finish(self, generation, key, output):
+        if key is not None:
+            output = self.cache.put(key, output)
+        self.messages.put((generation, "final", output))
+
+    def _compute_changes(self, generation, name, image, params, previous_image, previous_result):
+        key, found = self._from_cache(generation, name, image, params)
+        if found:
+            return
+        rectangles = changed_rectangles(previous_image, image)
+        if not self.is_current(generation):
+            return
+        with profiling.stage("executor.changes", operation=name, regions=len(rectangles)):
+            output = recompute_regions(name, image, previous_result, rectangles, **params)
+        self._finish(generation, key, output)
+
+    def _compute(self, generation, name, image, params):
+        key, found = self._from_cache(generation, name, image, params)
+        if found:
+            return
+
+        operation = get_operation(name)
+        preview = make_proxy(image, self.preview_side)
+        if preview.shape != image.shape:
+            with profiling.stage("executor.preview", operation=name):
+                result = operation.func(preview, **params)
+            self.messages.put((generation, "preview", result))
+
+        output = np.empty(image.shape, dtype=np.uint8)
+        halo = halo_width(name, **params)
+        with profiling.stage("executor.full", operation=name):
+            for bounds in tiles(image.shape, self.tile_size):
+                if not self.is_current(generation):
+                    return
+                apply_tile(operation.func, image, output, bounds, halo, **params)
+        self._finish(generation, key, output)
@@ -0,0 +1,94 @@
+import cv2
+import numpy as np
+
+from kg_core.profiling import instrument
+
+
+POINT_KERNEL = np.array([[-1, -1, -1],
+                         [-1, 8, -1],
+                         [-1, -1, -1]])
+
+LINE_45_KERNEL = np.array([[2, -1, -1],
+                           [-1, 2, -1],
+                           [-1, -1, 2]])
+
+
+@instrument()
+def point_detection(image):
+    return cv2.filter2D(image, -1, POINT_KERNEL)
+
+
+@instrument()
+def line_detection_45(image):
+    return cv2.filter2D(image, -1, LINE_45_KERNEL)
+
+
+@instrument()
+def gradient_detection(image, method="sobel"):
+    grad_x = cv2.Sobel(image, cv2.CV_64F, 1, 0, ksize=3)
+    grad_y = cv2.Sobel(image, cv2.CV_64F, 0, 1, ksize=3)
+    gradient_magnitude = cv2.magnitude(grad_x, grad_y)
+    return np.uint8(gradient_magnitude)
+
+
+# Совмещённый проход: все отклики считаются по одной полосе строк, пока она лежит в кэше.
+# Промежуточные значения в int16 (|отклик| <= 9 * 255) и float32 только для модуля градиента.
+# Граница - отражение без повтора крайнего пикселя, как BORDER_REFLECT_101 у cv2 по умолчанию.
+DETECTIONS = ("points", "lines45", "gradient")
+OUTPUT_MODES = ("saturate", "abs")
+STRIP_ROWS = 64
+
+
+def _reflect_indices(start, stop, size):
+    indices = np.abs(np.arange(start, stop))
+    indices = np.where(indices >= size, 2 * (size - 1) - indices, indices)
+    return np.clip(indices, 0, size - 1)
+
+
+def _store(output, response, mode):
+    # saturate - как у cv2.filter2D для uint8 (отрицательное -> 0), abs - модуль отклика
+    if mode == "abs":
+        response = np.abs(response)
+    np.clip(response, 0, 255, out=response)
+    output[...] = response
+
+
+@instrument()
+def fused_detection(image, detections=DETECTIONS, mode="saturate", strip_rows=STRIP_ROWS, out=None):
+    image = np.asarray(image)
+    if image.ndim != 2:
+        raise ValueError(f"expected a grayscale image, got shape {image.shape}")
+    for name in detections:
+        if name not in DETECTIONS:
+            raise ValueError(f"unknown detection {name!r}, expected one of {', '.join(DETECTIONS)}")
+    if mode not in OUTPUT_MODES:
+        raise ValueError(f"unknown output mode {mode!r}, expected one of {', '.join(OUTPUT_MODES)}")
+
+    height, width = image.shape
+    if out is None:
+        out = {name: np.empty((height, width), dtype=np.uint8) for name in detections}
+    columns = _reflect_indices(-1, width + 1, width)
+
+    for y0 in range(0, height, strip_rows):
+        y1 = min(y0 + strip_rows, height)
+        strip = image.take(_reflect_indices(y0 - 1, y1 + 1, height), axis=0).take(columns, axis=1)
+        strip = strip.astype(np.int16)
+        center = strip[1:-1, 1:-1]
+
+        if "points" in detections or "lines45" in detections:
+            rows = strip[:-2] + strip[1:-1] + strip[2:]
+            box = rows[:, :-2] + rows[:, 1:-1] + rows[:, 2:]
+        if "points" in detections:
+            _store(out["points"][y0:y1], 9 * center - box, mode)
+        if "lines45" in detections:
+            diagonal = strip[:-2, :-2] + center + strip[2:, 2:]
+            _store(out["lines45"][y0:y1], 3 * diagonal - box, mode)
+        if "gradient" in detections:
+            vertical = strip[:-2] + 2 * strip[1:-1] + strip[2:]
+            horizontal = strip[:, :-2] + 2 * strip[:, 1:-1] + strip[:, 2:]
+            grad_x = (vertical[:, 2:] - vertical[:, :-2]).astype(np.float32)
+            grad_y = (horizontal[2:] - horizontal[:-2]).astype(np.float32)
+            # Модуль градиента неотрицателен, так что оба режима - это насыщение на 255 вместо переполнения uint8
+            magnitude = np.sqrt(grad_x * grad_x + grad_y * grad_y)
+            _store(out["gradient"][y0:y1], magnitude, mode)
+    return out
@@ -0,0 +1,84 @@
+import numpy as np
+
+from kg_core.operations import get_operation, halo_width
+from kg_core.profiling import instrument
+from kg_core.tiling import apply_tile, padded_bounds
+
+# Пересчёт только изменённых областей. Выходной пиксель зависит от входных в радиусе halo, поэтому
+# изменённый прямоугольник портит выход в прямоугольнике, расширенном на halo, а чтобы посчитать его,
+# apply_tile читает вход, расширенный ещё на halo. Остальной выход берётся из предыдущего результата,
+# и итог совпадает с полным пересчётом. Если изменилась заметная часть кадра, дешевле посчитать всё.
+
+CHANGE_BLOCK = 64
+FULL_RECOMPUTE_FRACTION = 0.5
+
+
+def _area(bounds):
+    y0, y1, x0, x1 = bounds
+    return max(y1 - y0, 0) * max(x1 - x0, 0)
+
+
+def _union(first, second):
+    return min(first[0], second[0]), max(first[1], second[1]), min(first[2], second[2]), max(first[3], second[3])
+
+
+def _overlap(first, second):
+    return first[0] < second[1] and second[0] < first[1] and first[2] < second[3] and second[2] < first[3]
+
+
+def affected_regions(shape, rectangles, halo):
+    # Пересекающиеся области объединяются, только если охватывающий прямоугольник читает не больше входа,
+    # чем обе по отдельности; иначе две далёкие правки по диагонали потянули бы за собой всё между ними
+    regions = [padded_bounds(shape, bounds, halo) for bounds in rectangles if _area(bounds) > 0]
+    merged = True
+    while merged:
+        merged = False
+        result = []
+        for region in sorted(regions):
+            padded = padded_bounds(shape, region, halo)
+            for i, other in enumerate(result):
+                union = _union(region, other)
+                other_padded = padded_bounds(shape, other, halo)
+                joined = padded_bounds(shape, union, halo)
+                if _overlap(padded, other_padded) and _area(joined) <= _area(padded) + _area(other_padded):
+                    result[i] = union
+                    merged = True
+                    break
+            else:
+                result.append(region)
+        regions = result
+    return regions
+
+
+def changed_rectangles(previous, image, block=CHANGE_BLOCK):
+    # Сравнение по блокам block x block: возвращает блоки, в которых изменился хотя бы один пиксель
+    if previous.shape != image.shape:
+        raise ValueError(f"image shape changed from {previous.shape} to {image.shape}")
+    height, width = image.shape[:2]
+    rows, columns = -(-height // block), -(-width // block)
+    changed = np.zeros((rows * block, columns * block), dtype=bool)
+    np.not_equal(previous, image, out=changed[:height, :width])
+    blocks = changed.reshape(rows, block, columns, block).any(axis=(1, 3))
+    return [(y * block, min((y + 1) * block, height), x * block, min((x + 1) * block, width))
+            for y, x in np.argwhere(blocks)]
+
+
+@instrument()
+def recompute_regions(name, image, previous, rectangles, out=None, **params):
+    # previous - результат операции для изображения до правки, rectangles - (y0, y1, x0, x1) изменённых областей
+    operation = get_operation(name)
+    if previous.shape != image.shape:
+        raise ValueError(f"previous result has shape {previous.shape}, image has {image.shape}")
+    if out is None:
+        out = previous.copy()
+    elif out is not previous:
+        np.copyto(out, previous)
+
+    if sum(_area(bounds) for bounds in rectangles) >= FULL_RECOMPUTE_FRACTION * image.size:
+        np.copyto(out, operation.func(image, **params))
+        return out
+
+    halo = halo_width(name, **params)
+    for bounds in affected_regions(image.shape, rectangles, halo):
+        apply_tile(operation.func, image, out, bounds, halo, **params)
+    return out
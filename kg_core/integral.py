@@ -0,0 +1,95 @@
+import cv2
+import numpy as np
+
+STRIP_ROWS = 256
+# Типы, которые умеет дополнять cv2.copyMakeBorder; остальные дополняются np.pad (reflect - то же отражение)
+CV_TYPES = tuple(np.dtype(dtype) for dtype in (np.uint8, np.int8, np.uint16, np.int16, np.int32, np.float32,
+                                               np.float64))
+
+
+def _integrate(values, out, square=False):
+    # Таблица сумм полосами строк: приведение к int64 и копии, которые numpy делает при пересечении
+    # входа и выхода, занимают одну полосу, а не всё изображение
+    for start in range(0, values.shape[0], STRIP_ROWS):
+        block = values[start:start + STRIP_ROWS]
+        if square:
+            # Квадраты 8-битных пикселей помещаются в uint16, остальных - только в тип таблицы
+            block = np.square(block, dtype=np.uint16 if values.dtype == np.uint8 else out.dtype)
+        strip = out[start:start + STRIP_ROWS]
+        np.cumsum(block, axis=1, dtype=out.dtype, out=strip)
+        np.cumsum(strip, axis=0, out=strip)
+        if start:
+            strip += out[start - 1]
+
+
+class IntegralImage:
+    # Таблицы сумм I и I^2 в int64 по изображению, дополненному отражением: локальные среднее и отклонение
+    # для окна любого размера считаются за O(1) на пиксель. Окна те же, что у cv2.blur: w x w с якорем w // 2
+    # и границей BORDER_REFLECT_101, так что у чётного окна до пикселя на один ряд больше, чем после.
+    # Точные int64-таблицы - для целых пикселей до 16 бит, для float и более широких целых таблицы в float64.
+
+    def __init__(self, image):
+        self.image = np.asarray(image)
+        if self.image.dtype == np.bool_:
+            self.image = self.image.view(np.uint8)
+        self.shape = self.image.shape
+        if np.issubdtype(self.image.dtype, np.integer) and self.image.dtype.itemsize <= 2:
+            info = np.iinfo(self.image.dtype)
+            self.dtype, self.largest = np.dtype(np.int64), max(-int(info.min), int(info.max))
+        else:
+            self.dtype, self.largest = np.dtype(np.float64), None
+        self.padding = -1
+        self.sums = None
+        self.square_sums = None
+        self._statistics = {}
+
+    def _build(self, padding):
+        # Поля с запасом подходят и окнам поменьше: отражённые пиксели зависят только от своей координаты
+        if self.image.dtype in CV_TYPES:
+            padded = cv2.copyMakeBorder(self.image, padding, padding, padding, padding, cv2.BORDER_REFLECT_101)
+        else:
+            padded = np.pad(self.image, padding, mode="reflect")
+        self.sums = np.zeros((padded.shape[0] + 1, padded.shape[1] + 1), dtype=self.dtype)
+        self.square_sums = np.zeros_like(self.sums)
+        _integrate(padded, self.sums[1:, 1:])
+        _integrate(padded, self.square_sums[1:, 1:], square=True)
+        self.padding = padding
+
+    def _box(self, table, window_size):
+        # Суммы окон срезами таблицы, без копий строк и столбцов
+        start = self.padding - window_size // 2
+        height, width = self.shape
+        top, bottom = slice(start, start + height), slice(start + window_size, start + window_size + height)
+        left, right = slice(start, start + width), slice(start + window_size, start + window_size + width)
+        total = table[bottom, right] - table[top, right]
+        total -= table[bottom, left]
+        total += table[top, left]
+        return total
+
+    def window_sums(self, window_size):
+        if self.padding < window_size // 2:
+            self._build(window_size // 2)
+        count = window_size * window_size
+        return count, self._box(self.sums, window_size), self._box(self.square_sums, window_size)
+
+    def mean_std(self, window_size):
+        if window_size not in self._statistics:
+            count, total, square_total = self.window_sums(window_size)
+            mean = total / count
+            # n * sum(I^2) - sum(I)^2 считается точно в целых, без вычитания близких float, пока помещается в int64
+            exact = self.largest is not None and count * count * self.largest ** 2 < 2 ** 63
+            if not exact:
+                total, square_total = total.astype(np.float64, copy=False), square_total.astype(np.float64, copy=False)
+            square_total *= count
+            square_total -= np.square(total, out=total)
+            del total
+            if not exact:
+                # Округление float может увести разность чуть ниже нуля
+                np.maximum(square_total, 0, out=square_total)
+            std = np.sqrt(square_total)
+            std /= count
+            self._statistics[window_size] = (mean, std)
+        return self._statistics[window_size]
+
+    def clear_statistics(self):
+        self._statistics.clear()
@@ -0,0 +1,40 @@
+import inspect
+from collections import namedtuple
+
+from kg_core import filters, threshold
+
+# Порог Вульфа сюда не входит: он зависит от глобальных статистик и не считается по тайлам.
+# halo - сколько соседних пикселей с каждой стороны нужно фильтру, чтобы посчитать один выходной пиксель
+Operation = namedtuple("Operation", ["func", "halo"])
+
+OPERATIONS = {
+    "bernsen": Operation(threshold.bernsen_threshold, lambda window_size=15, **_: window_size // 2),
+    "niblack": Operation(threshold.niblack_threshold, lambda window_size=15, **_: window_size // 2),
+    "sauvola": Operation(threshold.sauvola_threshold, lambda window_size=15, **_: window_size // 2),
+    "points": Operation(filters.point_detection, lambda **_: 1),
+    "lines45": Operation(filters.line_detection_45, lambda **_: 1),
+    "gradient": Operation(filters.gradient_detection, lambda **_: 1),
+}
+
+
+def get_operation(name):
+    try:
+        return OPERATIONS[name]
+    except KeyError:
+        raise ValueError(f"unknown operation {name!r}, expected one of {', '.join(OPERATIONS)}") from None
+
+
+def run(name, image, **params):
+    return get_operation(name).func(image, **params)
+
+
+def halo_width(name, **params):
+    return get_operation(name).halo(**params)
+
+
+def normalize_params(name, **params):
+    # Параметры с подставленными значениями по умолчанию: пропущенный и явно переданный window_size=15
+    # дают один ключ кэша. integral - готовые таблицы того же изображения, на результат он не влияет
+    arguments = inspect.signature(get_operation(name).func).bind(None, **params)
+    arguments.apply_defaults()
+    return {key: value for key, value in list(arguments.arguments.items())[1:] if key != "integral"}
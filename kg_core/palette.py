@@ -0,0 +1,181 @@
+import heapq
+import itertools
+
+import numpy as np
+
+from kg_core import color
+from kg_core.color_lut import TABLE_SIZE, rgb_index
+
+# Ближайший цвет палитры для каждого пикселя. Пространство поиска делится на сетку ячеек,
+# и для каждой ячейки один раз считается список цветов палитры, которые могут оказаться ближайшими
+# хоть к одной её точке. Запрос перебирает только кандидатов своей ячейки, а одинаковые цвета
+# изображения ищутся один раз.
+#
+# Расстояние евклидово: в RGB по самим значениям 0..255, в HSV - в конусе (S*V*cos H, S*V*sin H, V),
+# чтобы оттенок был круговым и не имел значения для серых цветов.
+
+SPACES = {
+    "rgb": (np.zeros(3), np.full(3, 255.0)),
+    "hsv": (np.array([-1.0, -1.0, 0.0]), np.ones(3)),
+}
+QUERY_BYTES = 64 << 20
+
+
+def to_space(rgb, space="rgb"):
+    rgb = np.asarray(rgb)
+    if rgb.shape[-1] != 3:
+        raise ValueError(f"expected 3 channels in the last axis, got shape {rgb.shape}")
+    if space == "rgb":
+        return rgb.astype(np.float64)
+    if space == "hsv":
+        r, g, b = (rgb[..., i] / 255.0 for i in range(3))
+        h, s, v = color._rgb_to_hsv_unit(r, g, b)
+        angle = np.radians(h)
+        return np.stack([s * v * np.cos(angle), s * v * np.sin(angle), v], axis=-1)
+    raise ValueError(f"unknown color space {space!r}, expected one of {', '.join(SPACES)}")
+
+
+def _unique_colors(rgb):
+    keys = rgb_index(rgb.reshape(-1, 3))
+    if len(keys) < TABLE_SIZE // 16:
+        return np.unique(keys, return_inverse=True)
+    # Для больших изображений таблица на все 2^24 цвета быстрее сортировки
+    present = np.zeros(TABLE_SIZE, dtype=bool)
+    present[keys] = True
+    unique = np.flatnonzero(present).astype(np.uint32)
+    lookup = np.empty(TABLE_SIZE, dtype=np.int32)
+    lookup[unique] = np.arange(len(unique), dtype=np.int32)
+    return unique, lookup[keys]
+
+
+def _keys_to_rgb(keys):
+    return np.stack([keys >> 16, (keys >> 8) & 0xFF, keys & 0xFF], axis=-1).astype(np.uint8)
+
+
+class PaletteIndex:
+    def __init__(self, palette, space="rgb", cells_per_axis=None):
+        self.palette = np.asarray(palette, dtype=np.uint8).reshape(-1, 3)
+        if not len(self.palette):
+            raise ValueError("palette is empty")
+        self.space = space
+        self.points = to_space(self.palette, space)
+        self.low, self.high = SPACES[space]
+        self.cells = cells_per_axis or min(64, max(32, round(3 * len(self.palette) ** (1 / 3))))
+        self.cell_size = (self.high - self.low) / self.cells
+        self.candidates = self._build_candidates()
+
+    def _build_candidates(self):
+        edges = self.low + np.arange(self.cells + 1)[:, None] * self.cell_size
+        low, high = edges[:-1, None, :], edges[1:, None, :]
+        points = self.points[None, :, :]
+        # Квадраты расстояний раскладываются по осям, поэтому считаются для каждой оси отдельно
+        # и складываются уже для целого слоя ячеек: (ячейки по x) x (ячейки по y) x (ячейки по z) x (цвета)
+        gap = np.maximum(np.maximum(low - points, points - high), 0) ** 2
+        center = ((low + high) / 2 - points) ** 2
+        half_diagonal = np.sqrt(((self.cell_size / 2) ** 2).sum())
+
+        rows = []
+        for x in range(self.cells):
+            near = gap[x, :, 0][None, None, :] + gap[:, None, :, 1] + gap[None, :, :, 2]
+            distance = center[x, :, 0][None, None, :] + center[:, None, :, 1] + center[None, :, :, 2]
+            # Ни одна точка ячейки не дальше ближайшего к её центру цвета больше, чем на (расстояние + полудиагональ)
+            bound = (np.sqrt(distance.min(axis=-1)) + half_diagonal) ** 2
+            mask = near <= bound[..., None] * (1 + 1e-9) + 1e-9
+            rows.extend(np.flatnonzero(row) for row in mask.reshape(-1, len(self.points)))
+
+        # Короткие списки дополняются своим первым элементом: argmin всё равно вернёт первое вхождение
+        self.lengths = np.array([len(row) for row in rows])
+        candidates = np.empty((len(rows), self.lengths.max()), dtype=np.int32)
+        for i, row in enumerate(rows):
+            candidates[i, :len(row)] = row
+            candidates[i, len(row):] = row[0]
+        return candidates
+
+    def _cell_ids(self, points):
+        cells = np.floor((points - self.low) / self.cell_size).astype(np.int64)
+        np.clip(cells, 0, self.cells - 1, out=cells)
+        return (cells[:, 0] * self.cells + cells[:, 1]) * self.cells + cells[:, 2]
+
+    def nearest_points(self, points):
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        result = np.empty(len(points), dtype=np.int32)
+        cells = self._cell_ids(points)
+        # Списки кандидатов сильно различаются по длине, поэтому запросы группируются по ширине,
+        # округлённой до степени двойки, и в каждой группе читается только нужная часть строк
+        widths = 1 << np.ceil(np.log2(self.lengths[cells])).astype(np.int64)
+        for width in np.unique(widths):
+            selected = np.flatnonzero(widths == width)
+            step = max(1, QUERY_BYTES // (int(width) * 3 * 8))
+            for start in range(0, len(selected), step):
+                rows = selected[start:start + step]
+                candidates = self.candidates[cells[rows], :width]
+                distances = ((self.points[candidates] - points[rows, None, :]) ** 2).sum(axis=-1)
+                result[rows] = candidates[np.arange(len(rows)), distances.argmin(axis=1)]
+        return result
+
+    def nearest(self, rgb):
+        rgb = np.asarray(rgb)
+        unique, inverse = _unique_colors(rgb)
+        found = self.nearest_points(to_space(_keys_to_rgb(unique), self.space))
+        return found[inverse].reshape(rgb.shape[:-1])
+
+    def quantize(self, rgb):
+        return self.palette[self.nearest(rgb)]
+
+
+def _pixels(rgb, sample, seed):
+    pixels = np.asarray(rgb, dtype=np.uint8).reshape(-1, 3)
+    if sample and len(pixels) > sample:
+        pixels = pixels[np.random.default_rng(seed).choice(len(pixels), sample, replace=False)]
+    return pixels
+
+
+def median_cut(rgb, colors=256, sample=1 << 18, seed=0):
+    pixels = _pixels(rgb, sample, seed)
+    if not len(pixels):
+        raise ValueError("no pixels to build a palette from")
+
+    # Каждый раз делится коробка с наибольшим (разброс по оси * число пикселей), пополам по медиане
+    order_counter = itertools.count()
+
+    def entry(box):
+        spread = box.max(axis=0).astype(np.int64) - box.min(axis=0)
+        return -int(spread.max()) * len(box), next(order_counter), box, int(spread.argmax())
+
+    heap = [entry(pixels)]
+    while len(heap) < colors:
+        score, order, box, axis = heapq.heappop(heap)
+        if score == 0:
+            heapq.heappush(heap, (score, order, box, axis))
+            break
+        order = np.argsort(box[:, axis], kind="stable")
+        half = len(box) // 2
+        heapq.heappush(heap, entry(box[order[:half]]))
+        heapq.heappush(heap, entry(box[order[half:]]))
+
+    return np.array([np.rint(box.mean(axis=0)) for _, _, box, _ in heap], dtype=np.uint8)
+
+
+def kmeans(rgb, colors=256, iterations=8, space="rgb", sample=1 << 18, seed=0):
+    # Старт с median cut, шаг назначения - через PaletteIndex, центры усредняются в RGB
+    pixels = _pixels(rgb, sample, seed)
+    palette = median_cut(pixels, colors, sample=None)
+    unique, inverse = _unique_colors(pixels)
+    weights = np.bincount(inverse, minlength=len(unique)).astype(np.float64)
+    unique_rgb = _keys_to_rgb(unique)
+    unique_points = to_space(unique_rgb, space)
+
+    for _ in range(iterations):
+        labels = PaletteIndex(palette, space).nearest_points(unique_points)
+        counts = np.bincount(labels, weights=weights, minlength=len(palette))
+        sums = np.stack([np.bincount(labels, weights=weights * unique_rgb[:, i], minlength=len(palette))
+                         for i in range(3)], axis=-1)
+        # Пустой кластер сохраняет прежний центр
+        updated = palette.astype(np.float64)
+        filled = counts > 0
+        updated[filled] = sums[filled] / counts[filled, None]
+        updated = np.rint(updated).astype(np.uint8)
+        if np.array_equal(updated, palette):
+            break
+        palette = updated
+    return palette
@@ -0,0 +1,78 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from kg_core.operations import get_operation, halo_width
+from kg_core.tiling import apply_tile
+
+# Изображение режется на горизонтальные полосы с перекрытием halo. numpy и cv2 отпускают GIL,
+# поэтому по умолчанию полосы считаются в потоках; для чисто питоновских путей есть пул процессов,
+# который получает пиксели через shared memory, а не через pickle.
+
+STRIPS_PER_WORKER = 4
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def strips(height, width, count):
+    step = max(1, -(-height // count))
+    return [(y0, min(y0 + step, height), 0, width) for y0 in range(0, height, step)]
+
+
+def _apply_shared(operation, input_name, output_name, shape, bounds, params):
+    input_memory = shared_memory.SharedMemory(name=input_name)
+    output_memory = shared_memory.SharedMemory(name=output_name)
+    try:
+        image = np.ndarray(shape, dtype=np.uint8, buffer=input_memory.buf)
+        output = np.ndarray(shape, dtype=np.uint8, buffer=output_memory.buf)
+        apply_tile(get_operation(operation).func, image, output, bounds, halo_width(operation, **params), **params)
+        del image, output
+    finally:
+        input_memory.close()
+        output_memory.close()
+
+
+def _run_threads(operation, image, output, bounds_list, workers, params):
+    func = get_operation(operation).func
+    halo = halo_width(operation, **params)
+    with ThreadPoolExecutor(workers) as pool:
+        for future in [pool.submit(apply_tile, func, image, output, bounds, halo, **params) for bounds in bounds_list]:
+            future.result()
+
+
+def _run_processes(operation, image, output, bounds_list, workers, params):
+    input_memory = shared_memory.SharedMemory(create=True, size=max(image.nbytes, 1))
+    output_memory = shared_memory.SharedMemory(create=True, size=max(image.nbytes, 1))
+    try:
+        shared_input = np.ndarray(image.shape, dtype=np.uint8, buffer=input_memory.buf)
+        shared_input[...] = image
+        with ProcessPoolExecutor(workers) as pool:
+            for future in [pool.submit(_apply_shared, operation, input_memory.name, output_memory.name,
+                                       image.shape, bounds, params) for bounds in bounds_list]:
+                future.result()
+        output[...] = np.ndarray(image.shape, dtype=np.uint8, buffer=output_memory.buf)
+        del shared_input
+    finally:
+        input_memory.close()
+        input_memory.unlink()
+        output_memory.close()
+        output_memory.unlink()
+
+
+def apply_parallel(operation, image, output=None, workers=None, backend="thread", **params):
+    workers = workers or default_workers()
+    if output is None:
+        output = np.empty(image.shape, dtype=np.uint8)
+    bounds_list = strips(image.shape[0], image.shape[1], workers * STRIPS_PER_WORKER)
+
+    if backend == "thread":
+        _run_threads(operation, image, output, bounds_list, workers, params)
+    elif backend == "process":
+        _run_processes(operation, image, output, bounds_list, workers, params)
+    else:
+        raise ValueError(f"unknown backend {backend!r}, expected 'thread' or 'process'")
+    return output
@@ -0,0 +1,155 @@
+import atexit
+import contextlib
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+# Включаемая по требованию разметка горячих путей: время этапов, число вызовов и, по желанию,
+# байты временных буферов (через tracemalloc, он видит и буферы numpy). Пока запись выключена,
+# обёртка instrument стоит одну проверку глобальной переменной, а stage отдаёт общий пустой контекст.
+# Результат - файл chrome://tracing (он же Perfetto) и текстовая сводка.
+# Пик tracemalloc общий на процесс: если этапы в разных потоках перекрываются, байты одного попадают
+# в другой, поэтому у таких этапов вместо temporary_bytes пишется allocations="overlapped". Выделения
+# потока вне всяких этапов так не заметить - точные цифры памяти получаются, пока размечен один поток.
+
+ENVIRONMENT_VARIABLE = "KG_CORE_PROFILE"
+
+_recorder = None
+_disabled_stage = contextlib.nullcontext()
+
+
+class Recorder:
+    def __init__(self, track_allocations=False):
+        self.track_allocations = track_allocations
+        self.events = []
+        self.local = threading.local()
+        # Открытые этапы всех потоков: по ним видно, что замеры памяти перекрылись
+        self.stacks = {}
+        self.lock = threading.Lock()
+        self.origin = time.perf_counter_ns()
+        self.started_tracing = track_allocations and not tracemalloc.is_tracing()
+        if self.started_tracing:
+            tracemalloc.start()
+
+    @contextlib.contextmanager
+    def stage(self, name, **args):
+        stack = getattr(self.local, "stack", None)
+        if stack is None:
+            stack = self.local.stack = []
+            with self.lock:
+                self.stacks[threading.get_ident()] = stack
+        frame = {"peak": 0, "current": 0, "overlapped": False}
+        if self.track_allocations:
+            with self.lock:
+                if any(frames for thread, frames in self.stacks.items() if thread != threading.get_ident()):
+                    frame["overlapped"] = True
+                    for frames in self.stacks.values():
+                        for other in frames:
+                            other["overlapped"] = True
+            # Пик у tracemalloc один на процесс: перед сбросом он сохраняется во внешнем этапе
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1]["peak"] = max(stack[-1]["peak"], peak)
+            tracemalloc.reset_peak()
+            frame["current"] = current
+        stack.append(frame)
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter_ns() - start
+            with self.lock:
+                stack.pop()
+            if self.track_allocations:
+                peak = max(frame["peak"], tracemalloc.get_traced_memory()[1])
+                if frame["overlapped"]:
+                    args["allocations"] = "overlapped"
+                else:
+                    args["temporary_bytes"] = peak - frame["current"]
+                if stack:
+                    stack[-1]["peak"] = max(stack[-1]["peak"], peak)
+            self.events.append((name, threading.get_ident(), start - self.origin, duration, args))
+
+    def summary(self):
+        stages = {}
+        for name, _, _, duration, args in self.events:
+            calls, total, longest, temporary, overlapped = stages.get(name, (0, 0, 0, 0, 0))
+            stages[name] = (calls + 1, total + duration, max(longest, duration),
+                            max(temporary, args.get("temporary_bytes", 0)),
+                            overlapped + ("allocations" in args))
+
+        lines = [f"{'stage':<40} {'calls':>8} {'total ms':>10} {'mean ms':>9} {'max ms':>9} {'peak temp MB':>13} "
+                 f"{'overlapped':>10}"]
+        for name, (calls, total, longest, temporary, overlapped) in sorted(stages.items(),
+                                                                            key=lambda item: -item[1][1]):
+            lines.append(f"{name:<40} {calls:>8} {total / 1e6:>10.2f} {total / calls / 1e6:>9.3f} "
+                         f"{longest / 1e6:>9.3f} {temporary / 1e6:>13.1f} {overlapped:>10}")
+        return "\n".join(lines)
+
+    def chrome_trace(self):
+        pid = os.getpid()
+        events = [{"name": name, "ph": "X", "ts": start / 1000, "dur": duration / 1000, "pid": pid, "tid": tid,
+                   "args": args}
+                  for name, tid, start, duration, args in self.events]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path):
+        with open(path, "w") as file:
+            json.dump(self.chrome_trace(), file)
+
+
+def enable(track_allocations=False):
+    global _recorder
+    _recorder = Recorder(track_allocations)
+    return _recorder
+
+
+def disable():
+    global _recorder
+    previous, _recorder = _recorder, None
+    if previous is not None and previous.started_tracing:
+        tracemalloc.stop()
+    return previous
+
+
+def recorder():
+    return _recorder
+
+
+def stage(name, **args):
+    if _recorder is None:
+        return _disabled_stage
+    return _recorder.stage(name, **args)
+
+
+def instrument(name=None):
+    def decorate(func):
+        label = name or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _recorder is None:
+                return func(*args, **kwargs)
+            with _recorder.stage(label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def enable_from_environment():
+    # KG_CORE_PROFILE=trace.json включает запись с учётом памяти; при выходе пишется трасса и сводка в stderr
+    path = os.environ.get(ENVIRONMENT_VARIABLE)
+    if not path:
+        return None
+    enabled = enable(track_allocations=True)
+
+    def finish():
+        enabled.write_chrome_trace(path)
+        print(enabled.summary(), file=sys.stderr)
+        print(f"trace written to {path}", file=sys.stderr)
+    atexit.register(finish)
+    return enabled
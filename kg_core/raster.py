@@ -0,0 +1,658 @@
+import math
+from functools import lru_cache
+
+import numpy as np
+
+from kg_core.profiling import instrument
+
+
+@instrument()
+def bresenham(x1, y1, x2, y2):
+    points = []
+    dx = x2 - x1
+    dy = y2 - y1
+    sx = 1 if dx > 0 else -1
+    sy = 1 if dy > 0 else -1
+    dx = abs(dx)
+    dy = abs(dy)
+
+    if dx > dy:
+        err = dx / 2.0
+        while x1 != x2:
+            points.append((x1, y1))
+            err -= dy
+            if err < 0:
+                y1 += sy
+                err += dx
+            x1 += sx
+    else:
+        err = dy / 2.0
+        while y1 != y2:
+            points.append((x1, y1))
+            err -= dx
+            if err < 0:
+                x1 += sx
+                err += dy
+            y1 += sy
+    points.append((x2, y2))
+    return points
+
+
+@instrument()
+def bresenham_circle(x_center, y_center, radius):
+    points = []
+    x = radius
+    y = 0
+    decision_parameter = 1 - radius
+
+    while x >= y:
+        points.extend([
+            (x_center + x, y_center + y),
+            (x_center - x, y_center + y),
+            (x_center + x, y_center - y),
+            (x_center - x, y_center - y),
+            (x_center + y, y_center + x),
+            (x_center - y, y_center + x),
+            (x_center + y, y_center - x),
+            (x_center - y, y_center - x)
+        ])
+        y += 1
+        if decision_parameter <= 0:
+            decision_parameter += 2 * y + 1
+        else:
+            x -= 1
+            decision_parameter += 2 * (y - x) + 1
+
+    return points
+
+
+def _minor_shift(major, minor, step):
+    return -((major - 2 * minor * step) // np.maximum(2 * major, 1))
+
+
+@instrument()
+def bresenham_batch(segments):
+    # Целочисленная форма той же схемы: ошибка хранится удвоенной (E = 2 * err), и после
+    # i шагов по главной оси смещение по второй оси равно ceil((2 * minor * i - major) / (2 * major)).
+    # Это даёт те же пиксели, что и bresenham, без цикла по шагам.
+    segments = np.asarray(segments, dtype=np.int64).reshape(-1, 4)
+    x1, y1, x2, y2 = segments.T
+    dx = x2 - x1
+    dy = y2 - y1
+    sx = np.where(dx > 0, 1, -1)
+    sy = np.where(dy > 0, 1, -1)
+    dx = np.abs(dx)
+    dy = np.abs(dy)
+
+    x_major = dx > dy
+    major = np.where(x_major, dx, dy)
+    minor = np.where(x_major, dy, dx)
+
+    lengths = major + 1
+    offsets = np.zeros(len(segments) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+
+    segment = np.repeat(np.arange(len(segments)), lengths)
+    step = np.arange(offsets[-1], dtype=np.int64) - offsets[segment]
+    major_px = major[segment]
+    shift = _minor_shift(major_px, minor[segment], step)
+
+    x_major_px = x_major[segment]
+    points = np.empty((offsets[-1], 2), dtype=np.int64)
+    points[:, 0] = x1[segment] + sx[segment] * np.where(x_major_px, step, shift)
+    points[:, 1] = y1[segment] + sy[segment] * np.where(x_major_px, shift, step)
+    return points, offsets
+
+
+def draw_points(raster, points, value=255):
+    # Точки за пределами растра отбрасываются; x - столбец, y - строка
+    x = points[:, 0]
+    y = points[:, 1]
+    inside = (x >= 0) & (x < raster.shape[1]) & (y >= 0) & (y < raster.shape[0])
+    raster[y[inside], x[inside]] = value
+    return raster
+
+
+def draw_segments(raster, segments, value=255):
+    points, _ = bresenham_batch(segments)
+    return draw_points(raster, points, value)
+
+
+# Заливка окружностей и эллипсов. Фигура описывается отрезками строк (y, x_start, x_end),
+# x_end включительно; полуширина каждой строки берётся из контура, так что граница заливки
+# совпадает с контуром bresenham_circle.
+
+def _frozen(points):
+    # Результаты кэшируются и раздаются всем вызовам, поэтому массивы делаются только для чтения
+    points = np.array(points, dtype=np.int64).reshape(-1, 2)
+    points.flags.writeable = False
+    return points
+
+
+def _circle_x(radius, y):
+    # x, который bresenham_circle выбирает в строке y: isqrt(t) или isqrt(t) + 1, если t >= x^2 + x,
+    # где t = r^2 - y^2. Целочисленный корень из float поправляется на единицу в обе стороны.
+    t = radius * radius - y * y
+    x = np.floor(np.sqrt(np.maximum(t, 0))).astype(np.int64)
+    x -= x * x > t
+    x += (x + 1) * (x + 1) <= t
+    return x + (x * x + x <= t)
+
+
+def _circle_octant_length(radius):
+    if radius <= 0:
+        return 1 if radius == 0 else 0
+    y = int(radius / math.sqrt(2))
+    while _circle_x(radius, y + 1) >= y + 1:
+        y += 1
+    while _circle_x(radius, y) < y:
+        y -= 1
+    return y + 1
+
+
+def _circle_octant_chunk(radius, start, stop):
+    y = np.arange(start, stop, dtype=np.int64)
+    x = np.zeros_like(y) if radius == 0 else _circle_x(radius, y)
+    return np.column_stack([x, y])
+
+
+@lru_cache(maxsize=256)
+def _circle_octant(radius):
+    return _frozen(_circle_octant_chunk(radius, 0, _circle_octant_length(radius)))
+
+
+@lru_cache(maxsize=256)
+def _ellipse_quadrant(a, b):
+    # Целочисленный алгоритм средней точки для эллипса, все решающие параметры умножены на 4
+    if b == 0:
+        return _frozen([(x, 0) for x in range(a + 1)])
+
+    points = []
+    a2 = a * a
+    b2 = b * b
+    x = 0
+    y = b
+    dx = 0
+    dy = 2 * a2 * y
+
+    decision_parameter = 4 * b2 - 4 * a2 * b + a2
+    while dx < dy:
+        points.append((x, y))
+        x += 1
+        dx += 2 * b2
+        if decision_parameter < 0:
+            decision_parameter += 4 * (dx + b2)
+        else:
+            y -= 1
+            dy -= 2 * a2
+            decision_parameter += 4 * (dx - dy + b2)
+
+    decision_parameter = b2 * (2 * x + 1) ** 2 + 4 * a2 * (y - 1) ** 2 - 4 * a2 * b2
+    while y >= 0:
+        points.append((x, y))
+        y -= 1
+        dy -= 2 * a2
+        if decision_parameter > 0:
+            decision_parameter += 4 * (a2 - dy)
+        else:
+            x += 1
+            dx += 2 * b2
+            decision_parameter += 4 * (dx - dy + a2)
+    return _frozen(points)
+
+
+def _mirror(points, x_center, y_center):
+    x = points[:, 0]
+    y = points[:, 1]
+    mirrored = np.concatenate([np.column_stack([sx * x, sy * y]) for sx in (1, -1) for sy in (1, -1)])
+    return np.unique(mirrored, axis=0) + [x_center, y_center]
+
+
+def _spans_from_half_widths(rows, half_widths, x_center, y_center):
+    # Для каждой строки берётся наибольшая полуширина среди точек контура в этой строке
+    widest = np.full(rows.max() - rows.min() + 1, -1, dtype=np.int64)
+    np.maximum.at(widest, rows - rows.min(), half_widths)
+    dy = np.flatnonzero(widest >= 0) + rows.min()
+    half = widest[dy - rows.min()]
+    return np.column_stack([y_center + dy, x_center - half, x_center + half])
+
+
+def _circle_points(radius):
+    octant = _circle_octant(radius)
+    return np.concatenate([octant, octant[:, ::-1]])
+
+
+def circle_outline(x_center, y_center, radius):
+    if radius < 0:
+        return np.empty((0, 2), dtype=np.int64)
+    return _mirror(_circle_points(radius), x_center, y_center)
+
+
+@instrument()
+def circle_spans(x_center, y_center, radius):
+    if radius < 0:
+        return np.empty((0, 3), dtype=np.int64)
+    points = _circle_points(radius)
+    rows = np.concatenate([points[:, 1], -points[:, 1]])
+    return _spans_from_half_widths(rows, np.concatenate([points[:, 0], points[:, 0]]), x_center, y_center)
+
+
+def ellipse_outline(x_center, y_center, a, b):
+    if a < 0 or b < 0:
+        return np.empty((0, 2), dtype=np.int64)
+    return _mirror(_ellipse_quadrant(a, b), x_center, y_center)
+
+
+@instrument()
+def ellipse_spans(x_center, y_center, a, b):
+    if a < 0 or b < 0:
+        return np.empty((0, 3), dtype=np.int64)
+    points = _ellipse_quadrant(a, b)
+    rows = np.concatenate([points[:, 1], -points[:, 1]])
+    return _spans_from_half_widths(rows, np.concatenate([points[:, 0], points[:, 0]]), x_center, y_center)
+
+
+def clip_spans(spans, shape):
+    spans = np.asarray(spans, dtype=np.int64).reshape(-1, 3)
+    y = spans[:, 0]
+    x_start = np.maximum(spans[:, 1], 0)
+    x_end = np.minimum(spans[:, 2], shape[1] - 1)
+    keep = (y >= 0) & (y < shape[0]) & (x_start <= x_end)
+    return np.column_stack([y[keep], x_start[keep], x_end[keep]])
+
+
+def fill_spans(mask, spans, value=255):
+    for y, x_start, x_end in clip_spans(spans, mask.shape).tolist():
+        mask[y, x_start:x_end + 1] = value
+    return mask
+
+
+SPAN_STRIP_PIXELS = 1 << 20
+
+
+def _covered_rows(spans, shape):
+    # Без цикла по отрезкам: +1 в начале и -1 после конца каждого отрезка, затем накопленная сумма по строке.
+    # Разностный массив заводится на полосу строк примерно в SPAN_STRIP_PIXELS пикселей, а полосы без отрезков
+    # пропускаются, так что память не зависит ни от размера маски, ни от числа отрезков. Выдаёт
+    # (первая строка, покрытие полосы).
+    spans = clip_spans(spans, shape)
+    if not len(spans):
+        return
+    stride = shape[1] + 1
+    strip_rows = max(1, SPAN_STRIP_PIXELS // stride)
+    strip = spans[:, 0] // strip_rows
+    strips = int(strip.max()) + 1
+    # Устойчивая сортировка коротких целых - поразрядная, это быстрее общей сортировки по строкам
+    order = np.argsort(strip.astype(np.int16) if strips <= 1 << 15 else strip, kind="stable")
+    spans = spans[order]
+    bounds = np.searchsorted(strip[order], np.arange(strips + 1))
+    for index in np.flatnonzero(np.diff(bounds)):
+        first = index * strip_rows
+        rows = min(strip_rows, shape[0] - first)
+        y, x_start, x_end = spans[bounds[index]:bounds[index + 1]].T
+        key = (y - first) * stride
+        difference = np.bincount(key + x_start, minlength=rows * stride)
+        difference -= np.bincount(key + x_end + 1, minlength=rows * stride)
+        yield first, np.cumsum(difference.reshape(rows, stride), axis=1)[:, :shape[1]] > 0
+
+
+def spans_to_mask(spans, shape):
+    mask = np.zeros(shape, dtype=bool)
+    for first, covered in _covered_rows(spans, shape):
+        mask[first:first + len(covered)] = covered
+    return mask
+
+
+def stamp_disks(mask, centers, radius, value=255):
+    centers = np.asarray(centers, dtype=np.int64).reshape(-1, 2)
+    disk = circle_spans(0, 0, radius)
+    spans = np.repeat(centers[:, [1, 0, 0]], len(disk), axis=0) + np.tile(disk, (len(centers), 1))
+    for first, covered in _covered_rows(spans, mask.shape):
+        mask[first:first + len(covered)][covered] = value
+    return mask
+
+
+# Потоковая растеризация с отсечением. Пиксели выдаются кусками по chunk_size, и в куски
+# попадают только видимые: диапазон шагов, попадающих в прямоугольник отсечения, находится
+# заранее (параметрическое отсечение в духе Лианга-Барски, но по номеру шага Брезенхема),
+# а ошибка на первом видимом шаге считается по той же формуле, что и в bresenham_batch.
+
+CHUNK_SIZE = 1 << 16
+
+
+def _axis_range(origin, sign, low, high):
+    return (low - origin, high - origin) if sign > 0 else (origin - high, origin - low)
+
+
+def _line_step_range(major, minor, origin_major, origin_minor, sign_major, sign_minor, clip):
+    first, last = 0, major
+    if clip is None:
+        return first, last
+    low, high = _axis_range(origin_major, sign_major, *clip[0::2])
+    first, last = max(first, low), min(last, high)
+    shift_low, shift_high = _axis_range(origin_minor, sign_minor, *clip[1::2])
+
+    if minor == 0:
+        # Смещение по второй оси всегда 0
+        return (first, last) if shift_low <= 0 <= shift_high else (1, 0)
+    # shift(i) >= k  <=>  i >= floor(major * (2k - 1) / (2 * minor)) + 1
+    # shift(i) <= k  <=>  i <= floor(major * (2k + 1) / (2 * minor))
+    first = max(first, major * (2 * shift_low - 1) // (2 * minor) + 1)
+    last = min(last, major * (2 * shift_high + 1) // (2 * minor))
+    return first, last
+
+
+def iter_line_chunks(x1, y1, x2, y2, clip=None, chunk_size=CHUNK_SIZE):
+    # clip = (x_min, y_min, x_max, y_max), границы включительно
+    dx = x2 - x1
+    dy = y2 - y1
+    sx = 1 if dx > 0 else -1
+    sy = 1 if dy > 0 else -1
+    dx = abs(dx)
+    dy = abs(dy)
+
+    x_major = dx > dy
+    if x_major:
+        major, minor, origin_major, origin_minor, sign_major, sign_minor = dx, dy, x1, y1, sx, sy
+        axes_clip = clip
+    else:
+        major, minor, origin_major, origin_minor, sign_major, sign_minor = dy, dx, y1, x1, sy, sx
+        axes_clip = None if clip is None else (clip[1], clip[0], clip[3], clip[2])
+
+    first, last = _line_step_range(major, minor, origin_major, origin_minor, sign_major, sign_minor, axes_clip)
+    for start in range(first, last + 1, chunk_size):
+        step = np.arange(start, min(start + chunk_size, last + 1), dtype=np.int64)
+        shift = _minor_shift(major, minor, step)
+        along = origin_major + sign_major * step
+        across = origin_minor + sign_minor * shift
+        yield np.column_stack([along, across] if x_major else [across, along])
+
+
+def _circle_y_ranges(x_center, y_center, clip, last):
+    if clip is None:
+        return [(0, last)]
+    x_min, y_min, x_max, y_max = clip
+    # В каждом из 8 отражений одна координата линейна по y: (xc +- x, yc +- y) и (xc +- y, yc +- x)
+    ranges = sorted((max(low, 0), min(high, last)) for low, high in [
+        (y_min - y_center, y_max - y_center), (y_center - y_max, y_center - y_min),
+        (x_min - x_center, x_max - x_center), (x_center - x_max, x_center - x_min),
+    ] if max(low, 0) <= min(high, last))
+
+    merged = []
+    for low, high in ranges:
+        if merged and low <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], high))
+        else:
+            merged.append((low, high))
+    return merged
+
+
+def iter_circle_chunks(x_center, y_center, radius, clip=None, chunk_size=CHUNK_SIZE):
+    # Без отсечения порядок и повторы точек такие же, как у bresenham_circle
+    last = _circle_octant_length(radius) - 1
+    for low, high in _circle_y_ranges(x_center, y_center, clip, last):
+        for start in range(low, high + 1, chunk_size):
+            octant = _circle_octant_chunk(radius, start, min(start + chunk_size, high + 1))
+            x = octant[:, 0]
+            y = octant[:, 1]
+            points = np.stack([
+                np.column_stack([x_center + x, y_center + y]),
+                np.column_stack([x_center - x, y_center + y]),
+                np.column_stack([x_center + x, y_center - y]),
+                np.column_stack([x_center - x, y_center - y]),
+                np.column_stack([x_center + y, y_center + x]),
+                np.column_stack([x_center - y, y_center + x]),
+                np.column_stack([x_center + y, y_center - x]),
+                np.column_stack([x_center - y, y_center - x]),
+            ], axis=1).reshape(-1, 2)
+            if clip is not None:
+                points = points[(points[:, 0] >= clip[0]) & (points[:, 0] <= clip[2])
+                                & (points[:, 1] >= clip[1]) & (points[:, 1] <= clip[3])]
+            if len(points):
+                yield points
+
+
+def _iter_points(chunks):
+    for chunk in chunks:
+        yield from map(tuple, chunk.tolist())
+
+
+def iter_line(x1, y1, x2, y2, clip=None):
+    return _iter_points(iter_line_chunks(x1, y1, x2, y2, clip))
+
+
+def iter_circle(x_center, y_center, radius, clip=None):
+    return _iter_points(iter_circle_chunks(x_center, y_center, radius, clip))
+
+
+# Заливка многоугольников (в том числе с дырами) сканирующими строками. Таблица рёбер
+# отсортирована по нижней строке ребра; строки обрабатываются полосами по POLYGON_BAND,
+# и для каждой полосы поддерживается список активных рёбер. Ребро пересекает строки
+# y_low <= y < y_high, а пиксель закрашивается при x_left <= x < x_right (полуоткрыто по обеим
+# осям, как в правиле "верх-лево"): вершины не считаются дважды, а соседние многоугольники
+# не перекрываются. С outline=True к заливке добавляется контур из bresenham, так что
+# заливка и отрисованные рёбра не расходятся.
+
+POLYGON_BAND = 256
+
+
+def _rings(polygon):
+    if isinstance(polygon, np.ndarray) and polygon.ndim == 2:
+        return [polygon.astype(np.int64)]
+    rings = [np.asarray(ring, dtype=np.int64).reshape(-1, 2) for ring in polygon]
+    if rings and all(ring.shape == (1, 2) for ring in rings):
+        return [np.concatenate(rings)]
+    return rings
+
+
+def _edge_table(rings):
+    starts = np.concatenate([ring for ring in rings if len(ring)])
+    ends = np.concatenate([np.roll(ring, -1, axis=0) for ring in rings if len(ring)])
+    upward = ends[:, 1] > starts[:, 1]
+    low = np.where(upward[:, None], starts, ends)
+    high = np.where(upward[:, None], ends, starts)
+    keep = low[:, 1] != high[:, 1]
+    low, high, winding = low[keep], high[keep], np.where(upward[keep], 1, -1)
+
+    order = np.argsort(low[:, 1], kind="stable")
+    return low[order], high[order], winding[order]
+
+
+def _band_crossings(low, high, winding, band_start, band_stop):
+    first_row = np.maximum(low[:, 1], band_start)
+    rows_per_edge = np.minimum(high[:, 1], band_stop) - first_row
+    edge = np.repeat(np.arange(len(low)), rows_per_edge)
+    offsets = np.cumsum(rows_per_edge) - rows_per_edge
+    y = first_row[edge] + np.arange(len(edge)) - offsets[edge]
+
+    # x пересечения = numerator / denominator, знаменатель положителен
+    denominator = (high[:, 1] - low[:, 1])[edge]
+    numerator = low[edge, 0] * denominator + (y - low[edge, 1]) * (high[edge, 0] - low[edge, 0])
+    order = np.lexsort((numerator / denominator, y))
+    return y[order], numerator[order], denominator[order], winding[edge][order]
+
+
+def _interior_spans(y, numerator, denominator, winding, rule):
+    if rule == "evenodd":
+        left = np.arange(0, len(y), 2)
+    elif rule == "nonzero":
+        # Сумма направлений по строке равна нулю, поэтому общая накопленная сумма не переходит между строками
+        left = np.flatnonzero(np.cumsum(winding)[:-1] != 0) if len(y) else np.empty(0, dtype=np.int64)
+    else:
+        raise ValueError(f"unknown fill rule {rule!r}, expected 'evenodd' or 'nonzero'")
+    right = left + 1
+    x_start = -(-numerator[left] // denominator[left])
+    x_end = -(-numerator[right] // denominator[right]) - 1
+    keep = x_start <= x_end
+    return np.column_stack([y[left][keep], x_start[keep], x_end[keep]])
+
+
+def merge_spans(spans):
+    spans = np.asarray(spans, dtype=np.int64).reshape(-1, 3)
+    if not len(spans):
+        return spans
+    # Строка и x упаковываются в один ключ: сортировка идёт по одному int64, а слияние -
+    # одним накопленным максимумом, который не перетекает между строками
+    x_min = spans[:, 1].min()
+    width = spans[:, 2].max() - x_min + 3
+    row = spans[:, 0] - spans[:, 0].min()
+    start_key = row * width + (spans[:, 1] - x_min)
+    order = np.argsort(start_key)
+    start_key = start_key[order]
+    row = row[order]
+    end_key = np.maximum.accumulate(row * width + (spans[order, 2] - x_min))
+
+    new_run = np.ones(len(spans), dtype=bool)
+    new_run[1:] = start_key[1:] > end_key[:-1] + 1
+    first = np.flatnonzero(new_run)
+    last = np.append(first[1:], len(spans)) - 1
+    return np.column_stack([spans[order[first], 0], spans[order[first], 1], end_key[last] - row[last] * width + x_min])
+
+
+@instrument()
+def polygon_spans(polygon, rule="evenodd", outline=True):
+    rings = _rings(polygon)
+    if not rings or not sum(len(ring) for ring in rings):
+        return np.empty((0, 3), dtype=np.int64)
+    low, high, winding = _edge_table(rings)
+
+    spans = []
+    if len(low):
+        next_edge = 0
+        active = np.empty(0, dtype=np.int64)
+        for band_start in range(int(low[:, 1].min()), int(high[:, 1].max()), POLYGON_BAND):
+            band_stop = band_start + POLYGON_BAND
+            entering = np.searchsorted(low[:, 1], band_stop, side="left")
+            active = np.concatenate([active, np.arange(next_edge, entering)])
+            next_edge = entering
+            active = active[high[active, 1] > band_start]
+            crossings = _band_crossings(low[active], high[active], winding[active], band_start, band_stop)
+            spans.append(_interior_spans(*crossings, rule))
+
+    if outline:
+        segments = np.concatenate([np.hstack([ring, np.roll(ring, -1, axis=0)]) for ring in rings if len(ring)])
+        points, _ = bresenham_batch(segments)
+        spans.append(np.column_stack([points[:, 1], points[:, 0], points[:, 0]]))
+    return merge_spans(np.concatenate(spans)) if spans else np.empty((0, 3), dtype=np.int64)
+
+
+def polygon_mask(polygon, shape, rule="evenodd", outline=True):
+    return spans_to_mask(polygon_spans(polygon, rule, outline), shape)
+
+
+# Сглаженные линии и окружности Ву. Координаты те же, что у bresenham: центры пикселей в целых
+# точках, концы отрезка включительно. На каждом шаге по главной оси точное положение на второй
+# оси делится между двумя соседними пикселями пропорционально расстоянию. Концы отрезка лежат
+# в центрах пикселей, поэтому получают полное покрытие.
+
+
+def _dedupe_coverage(primitive, points, coverage):
+    # Отражения окружности могут попасть в один пиксель: внутри одного примитива берётся максимум
+    x_min, y_min = points.min(axis=0) if len(points) else (0, 0)
+    width = np.int64(points[:, 0].max() - x_min + 1) if len(points) else 1
+    height = np.int64(points[:, 1].max() - y_min + 1) if len(points) else 1
+    key = (primitive * height + (points[:, 1] - y_min)) * width + (points[:, 0] - x_min)
+    order = np.lexsort((coverage, key))
+    last = np.ones(len(key), dtype=bool)
+    last[:-1] = key[order][1:] != key[order][:-1]
+    keep = order[last]
+    keep.sort()
+    return primitive[keep], points[keep], coverage[keep]
+
+
+def _offsets(primitive, count):
+    offsets = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(primitive, minlength=count), out=offsets[1:])
+    return offsets
+
+
+@instrument()
+def wu_line_batch(segments):
+    segments = np.asarray(segments, dtype=np.int64).reshape(-1, 4)
+    x1, y1, x2, y2 = segments.T
+    dx = x2 - x1
+    dy = y2 - y1
+    x_major = np.abs(dx) > np.abs(dy)
+    major = np.where(x_major, np.abs(dx), np.abs(dy))
+    sign = np.where(np.where(x_major, dx, dy) > 0, 1, -1)
+    gradient = np.where(major > 0, np.where(x_major, dy, dx) / np.maximum(major, 1), 0.0)
+
+    lengths = major + 1
+    primitive = np.repeat(np.arange(len(segments)), lengths)
+    step = np.arange(lengths.sum(), dtype=np.int64) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    exact = step * gradient[primitive]
+    base = np.floor(exact)
+    fraction = (exact - base).astype(np.float32)
+    base = base.astype(np.int64)
+
+    along = np.where(x_major, x1, y1)[primitive] + sign[primitive] * step
+    across = np.where(x_major, y1, x1)[primitive] + base
+    along = np.concatenate([along, along])
+    across = np.concatenate([across, across + 1])
+    coverage = np.concatenate([1 - fraction, fraction])
+    primitive = np.concatenate([primitive, primitive])
+
+    x_major_px = x_major[primitive]
+    points = np.column_stack([np.where(x_major_px, along, across), np.where(x_major_px, across, along)])
+    keep = coverage > 0
+    order = np.argsort(primitive[keep], kind="stable")
+    primitive, points, coverage = primitive[keep][order], points[keep][order], coverage[keep][order]
+    return points, coverage, _offsets(primitive, len(segments))
+
+
+@instrument()
+def wu_circle_batch(circles):
+    circles = np.asarray(circles, dtype=np.int64).reshape(-1, 3)
+    x_center, y_center, radius = circles.T
+    radius = np.maximum(radius, -1)
+    # Октант до диагонали: y от 0 до floor(r / sqrt(2)), x = sqrt(r^2 - y^2) точно
+    lengths = np.where(radius >= 0, np.floor(radius / np.sqrt(2)).astype(np.int64) + 1, 0)
+    primitive = np.repeat(np.arange(len(circles)), lengths)
+    y = np.arange(lengths.sum(), dtype=np.int64) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    exact = np.sqrt(np.maximum(radius[primitive] ** 2 - y ** 2, 0))
+    base = np.floor(exact)
+    fraction = (exact - base).astype(np.float32)
+    base = base.astype(np.int64)
+
+    x = np.concatenate([base, base + 1])
+    y = np.concatenate([y, y])
+    coverage = np.concatenate([1 - fraction, fraction])
+    primitive = np.concatenate([primitive, primitive])
+    keep = coverage > 0
+    x, y, coverage, primitive = x[keep], y[keep], coverage[keep], primitive[keep]
+
+    mirrors = [(x, y), (-x, y), (x, -y), (-x, -y), (y, x), (-y, x), (y, -x), (-y, -x)]
+    points = np.concatenate([np.column_stack([x_center[primitive] + mx, y_center[primitive] + my])
+                             for mx, my in mirrors])
+    primitive = np.tile(primitive, len(mirrors))
+    coverage = np.tile(coverage, len(mirrors))
+    primitive, points, coverage = _dedupe_coverage(primitive, points, coverage)
+    order = np.argsort(primitive, kind="stable")
+    return points[order], coverage[order], _offsets(primitive, len(circles))
+
+
+def accumulate_coverage(buffer, points, coverage):
+    # Покрытие суммируется; float-буфер хранит доли, uint8 - 0..255 с насыщением
+    x = points[:, 0]
+    y = points[:, 1]
+    inside = (x >= 0) & (x < buffer.shape[1]) & (y >= 0) & (y < buffer.shape[0])
+    index = y[inside] * buffer.shape[1] + x[inside]
+    unique, inverse = np.unique(index, return_inverse=True)
+    total = np.bincount(inverse, weights=coverage[inside], minlength=len(unique))
+
+    rows, columns = np.divmod(unique, buffer.shape[1])
+    if np.issubdtype(buffer.dtype, np.integer):
+        buffer[rows, columns] = np.clip(buffer[rows, columns] + np.rint(total * 255), 0, 255).astype(buffer.dtype)
+    else:
+        buffer[rows, columns] += total.astype(buffer.dtype)
+    return buffer
+
+
+def draw_wu_lines(buffer, segments):
+    points, coverage, _ = wu_line_batch(segments)
+    return accumulate_coverage(buffer, points, coverage)
+
+
+def draw_wu_circles(buffer, circles):
+    points, coverage, _ = wu_circle_batch(circles)
+    return accumulate_coverage(buffer, points, coverage)
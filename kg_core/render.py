@@ -0,0 +1,92 @@
+import numpy as np
+
+from kg_core.profiling import instrument
+
+# Растеризованные точки хранятся разреженно: отсортированные ключи строка * ширина + столбец и индекс
+# палитры для каждого, так что память растёт с числом точек, а не с площадью их рамки. Перерисовка
+# строит плотный буфер только на тех строках и столбцах мира, которые попадают в пиксели окна, поэтому
+# он не больше самого окна. Индексы 0..255 - степень покрытия красным (для сглаженных режимов), 256 - оси.
+
+BACKGROUND = 0
+POINT = 255
+AXIS = 256
+PALETTE = np.vstack([np.column_stack([np.full(256, 255), 255 - np.arange(256), 255 - np.arange(256)]),
+                     [[0, 0, 0]]]).astype(np.uint8)
+
+
+def _lookup(sampled, values):
+    # Номер каждого значения в отсортированном sampled и признак, что оно там есть
+    index = np.minimum(np.searchsorted(sampled, values), len(sampled) - 1)
+    return index, sampled[index] == values
+
+
+class PointRaster:
+    @instrument()
+    def __init__(self, points, x_min, y_min, x_max, y_max, padding=10, coverage=None):
+        points = np.asarray(points, dtype=np.int64).reshape(-1, 2)
+        if len(points):
+            x_min = min(x_min, int(points[:, 0].min()))
+            x_max = max(x_max, int(points[:, 0].max()))
+            y_min = min(y_min, int(points[:, 1].min()))
+            y_max = max(y_max, int(points[:, 1].max()))
+        self.x_min = x_min - padding
+        self.x_max = x_max + padding
+        self.y_min = y_min - padding
+        self.y_max = y_max + padding
+        self.shape = (self.y_max - self.y_min + 1, self.x_max - self.x_min + 1)
+
+        # Ось y направлена вверх, поэтому строка считается от y_max
+        keys = (self.y_max - points[:, 1]) * self.shape[1] + (points[:, 0] - self.x_min)
+        if coverage is None:
+            self.keys = np.unique(keys)
+            self.values = np.full(len(self.keys), POINT, dtype=np.uint16)
+        else:
+            # Покрытие повторяющихся точек суммируется с насыщением, как в accumulate_coverage
+            keys, inverse = np.unique(keys, return_inverse=True)
+            total = np.bincount(inverse, weights=np.asarray(coverage, dtype=np.float64), minlength=len(keys))
+            levels = np.clip(np.rint(total * 255), 0, 255).astype(np.uint16)
+            self.keys = keys[levels > 0]
+            self.values = levels[levels > 0]
+
+    @property
+    def center(self):
+        return (self.x_min + self.x_max) / 2, (self.y_min + self.y_max) / 2
+
+    def fit_zoom(self, width, height):
+        return min(width / self.shape[1], height / self.shape[0])
+
+    @instrument()
+    def render(self, width, height, zoom, center_x, center_y):
+        # Пиксель с координатами (x, y) - квадрат [x - 0.5, x + 0.5), как у прямоугольников в matplotlib
+        screen_x = (np.arange(width) + 0.5 - width / 2) / zoom
+        screen_y = (np.arange(height) + 0.5 - height / 2) / zoom
+        columns = np.floor(center_x + screen_x + 0.5).astype(np.int64) - self.x_min
+        rows = self.y_max - np.floor(center_y - screen_y + 0.5).astype(np.int64)
+        sampled_rows, row_index = np.unique(rows, return_inverse=True)
+        sampled_columns, column_index = np.unique(columns, return_inverse=True)
+
+        pixels = np.full((len(sampled_rows), len(sampled_columns)), BACKGROUND, dtype=np.uint16)
+        if self.x_min <= 0 <= self.x_max:
+            pixels[:, sampled_columns == -self.x_min] = AXIS
+        if self.y_min <= 0 <= self.y_max:
+            pixels[sampled_rows == self.y_max, :] = AXIS
+
+        # Ключи отсортированы по строкам: точки видимых строк - один непрерывный срез
+        first, last = np.searchsorted(self.keys, [max(sampled_rows[0], 0) * self.shape[1],
+                                                  (max(sampled_rows[-1], -1) + 1) * self.shape[1]])
+        point_rows, point_columns = np.divmod(self.keys[first:last], self.shape[1])
+        row_positions, row_hits = _lookup(sampled_rows, point_rows)
+        column_positions, column_hits = _lookup(sampled_columns, point_columns)
+        hits = row_hits & column_hits
+        pixels[row_positions[hits], column_positions[hits]] = self.values[first:last][hits]
+
+        view = pixels[row_index][:, column_index]
+        view[(rows < 0) | (rows >= self.shape[0]), :] = BACKGROUND
+        view[:, (columns < 0) | (columns >= self.shape[1])] = BACKGROUND
+        return PALETTE[view]
+
+
+def to_ppm(rgb):
+    # Tk PhotoImage принимает двоичный PPM (P6) напрямую, без PIL
+    height, width = rgb.shape[:2]
+    return b"P6 %d %d 255\n" % (width, height) + np.ascontiguousarray(rgb, dtype=np.uint8).tobytes()
@@ -0,0 +1,427 @@
+import argparse
+import glob
+import os
+import queue
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from kg_core import filters, profiling
+
+# Потоковый режим для камер, видеофайлов и папок с кадрами. Все буферы выделяются один раз:
+# кольцо слотов (входной кадр + выход каждого фильтра), и у каждого фильтра свои промежуточные
+# массивы под размер кадра. Чтение, фильтры и запись идут в трёх потоках, связанных очередями
+# номеров слотов; cv2 и numpy отпускают GIL, поэтому стадии перекрываются. В режиме realtime
+# источник не ждёт конвейер: если свободного слота нет, кадр считается потерянным.
+
+DEFAULT_SLOTS = 4
+
+
+class NiblackStream:
+    # Те же окна, что у IntegralImage и cv2.blur (якорь window_size // 2, BORDER_REFLECT_101), и те же точные суммы:
+    # таблицы cv2.integral2 в float64 хранят целые без потерь, пока n * sum(I^2) меньше 2^53, поэтому
+    # результат совпадает с niblack_threshold бит в бит
+    def __init__(self, shape, window_size=15, k=-0.2):
+        if window_size ** 4 * 255 ** 2 >= 2 ** 53:
+            raise ValueError(f"window_size {window_size} is too large for exact float64 window statistics")
+        height, width = shape
+        self.k = k
+        self.window_size = window_size
+        self.before = window_size // 2
+        self.after = window_size - 1 - self.before
+        self.count = window_size * window_size
+
+        self.padded = np.empty((height + window_size - 1, width + window_size - 1), dtype=np.uint8)
+        self.sums = np.zeros((height + window_size, width + window_size), dtype=np.float64)
+        self.square_sums = np.zeros_like(self.sums)
+        self.total = np.empty(shape, dtype=np.float64)
+        self.square_total = np.empty(shape, dtype=np.float64)
+        self.scratch = np.empty(shape, dtype=np.float64)
+        self.mask = np.empty(shape, dtype=bool)
+
+    def _box(self, table, out):
+        # Срезы таблицы идут с шагом строки, и ufunc numpy на таких операндах заводит буфер итератора
+        # на каждый вызов; cv2 читает их на месте
+        height, width = out.shape
+        size = self.window_size
+        cv2.subtract(table[size:size + height, size:size + width], table[:height, size:size + width], dst=out)
+        cv2.subtract(out, table[size:size + height, :width], dst=out)
+        cv2.add(out, table[:height, :width], dst=out)
+
+    def __call__(self, image, out):
+        cv2.copyMakeBorder(image, self.before, self.after, self.before, self.after, cv2.BORDER_REFLECT_101,
+                           dst=self.padded)
+        cv2.integral2(self.padded, self.sums, self.square_sums, cv2.CV_64F, cv2.CV_64F)
+        self._box(self.sums, self.total)
+        self._box(self.square_sums, self.square_total)
+        # mean = S / n, std = sqrt(n * S2 - S^2) / n, порог = mean + k * std
+        np.multiply(self.square_total, self.count, out=self.square_total)
+        np.multiply(self.total, self.total, out=self.scratch)
+        np.subtract(self.square_total, self.scratch, out=self.square_total)
+        np.sqrt(self.square_total, out=self.square_total)
+        np.divide(self.square_total, self.count, out=self.square_total)
+        np.divide(self.total, self.count, out=self.total)
+        np.multiply(self.square_total, self.k, out=self.square_total)
+        np.add(self.total, self.square_total, out=self.total)
+        # Операнды разных типов numpy приводит через буфер, поэтому кадр сначала копируется в float64,
+        # а маска умножается как uint8
+        np.copyto(self.scratch, image)
+        np.greater(self.scratch, self.total, out=self.mask)
+        np.multiply(self.mask.view(np.uint8), np.uint8(255), out=out)
+
+
+class GradientStream:
+    # Sobel в int16 без переполнения (|G| <= 1020), модуль в float32 с насыщением на 255, как у fused_detection
+    def __init__(self, shape):
+        self.grad_x = np.empty(shape, dtype=np.int16)
+        self.grad_y = np.empty(shape, dtype=np.int16)
+        self.magnitude = np.empty(shape, dtype=np.float32)
+        self.square = np.empty(shape, dtype=np.float32)
+
+    def __call__(self, image, out):
+        cv2.Sobel(image, cv2.CV_16S, 1, 0, dst=self.grad_x, ksize=3)
+        cv2.Sobel(image, cv2.CV_16S, 0, 1, dst=self.grad_y, ksize=3)
+        # int16 -> float32 копированием: смешанные типы в ufunc приводятся через буфер на каждом кадре
+        np.copyto(self.magnitude, self.grad_x)
+        np.copyto(self.square, self.grad_y)
+        np.multiply(self.magnitude, self.magnitude, out=self.magnitude)
+        np.multiply(self.square, self.square, out=self.square)
+        np.add(self.magnitude, self.square, out=self.magnitude)
+        np.sqrt(self.magnitude, out=self.magnitude)
+        np.minimum(self.magnitude, 255, out=self.magnitude)
+        np.copyto(out, self.magnitude, casting="unsafe")
+
+
+class KernelStream:
+    def __init__(self, shape, kernel):
+        self.kernel = kernel
+
+    def __call__(self, image, out):
+        cv2.filter2D(image, -1, self.kernel, dst=out)
+
+
+STREAM_FILTERS = {
+    "niblack": NiblackStream,
+    "gradient": GradientStream,
+    "points": lambda shape: KernelStream(shape, filters.POINT_KERNEL),
+    "lines45": lambda shape: KernelStream(shape, filters.LINE_45_KERNEL),
+}
+
+
+def create_filter(name, shape, **params):
+    try:
+        return STREAM_FILTERS[name](shape, **params)
+    except KeyError:
+        raise ValueError(f"unknown stream filter {name!r}, expected one of {', '.join(STREAM_FILTERS)}") from None
+
+
+class SyntheticSource:
+    # Текстура с шумом, которая сдвигается на step пикселей за кадр; кадр - копия окна в готовый буфер
+    def __init__(self, shape=(1080, 1920), frames=300, fps=30.0, step=4, seed=0):
+        self.shape = shape
+        self.frames = frames
+        self.fps = fps
+        self.step = step
+        height, width = shape
+        rng = np.random.default_rng(seed)
+        columns = np.arange(width + frames * step)
+        texture = 128 + 100 * np.sin(columns / 37.0)[None, :] * np.cos(np.arange(height) / 23.0)[:, None]
+        self.texture = np.clip(texture + rng.normal(0, 10, texture.shape), 0, 255).astype(np.uint8)
+        self.position = 0
+
+    def read(self, buffer):
+        if self.position >= self.frames:
+            return False
+        offset = self.position * self.step
+        np.copyto(buffer, self.texture[:, offset:offset + self.shape[1]])
+        self.position += 1
+        return True
+
+    def close(self):
+        pass
+
+
+class VideoSource:
+    def __init__(self, source):
+        self.capture = cv2.VideoCapture(source)
+        if not self.capture.isOpened():
+            raise ValueError(f"unable to open video source {source!r}")
+        ok, self.frame = self.capture.read()
+        if not ok:
+            raise ValueError(f"video source {source!r} has no frames")
+        self.shape = self.frame.shape[:2]
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or 30.0
+        self.pending = True
+
+    def read(self, buffer):
+        # Первый кадр уже прочитан ради размера; дальше VideoCapture пишет в тот же цветной буфер
+        if not self.pending:
+            ok, frame = self.capture.read(self.frame)
+            if not ok:
+                return False
+            self.frame = frame
+        self.pending = False
+        cv2.cvtColor(self.frame, cv2.COLOR_BGR2GRAY, dst=buffer)
+        return True
+
+    def close(self):
+        self.capture.release()
+
+
+class SequenceSource:
+    # Декодер изображений сам выделяет память под кадр; в слот он только копируется
+    def __init__(self, pattern, fps=30.0):
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, "*")
+        self.paths = sorted(path for path in glob.glob(pattern) if os.path.isfile(path))
+        if not self.paths:
+            raise ValueError(f"no frames match {pattern!r}")
+        self.shape = self._load(self.paths[0]).shape
+        self.fps = fps
+        self.position = 0
+
+    @staticmethod
+    def _load(path):
+        image = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            raise ValueError(f"unable to load frame {path!r}")
+        return image
+
+    def read(self, buffer):
+        if self.position >= len(self.paths):
+            return False
+        np.copyto(buffer, self._load(self.paths[self.position]))
+        self.position += 1
+        return True
+
+    def close(self):
+        pass
+
+
+def open_source(spec, frames=300, fps=30.0):
+    if spec in (None, "synthetic"):
+        return SyntheticSource(frames=frames, fps=fps)
+    if spec.isdigit():
+        return VideoSource(int(spec))
+    if os.path.isdir(spec) or glob.has_magic(spec):
+        return SequenceSource(spec, fps)
+    return VideoSource(spec)
+
+
+class VideoSink:
+    def __init__(self, path, names, shape, fps):
+        stem, extension = os.path.splitext(path)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        fourcc = cv2.VideoWriter_fourcc(*("mp4v" if extension.lower() == ".mp4" else "MJPG"))
+        self.writers = {name: cv2.VideoWriter(f"{stem}_{name}{extension}", fourcc, fps, shape[::-1], False)
+                        for name in names}
+        if not all(writer.isOpened() for writer in self.writers.values()):
+            raise ValueError(f"unable to open video writer for {path!r}")
+
+    def write(self, index, outputs):
+        for name, output in outputs.items():
+            self.writers[name].write(output)
+
+    def close(self):
+        for writer in self.writers.values():
+            writer.release()
+
+
+class SequenceSink:
+    def __init__(self, directory, extension="png"):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.extension = extension
+
+    def write(self, index, outputs):
+        for name, output in outputs.items():
+            cv2.imwrite(os.path.join(self.directory, f"{name}_{index:06d}.{self.extension}"), output)
+
+    def close(self):
+        pass
+
+
+class LatestFrameSink:
+    # Для GUI: последний результат копируется в заранее выделенный буфер, промежуточные кадры не нужны
+    def __init__(self, name, shape):
+        self.name = name
+        self.frame = np.zeros(shape, dtype=np.uint8)
+        self.index = -1
+        self.lock = threading.Lock()
+
+    def write(self, index, outputs):
+        with self.lock:
+            np.copyto(self.frame, outputs[self.name])
+            self.index = index
+
+    def close(self):
+        pass
+
+
+class StreamStats:
+    def __init__(self):
+        self.frames = 0
+        self.dropped = 0
+        self.latency = 0.0
+        self.started = time.perf_counter()
+        self.finished = None
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def fps(self):
+        return self.frames / self.elapsed if self.elapsed > 0 else 0.0
+
+    def report(self):
+        latency = self.latency / self.frames * 1000 if self.frames else 0.0
+        return (f"{self.frames} frames in {self.elapsed:.2f}s: {self.fps:.1f} fps sustained, "
+                f"{self.dropped} dropped, {latency:.1f} ms mean latency")
+
+
+class FramePipeline:
+    def __init__(self, source, names, sink=None, slots=DEFAULT_SLOTS, realtime=False, params=None):
+        params = params or {}
+        self.source = source
+        self.names = list(names)
+        self.sink = sink
+        self.realtime = realtime
+        shape = tuple(source.shape)
+        self.filters = {name: create_filter(name, shape, **params.get(name, {})) for name in self.names}
+        self.frames = [np.empty(shape, dtype=np.uint8) for _ in range(slots)]
+        self.outputs = [{name: np.empty(shape, dtype=np.uint8) for name in self.names} for _ in range(slots)]
+        self.indices = [0] * slots
+        self.started = [0.0] * slots
+        # Кадр, который пришлось пропустить, всё равно нужно прочитать из источника
+        self.discard = np.empty(shape, dtype=np.uint8)
+        self.free = queue.Queue()
+        for slot in range(slots):
+            self.free.put(slot)
+        self.decoded = queue.Queue()
+        self.filtered = queue.Queue()
+        self.stop = threading.Event()
+        self.error = None
+        self.stats = StreamStats()
+
+    def run(self):
+        self.stats.started = time.perf_counter()
+        workers = [threading.Thread(target=self._guard, args=(target,)) for target in (self._decode, self._filter)]
+        for worker in workers:
+            worker.start()
+        try:
+            self._encode()
+        finally:
+            # Пустые метки будят потоки, которые ждут слот: без них упавшая стадия подвесила бы join
+            self.stop.set()
+            self.free.put(None)
+            for worker in workers:
+                worker.join()
+            self.stats.finished = time.perf_counter()
+            self.source.close()
+            if self.sink is not None:
+                self.sink.close()
+        if self.error is not None:
+            raise self.error
+        return self.stats
+
+    def _guard(self, target):
+        try:
+            target()
+        except BaseException as error:
+            # Наружу из run уходит первая ошибка; остальные стадии дорабатывают до пустой метки
+            if self.error is None:
+                self.error = error
+            self.stop.set()
+
+    def _decode(self):
+        index = 0
+        interval = 1 / self.source.fps if self.realtime else 0.0
+        due = time.perf_counter()
+        try:
+            while not self.stop.is_set():
+                if self.realtime:
+                    # Источник живёт в своём темпе и не ждёт конвейер
+                    delay = due - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    due += interval
+                    try:
+                        slot = self.free.get_nowait()
+                    except queue.Empty:
+                        if not self.source.read(self.discard):
+                            break
+                        self.stats.dropped += 1
+                        index += 1
+                        continue
+                else:
+                    slot = self.free.get()
+                if slot is None:
+                    break
+                self.started[slot] = time.perf_counter()
+                if not self.source.read(self.frames[slot]):
+                    break
+                self.indices[slot] = index
+                index += 1
+                self.decoded.put(slot)
+        finally:
+            self.decoded.put(None)
+
+    def _filter(self):
+        try:
+            while True:
+                slot = self.decoded.get()
+                if slot is None:
+                    return
+                for name, apply in self.filters.items():
+                    with profiling.stage("stream.filter", operation=name):
+                        apply(self.frames[slot], self.outputs[slot][name])
+                self.filtered.put(slot)
+        finally:
+            self.filtered.put(None)
+
+    def _encode(self):
+        while True:
+            slot = self.filtered.get()
+            if slot is None:
+                return
+            if self.sink is not None:
+                self.sink.write(self.indices[slot], self.outputs[slot])
+            self.stats.frames += 1
+            self.stats.latency += time.perf_counter() - self.started[slot]
+            self.free.put(slot)
+
+
+def open_sink(path, names, shape, fps):
+    if path is None:
+        return None
+    if os.path.splitext(path)[1].lower() in (".avi", ".mp4"):
+        return VideoSink(path, names, shape, fps)
+    return SequenceSink(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run segmentation filters over a video or a frame sequence")
+    parser.add_argument("source", nargs="?", default="synthetic",
+                        help="video file, camera index, frame directory or glob, or 'synthetic'")
+    parser.add_argument("-p", "--operations", nargs="+", default=["niblack", "gradient"],
+                        choices=list(STREAM_FILTERS))
+    parser.add_argument("-o", "--output", default=None, help="output .avi/.mp4 (one file per filter) or directory")
+    parser.add_argument("--slots", type=int, default=DEFAULT_SLOTS, help="frames in flight")
+    parser.add_argument("--realtime", action="store_true", help="pace the source at its fps and drop late frames")
+    parser.add_argument("--fps", type=float, default=30.0, help="rate of synthetic and image-sequence sources")
+    parser.add_argument("--frames", type=int, default=300, help="length of the synthetic source")
+    args = parser.parse_args(argv)
+
+    source = open_source(args.source, args.frames, args.fps)
+    sink = open_sink(args.output, args.operations, source.shape, source.fps)
+    stats = FramePipeline(source, args.operations, sink, args.slots, args.realtime).run()
+    print(stats.report())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
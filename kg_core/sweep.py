@@ -0,0 +1,57 @@
+import itertools
+
+import numpy as np
+
+from kg_core import threshold
+from kg_core.integral import IntegralImage
+
+# Перебор параметров порогов. Комбинации идут с window_size как самым внешним циклом:
+# всё, что зависит только от окна (max/min для Бернсена, таблицы сумм и mean/std для
+# остальных), считается один раз, а k и contrast_threshold применяются последним шагом.
+
+STATISTICS_THRESHOLDS = {
+    "niblack": threshold.niblack_threshold,
+    "sauvola": threshold.sauvola_threshold,
+    "wolf": threshold.wolf_threshold,
+}
+
+
+def parameter_grid(window_size=(15,), **grid):
+    names = ["window_size"] + list(grid)
+    values = [list(window_size)] + [list(options) for options in grid.values()]
+    return [dict(zip(names, combination)) for combination in itertools.product(*values)]
+
+
+def iter_sweep(operation, image, **grid):
+    combinations = parameter_grid(**grid)
+
+    if operation == "bernsen":
+        window_size, parts = None, None
+        for params in combinations:
+            if params["window_size"] != window_size:
+                window_size = params["window_size"]
+                parts = threshold.bernsen_parts(image, window_size)
+            contrast_threshold = params.get("contrast_threshold", 15)
+            yield params, threshold.bernsen_from_parts(image.shape, window_size, parts, contrast_threshold)
+    elif operation in STATISTICS_THRESHOLDS:
+        func = STATISTICS_THRESHOLDS[operation]
+        integral = IntegralImage(image)
+        window_size = None
+        for params in combinations:
+            if params["window_size"] != window_size:
+                # mean/std предыдущего окна больше не понадобятся
+                integral.clear_statistics()
+                window_size = params["window_size"]
+            yield params, func(image, integral=integral, **params)
+    else:
+        raise ValueError(f"sweep is not supported for {operation!r}, expected one of "
+                         f"{', '.join(['bernsen', *STATISTICS_THRESHOLDS])}")
+
+
+def sweep(operation, image, **grid):
+    params_list = []
+    stack = np.empty((len(parameter_grid(**grid)),) + image.shape, dtype=np.uint8)
+    for i, (params, result) in enumerate(iter_sweep(operation, image, **grid)):
+        params_list.append(params)
+        stack[i] = result
+    return params_list, stack
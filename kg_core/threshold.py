@@ -0,0 +1,117 @@
+import numpy as np
+
+from kg_core.integral import IntegralImage
+from kg_core.profiling import instrument
+
+
+def _sliding_extremum(array, size, axis, op, fill):
+    # van Herk/Gil-Werman: prefix/suffix extremum inside blocks of `size`,
+    # so each output costs a constant number of comparisons for any window size.
+    if size < 1:
+        raise ValueError(f"window size must be positive, got {size}")
+    array = np.moveaxis(array, axis, 0)
+    n = array.shape[0]
+    if size > n:
+        # Окно длиннее оси: допустимых позиций нет
+        return np.moveaxis(array[:0].copy(), 0, axis)
+    if size == 1:
+        return np.moveaxis(array.copy(), 0, axis)
+
+    blocks = -(-n // size)
+    padding = np.full((blocks * size - n,) + array.shape[1:], fill, dtype=array.dtype)
+    padded = np.concatenate([array, padding]).reshape((blocks, size) + array.shape[1:])
+
+    prefix = op.accumulate(padded, axis=1).reshape((blocks * size,) + array.shape[1:])
+    suffix = op.accumulate(padded[:, ::-1], axis=1)[:, ::-1].reshape((blocks * size,) + array.shape[1:])
+    result = op(suffix[:n - size + 1], prefix[size - 1:n])
+    return np.moveaxis(result, 0, axis)
+
+
+def _limits(dtype):
+    # Значения для добивки последнего блока: не больше и не меньше любого значения этого типа
+    if np.issubdtype(dtype, np.floating):
+        return -np.inf, np.inf
+    if dtype == np.bool_:
+        return False, True
+    info = np.iinfo(dtype)
+    return info.min, info.max
+
+
+def sliding_max(array, size, axis):
+    # Максимум по size подряд идущим элементам вдоль axis, только для окон целиком внутри массива
+    return _sliding_extremum(array, size, axis, np.maximum, _limits(array.dtype)[0])
+
+
+def sliding_min(array, size, axis):
+    # Минимум по size подряд идущим элементам вдоль axis, только для окон целиком внутри массива
+    return _sliding_extremum(array, size, axis, np.minimum, _limits(array.dtype)[1])
+
+
+def bernsen_parts(image, window_size):
+    # Всё, что зависит только от окна: контраст и оба варианта решения. Порог контраста
+    # выбирает между ними в самом конце, поэтому перебор порогов не пересчитывает окна.
+    half_size = window_size // 2
+    size = 2 * half_size + 1
+    if image.shape[0] < size or image.shape[1] < size:
+        return None
+
+    # Максимум/минимум по окну считаются сепарабельно (сначала по строкам, потом по столбцам).
+    # Контраст и средний уровень - в целых, как int() в исходном цикле: int16 хватает только 8-битным
+    # пикселям, 16-битные сканы и float-изображения считаются в int64 (дробная часть отбрасывается)
+    work_type = np.int16 if np.issubdtype(image.dtype, np.integer) and image.dtype.itemsize == 1 else np.int64
+    max_val = sliding_max(sliding_max(image, size, axis=0), size, axis=1).astype(work_type)
+    min_val = sliding_min(sliding_min(image, size, axis=0), size, axis=1).astype(work_type)
+    contrast = max_val - min_val
+    mid_gray = (max_val + min_val) // 2
+
+    center = image[half_size:image.shape[0] - half_size, half_size:image.shape[1] - half_size]
+    return contrast, mid_gray > 127, center > mid_gray
+
+
+def bernsen_from_parts(shape, window_size, parts, contrast_threshold):
+    half_size = window_size // 2
+    output = np.zeros(shape, dtype=np.uint8)
+    if parts is None:
+        return output
+
+    contrast, low_contrast, high_contrast = parts
+    foreground = np.where(contrast < contrast_threshold, low_contrast, high_contrast)
+    output[half_size:shape[0] - half_size, half_size:shape[1] - half_size] = foreground * np.uint8(255)
+    return output
+
+
+@instrument()
+def bernsen_threshold(image, window_size=15, contrast_threshold=15):
+    return bernsen_from_parts(image.shape, window_size, bernsen_parts(image, window_size), contrast_threshold)
+
+
+def _statistics(image, window_size, integral):
+    if integral is None:
+        integral = IntegralImage(image)
+    return integral.mean_std(window_size)
+
+
+def _binarize(image, threshold):
+    return np.multiply(image > threshold, np.uint8(255))
+
+
+@instrument()
+def niblack_threshold(image, window_size=15, k=-0.2, integral=None):
+    mean, stddev = _statistics(image, window_size, integral)
+    return _binarize(image, mean + k * stddev)
+
+
+@instrument()
+def sauvola_threshold(image, window_size=15, k=0.5, r=128, integral=None):
+    mean, stddev = _statistics(image, window_size, integral)
+    return _binarize(image, mean * (1 + k * (stddev / r - 1)))
+
+
+@instrument()
+def wolf_threshold(image, window_size=15, k=0.5, integral=None):
+    # Порог Вульфа нормирует на глобальные минимум яркости и максимум отклонения
+    mean, stddev = _statistics(image, window_size, integral)
+    min_gray = float(np.min(image)) if image.size else 0.0
+    max_stddev = float(np.max(stddev)) if image.size else 0.0
+    contrast = stddev / max_stddev if max_stddev > 0 else np.zeros_like(stddev)
+    return _binarize(image, (1 - k) * mean + k * min_gray + k * contrast * (mean - min_gray))
@@ -0,0 +1,60 @@
+import os
+
+import cv2
+import numpy as np
+
+from kg_core.operations import get_operation, halo_width
+
+
+def tiles(shape, tile_size):
+    height, width = shape[:2]
+    for y0 in range(0, height, tile_size):
+        for x0 in range(0, width, tile_size):
+            yield y0, min(y0 + tile_size, height), x0, min(x0 + tile_size, width)
+
+
+def padded_bounds(shape, bounds, halo):
+    # Тайл расширяется на halo, но не выходит за края изображения: у краёв фильтр
+    # должен видеть ту же границу, что и при обработке целого кадра
+    y0, y1, x0, x1 = bounds
+    return max(y0 - halo, 0), min(y1 + halo, shape[0]), max(x0 - halo, 0), min(x1 + halo, shape[1])
+
+
+def apply_tile(func, image, output, bounds, halo, **params):
+    y0, y1, x0, x1 = bounds
+    top, bottom, left, right = padded_bounds(image.shape, bounds, halo)
+    result = func(np.ascontiguousarray(image[top:bottom, left:right]), **params)
+    output[y0:y1, x0:x1] = result[y0 - top:y1 - top, x0 - left:x1 - left]
+
+
+def apply_tiled(operation, image, output=None, tile_size=1024, **params):
+    func = get_operation(operation).func
+    halo = halo_width(operation, **params)
+    if output is None:
+        output = np.empty(image.shape, dtype=np.uint8)
+
+    for bounds in tiles(image.shape, tile_size):
+        apply_tile(func, image, output, bounds, halo, **params)
+    return output
+
+
+def open_image(path):
+    # .npy открывается через mmap; обычные форматы приходится декодировать целиком
+    if os.path.splitext(path)[1].lower() == ".npy":
+        return np.load(path, mmap_mode="r")
+    image = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    if image is None:
+        raise ValueError(f"unable to load image {path!r}")
+    return image
+
+
+def create_output(path, shape):
+    return np.lib.format.open_memmap(path, mode="w+", dtype=np.uint8, shape=shape)
+
+
+def process_file(operation, input_path, output_path, tile_size=1024, **params):
+    image = open_image(input_path)
+    output = create_output(output_path, image.shape)
+    apply_tiled(operation, image, output, tile_size, **params)
+    output.flush()
+    return output
@@ -1,8 +1,138 @@
 import sys
 
-from PyQt5.QtCore import Qt
+import cv2
+from PyQt5.QtCore import Qt, QTimer, QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt5.QtGui import QColor, QPalette, QImage, QPixmap
 from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QSlider, QLineEdit, \
-    QColorDialog, QFrame
+    QColorDialog, QFrame, QComboBox, QFileDialog, QMessageBox
+
+from kg_core import profiling
+from kg_core.color_preview import MODES, PreviewEngine
+from kg_core.color_state import ColorState, RateCounter
+
+
+class RefineSignals(QObject):
+    finished = pyqtSignal(object, int, object)
+
+
+class RefineJob(QRunnable):
+    def __init__(self, engine, generation, params):
+        super().__init__()
+        self.engine = engine
+        self.generation = generation
+        self.params = params
+        self.signals = RefineSignals()
+
+    def run(self):
+        frame = self.engine.refine(self.generation, **self.params)
+        if frame is not None:
+            self.signals.finished.emit(self.engine, self.generation, frame)
+
+
+class ImagePreview(QWidget):
+    def __init__(self):
+        super().__init__()
+        self.engine = None
+        # Ссылки на задачи в пуле, чтобы Python не собрал их объект сигналов раньше времени
+        self.jobs = []
+        # Один поток: новые задачи встают в очередь, а устаревшие из неё выбрасываются через clear()
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+
+        self.setWindowTitle("Image Preview")
+        self.setGeometry(150, 150, 900, 700)
+        layout = QVBoxLayout()
+
+        self.load_button = QPushButton("Load Image")
+        self.load_button.clicked.connect(self.load_image)
+        layout.addWidget(self.load_button)
+
+        self.mode_box = QComboBox()
+        self.mode_box.addItems(MODES)
+        self.mode_box.currentIndexChanged.connect(self.schedule_preview)
+        layout.addWidget(self.mode_box)
+
+        self.hue_slider = self.create_adjust_control(layout, "Hue shift:", -180, 180, 0)
+        self.saturation_slider = self.create_adjust_control(layout, "Saturation %:", 0, 200, 100)
+        self.value_slider = self.create_adjust_control(layout, "Value %:", 0, 200, 100)
+
+        self.image_label = QLabel("No image")
+        self.image_label.setAlignment(Qt.AlignCenter)
+        self.image_label.setMinimumSize(400, 300)
+        layout.addWidget(self.image_label, stretch=1)
+
+        self.setLayout(layout)
+
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(0)
+        self.preview_timer.timeout.connect(self.update_preview)
+
+    def create_adjust_control(self, layout, label_text, minimum, maximum, value):
+        layout.addWidget(QLabel(label_text))
+        slider = QSlider(Qt.Horizontal)
+        slider.setMinimum(minimum)
+        slider.setMaximum(maximum)
+        slider.setValue(value)
+        slider.valueChanged.connect(self.schedule_preview)
+        layout.addWidget(slider)
+        return slider
+
+    def load_image(self):
+        file_path, _ = QFileDialog.getOpenFileName(self, "Open Image", "", "Image Files (*.png *.jpg *.jpeg *.bmp)")
+        if not file_path:
+            return
+        image = cv2.imread(file_path, cv2.IMREAD_COLOR)
+        if image is None:
+            QMessageBox.critical(self, "Error", "Unable to load image.")
+            return
+        if self.engine is not None:
+            self.engine.cancel()
+        self.engine = PreviewEngine(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+        self.update_preview()
+
+    def current_params(self):
+        return {
+            "mode": self.mode_box.currentText(),
+            "hue_shift": self.hue_slider.value(),
+            "saturation": self.saturation_slider.value() / 100,
+            "value": self.value_slider.value() / 100,
+        }
+
+    def schedule_preview(self):
+        if self.engine is not None and not self.preview_timer.isActive():
+            self.preview_timer.start()
+
+    @profiling.instrument("lab_01.update_preview")
+    def update_preview(self):
+        # Уменьшенная копия считается сразу, полное разрешение - в фоне
+        params = self.current_params()
+        generation, frame = self.engine.request(**params)
+        self.show_frame(frame)
+
+        self.pool.clear()
+        job = RefineJob(self.engine, generation, params)
+        job.signals.finished.connect(self.refined)
+        self.jobs = [queued for queued in self.jobs
+                     if queued.engine is self.engine and self.engine.is_current(queued.generation)] + [job]
+        self.pool.start(job)
+
+    def refined(self, engine, generation, frame):
+        # Номера поколений у нового движка снова начинаются с 1: кадр старого изображения отбрасывается по движку
+        if engine is self.engine and engine.is_current(generation):
+            self.show_frame(frame)
+
+    def show_frame(self, frame):
+        height, width = frame.shape[:2]
+        image = QImage(frame.data, width, height, 3 * width, QImage.Format_RGB888)
+        pixmap = QPixmap.fromImage(image).scaled(self.image_label.size(), Qt.KeepAspectRatio,
+                                                 Qt.SmoothTransformation)
+        self.image_label.setPixmap(pixmap)
+
+    def closeEvent(self, event):
+        if self.engine is not None:
+            self.engine.cancel()
+        super().closeEvent(event)
 
 
 class ColorConverterApp(QWidget):
@@ -91,17 +221,46 @@ class ColorConverterApp(QWidget):
         self.palette_button.clicked.connect(self.choose_color_from_palette)
         layout.addWidget(self.palette_button)
 
+        self.image_preview = ImagePreview()
+        self.image_preview_button = QPushButton("Open Image Preview")
+        self.image_preview_button.clicked.connect(self.image_preview.show)
+        layout.addWidget(self.image_preview_button)
+
         self.color_preview_label = QLabel("Color Preview")
         layout.addWidget(self.color_preview_label)
 
+        # Цвет рисуется заливкой фона через палитру: setStyleSheet заново разбирает стили и перестраивает layout
         self.color_preview = QFrame()
         self.color_preview.setFixedSize(100, 100)
-        self.color_preview.setStyleSheet("background-color: rgb(128, 128, 128);")
+        self.color_preview.setAutoFillBackground(True)
         layout.addWidget(self.color_preview)
 
+        self.update_rate_label = QLabel("Updates/s: 0")
+        layout.addWidget(self.update_rate_label)
+
         self.setLayout(layout)
 
-        self.update_cmyk_output(_from="rgb")
+        self.controls = {
+            "rgb": ([self.r_slider, self.g_slider, self.b_slider], [self.r_input, self.g_input, self.b_input]),
+            "cmyk": ([self.c_slider, self.m_slider, self.y_slider, self.k_slider],
+                     [self.c_input, self.m_input, self.y_input, self.k_input]),
+            "hsv": ([self.h_slider, self.s_slider, self.v_slider], [self.h_input, self.s_input, self.v_input]),
+        }
+        self.state = ColorState()
+        self.pending_model = "rgb"
+        self.update_counter = RateCounter()
+
+        self.update_timer = QTimer(self)
+        self.update_timer.setSingleShot(True)
+        self.update_timer.setInterval(0)
+        self.update_timer.timeout.connect(self.flush_update)
+
+        self.rate_timer = QTimer(self)
+        self.rate_timer.setInterval(1000)
+        self.rate_timer.timeout.connect(self.show_update_rate)
+        self.rate_timer.start()
+
+        self.apply_changes({model: list(enumerate(values)) for model, values in self.state.values.items()})
 
     def create_rgb_control(self, label_text):
         layout = QVBoxLayout()
@@ -168,289 +327,76 @@ class ColorConverterApp(QWidget):
 
         return slider, input_field
 
-    def update_rgb_from_slider(self):
-        r = self.r_slider.value()
-        g = self.g_slider.value()
-        b = self.b_slider.value()
-
-        self.r_input.setText(str(r))
-        self.g_input.setText(str(g))
-        self.b_input.setText(str(b))
-
-        self.update_cmyk_output(_from="rgb")
-        self.update_hsv_output(_from="rgb")
-
-    def update_rgb_from_input(self):
+    def schedule_update(self, model):
+        # Все сигналы одного прохода цикла событий схлопываются в один пересчёт
+        self.pending_model = model
+        if not self.update_timer.isActive():
+            self.update_timer.start()
+
+    @profiling.instrument("lab_01.flush_update")
+    def flush_update(self):
+        sliders, _ = self.controls[self.pending_model]
+        changes = self.state.set(self.pending_model, [slider.value() for slider in sliders])
+        self.apply_changes(changes)
+        self.update_counter.tick()
+
+    @profiling.instrument("lab_01.apply_changes")
+    def apply_changes(self, changes):
+        # Трогаем только виджеты, у которых поменялось отображаемое значение
+        for model, channels in changes.items():
+            sliders, inputs = self.controls[model]
+            self.disable_signals(sliders)
+            for i, value in channels:
+                sliders[i].setValue(value)
+                inputs[i].setText(str(value))
+            self.enable_signals(sliders)
+        if "rgb" in changes:
+            self.paint_preview()
+
+    def paint_preview(self):
+        palette = self.color_preview.palette()
+        palette.setColor(QPalette.Window, QColor(*self.state.rgb))
+        self.color_preview.setPalette(palette)
+
+    def show_update_rate(self):
+        self.update_rate_label.setText(f"Updates/s: {self.update_counter.rate():.0f}")
+
+    def update_from_input(self, model, limits):
+        sliders, inputs = self.controls[model]
         try:
-            r = int(self.r_input.text())
-            g = int(self.g_input.text())
-            b = int(self.b_input.text())
+            values = [int(input_field.text()) for input_field in inputs]
         except ValueError:
             return
 
-        r = max(0, min(r, 255))
-        g = max(0, min(g, 255))
-        b = max(0, min(b, 255))
+        values = [max(0, min(value, limit)) for value, limit in zip(values, limits)]
+        for input_field, value in zip(inputs, values):
+            if str(value) != input_field.text():
+                input_field.setText(str(value))
 
-        if str(r) != self.r_input.text():
-            self.r_input.setText(str(r))
-        if str(g) != self.g_input.text():
-            self.g_input.setText(str(g))
-        if str(b) != self.b_input.text():
-            self.b_input.setText(str(b))
-
-        sliders = [self.r_slider, self.g_slider, self.b_slider]
         self.disable_signals(sliders)
-        self.r_slider.setValue(r)
-        self.g_slider.setValue(g)
-        self.b_slider.setValue(b)
+        for slider, value in zip(sliders, values):
+            slider.setValue(value)
         self.enable_signals(sliders)
 
-        self.update_cmyk_output(_from="rgb")
-        self.update_hsv_output(_from="rgb")
+        self.schedule_update(model)
 
-    def update_cmyk_from_slider(self):
-        c = self.c_slider.value()
-        m = self.m_slider.value()
-        y = self.y_slider.value()
-        k = self.k_slider.value()
+    def update_rgb_from_slider(self):
+        self.schedule_update("rgb")
 
-        self.c_input.setText(str(c))
-        self.m_input.setText(str(m))
-        self.y_input.setText(str(y))
-        self.k_input.setText(str(k))
+    def update_rgb_from_input(self):
+        self.update_from_input("rgb", (255, 255, 255))
 
-        self.update_rgb_output(_from="cmyk")
-        self.update_hsv_output(_from="cmyk")
+    def update_cmyk_from_slider(self):
+        self.schedule_update("cmyk")
 
     def update_cmyk_from_input(self):
-        try:
-            c = int(self.c_input.text())
-            m = int(self.m_input.text())
-            y = int(self.y_input.text())
-            k = int(self.k_input.text())
-        except ValueError:
-            return
-
-        c = max(0, min(c, 100))
-        m = max(0, min(m, 100))
-        y = max(0, min(y, 100))
-        k = max(0, min(k, 100))
-
-        if str(c) != self.c_input.text():
-            self.c_input.setText(str(c))
-        if str(m) != self.m_input.text():
-            self.m_input.setText(str(m))
-        if str(y) != self.y_input.text():
-            self.y_input.setText(str(y))
-        if str(k) != self.k_input.text():
-            self.k_input.setText(str(k))
-
-        sliders = [self.c_slider, self.m_slider, self.y_slider, self.k_slider]
-        self.disable_signals(sliders)
-        self.c_slider.setValue(c)
-        self.m_slider.setValue(m)
-        self.y_slider.setValue(y)
-        self.k_slider.setValue(k)
-        self.enable_signals(sliders)
-
-        self.update_rgb_output(_from="cmyk")
-        self.update_hsv_output(_from="cmyk")
+        self.update_from_input("cmyk", (100, 100, 100, 100))
 
     def update_hsv_from_slider(self):
-        h = self.h_slider.value()
-        s = self.s_slider.value()
-        v = self.v_slider.value()
-
-        self.h_input.setText(str(h))
-        self.s_input.setText(str(s))
-        self.v_input.setText(str(v))
-
-        self.update_rgb_output(_from="hsv")
-        self.update_cmyk_output(_from="hsv")
+        self.schedule_update("hsv")
 
     def update_hsv_from_input(self):
-        try:
-            h = int(self.h_input.text())
-            s = int(self.s_input.text())
-            v = int(self.v_input.text())
-        except ValueError:
-            return
-
-        h = max(0, min(h, 360))
-        s = max(0, min(s, 100))
-        v = max(0, min(v, 100))
-        if str(h) != self.h_input.text():
-            self.h_input.setText(str(h))
-        if str(s) != self.s_input.text():
-            self.s_input.setText(str(s))
-        if str(v) != self.v_input.text():
-            self.v_input.setText(str(v))
-
-        sliders = [self.h_slider, self.s_slider, self.v_slider]
-        self.disable_signals(sliders)
-        self.h_slider.setValue(h)
-        self.s_slider.setValue(s)
-        self.v_slider.setValue(v)
-        self.enable_signals(sliders)
-
-        self.update_rgb_output(_from="hsv")
-        self.update_cmyk_output(_from="hsv")
-
-    def update_rgb_output(self, _from: str):
-        r, g, b = None, None, None
-        if _from == "cmyk":
-            c = self.c_slider.value() / 100.0
-            m = self.m_slider.value() / 100.0
-            y = self.y_slider.value() / 100.0
-            k = self.k_slider.value() / 100.0
-
-            r = 255 * (1 - c) * (1 - k)
-            g = 255 * (1 - m) * (1 - k)
-            b = 255 * (1 - y) * (1 - k)
-        elif _from == "hsv":
-            h = self.h_slider.value()
-            s = self.s_slider.value() / 100.0
-            v = self.v_slider.value() / 100.0
-
-            h = h % 360
-
-            if s == 0:
-                r = g = b = v * 255
-            else:
-                c = v * s
-                x = c * (1 - abs((h / 60) % 2 - 1))
-                m = v - c
-
-                if 0 <= h < 60:
-                    r, g, b = c, x, 0
-                elif 60 <= h < 120:
-                    r, g, b = x, c, 0
-                elif 120 <= h < 180:
-                    r, g, b = 0, c, x
-                elif 180 <= h < 240:
-                    r, g, b = 0, x, c
-                elif 240 <= h < 300:
-                    r, g, b = x, 0, c
-                elif 300 <= h < 360:
-                    r, g, b = c, 0, x
-
-                r = (r + m) * 255
-                g = (g + m) * 255
-                b = (b + m) * 255
-
-        sliders = [self.r_slider, self.g_slider, self.b_slider]
-        self.disable_signals(sliders)
-        self.r_slider.setValue(int(r))
-        self.g_slider.setValue(int(g))
-        self.b_slider.setValue(int(b))
-        self.enable_signals(sliders)
-
-        self.r_input.setText(f"{int(r)}")
-        self.g_input.setText(f"{int(g)}")
-        self.b_input.setText(f"{int(b)}")
-
-        self.color_preview.setStyleSheet(f"background-color: rgb({int(r)}, {int(g)}, {int(b)});")
-
-    def update_cmyk_output(self, _from: str):
-        if _from == "rgb":
-            r = self.r_slider.value() / 255.0
-            g = self.g_slider.value() / 255.0
-            b = self.b_slider.value() / 255.0
-        elif _from == "hsv":
-            h = self.h_slider.value() % 360
-            s = self.s_slider.value() / 100.0
-            v = self.v_slider.value() / 100.0
-
-            if s == 0:
-                r = g = b = v
-            else:
-                i = int(h / 60) % 6
-                f = (h / 60) - i
-                p = v * (1 - s)
-                q = v * (1 - f * s)
-                t = v * (1 - (1 - f) * s)
-
-                if i == 0:
-                    r, g, b = v, t, p
-                elif i == 1:
-                    r, g, b = q, v, p
-                elif i == 2:
-                    r, g, b = p, v, t
-                elif i == 3:
-                    r, g, b = p, q, v
-                elif i == 4:
-                    r, g, b = t, p, v
-                elif i == 5:
-                    r, g, b = v, p, q
-
-        k = 1 - max(r, g, b)
-        if k < 1:
-            c = (1 - r - k) / (1 - k)
-            m = (1 - g - k) / (1 - k)
-            y = (1 - b - k) / (1 - k)
-        else:
-            c = m = y = 0
-
-        self.c_input.setText(f"{c * 100:.0f}")
-        self.m_input.setText(f"{m * 100:.0f}")
-        self.y_input.setText(f"{y * 100:.0f}")
-        self.k_input.setText(f"{k * 100:.0f}")
-
-        sliders = [self.c_slider, self.m_slider, self.y_slider, self.k_slider]
-        self.disable_signals(sliders)
-        self.c_slider.setValue(int(c * 100))
-        self.m_slider.setValue(int(m * 100))
-        self.y_slider.setValue(int(y * 100))
-        self.k_slider.setValue(int(k * 100))
-        self.enable_signals(sliders)
-
-        self.color_preview.setStyleSheet(f"background-color: rgb({int(r * 255)}, {int(g * 255)}, {int(b * 255)});")
-
-    def update_hsv_output(self, _from: str):
-        if _from == "rgb":
-            r = self.r_slider.value() / 255.0
-            g = self.g_slider.value() / 255.0
-            b = self.b_slider.value() / 255.0
-        elif _from == "cmyk":
-            c = self.c_slider.value() / 100.0
-            m = self.m_slider.value() / 100.0
-            y = self.y_slider.value() / 100.0
-            k = self.k_slider.value() / 100.0
-
-            r = (1 - c) * (1 - k)
-            g = (1 - m) * (1 - k)
-            b = (1 - y) * (1 - k)
-
-        mx = max(r, g, b)
-        mn = min(r, g, b)
-        diff = mx - mn
-
-        if diff == 0:
-            h = 0
-        elif mx == r:
-            h = (60 * ((g - b) / diff) + 360) % 360
-        elif mx == g:
-            h = (60 * ((b - r) / diff) + 120) % 360
-        else:
-            h = (60 * ((r - g) / diff) + 240) % 360
-
-        s = 0 if mx == 0 else (diff / mx) * 100
-
-        v = mx * 100
-
-        self.h_input.setText(f"{int(h)}")
-        self.s_input.setText(f"{int(s)}")
-        self.v_input.setText(f"{int(v)}")
-
-        sliders = [self.h_slider, self.s_slider, self.v_slider]
-        self.disable_signals(sliders)
-        self.h_slider.setValue(int(h))
-        self.s_slider.setValue(int(s))
-        self.v_slider.setValue(int(v))
-        self.enable_signals(sliders)
-
-        self.color_preview.setStyleSheet(f"background-color: rgb({int(r * 255)}, {int(g * 255)}, {int(b * 255)});")
+        self.update_from_input("hsv", (360, 100, 100))
 
     def choose_color_from_palette(self):
         color = QColorDialog.getColor()
@@ -461,8 +407,6 @@ class ColorConverterApp(QWidget):
             self.g_slider.setValue(g)
             self.b_slider.setValue(b)
 
-            self.update_rgb_from_slider()
-
     @staticmethod
     def disable_signals(signals: list):
         for signal in signals:
@@ -479,6 +423,7 @@ class ColorConverterApp(QWidget):
 
 
 if __name__ == '__main__':
+    profiling.enable_from_environment()
     app = QApplication(sys.argv)
     converter = ColorConverterApp()
     converter.show()
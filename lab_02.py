@@ -1,21 +1,44 @@
+import threading
+
 import cv2
-import numpy as np
 import tkinter as tk
 from tkinter import filedialog, messagebox
 from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
+from kg_core import profiling
+from kg_core.cache import ResultCache
+from kg_core.executor import FilterExecutor
+from kg_core.stream import FramePipeline, LatestFrameSink, VideoSource
+
+POLL_MS = 15
+STREAM_POLL_MS = 100
+DISPLAY_SIDE = 1024
+
 
 class ImageSegmentationApp:
     def __init__(self, root):
         self.root = root
         self.root.title("Image Segmentation and Thresholding")
         self.image = None
+        self.file_path = None
+        self.name = None
+        self.result = None
+        self.cache = ResultCache()
+        self.executor = FilterExecutor(cache=self.cache)
+        self.title = None
+        self.polling = False
+        self.stream = None
+        self.stream_sink = None
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
 
         # Кнопки для загрузки изображения и запуска анализа
         self.load_button = tk.Button(root, text="Load Image", command=self.load_image)
         self.load_button.pack(pady=5)
 
+        self.reload_button = tk.Button(root, text="Reload Image", command=self.reload_image, state=tk.DISABLED)
+        self.reload_button.pack(pady=5)
+
         self.bernsen_button = tk.Button(root, text="Bernsen Threshold", command=self.apply_bernsen, state=tk.DISABLED)
         self.bernsen_button.pack(pady=5)
 
@@ -32,6 +55,12 @@ class ImageSegmentationApp:
                                          state=tk.DISABLED)
         self.gradient_button.pack(pady=5)
 
+        self.stream_button = tk.Button(root, text="Stream Video (Niblack)", command=self.toggle_stream)
+        self.stream_button.pack(pady=5)
+
+        self.status_label = tk.Label(root, text="")
+        self.status_label.pack(pady=5)
+
         # Поле для отображения графика
         self.figure = Figure(figsize=(6, 6))
         self.canvas = FigureCanvasTkAgg(self.figure, master=root)
@@ -40,103 +69,153 @@ class ImageSegmentationApp:
     def load_image(self):
         file_path = filedialog.askopenfilename(filetypes=[("Image Files", "*.png;*.jpg;*.jpeg;*.bmp")])
         if file_path:
-            self.image = cv2.imread(file_path, cv2.IMREAD_GRAYSCALE)
+            with profiling.stage("cv2.imread"):
+                self.image = cv2.imread(file_path, cv2.IMREAD_GRAYSCALE)
             if self.image is None:
                 messagebox.showerror("Error", "Unable to load image.")
                 return
+            # Изображение читают фоновые задачи, поэтому после загрузки оно только для чтения
+            self.image.setflags(write=False)
+            self.file_path = file_path
+            self.result = None
+            self.executor.cancel()
             self.show_image(self.image, "Loaded Image")
             # Активируем кнопки для анализа
+            self.reload_button.config(state=tk.NORMAL)
             self.bernsen_button.config(state=tk.NORMAL)
             self.niblack_button.config(state=tk.NORMAL)
             self.points_button.config(state=tk.NORMAL)
             self.lines_button.config(state=tk.NORMAL)
             self.gradient_button.config(state=tk.NORMAL)
 
+    def reload_image(self):
+        # Файл поправили во внешнем редакторе: пересчитываются только изменившиеся блоки
+        image = cv2.imread(self.file_path, cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            messagebox.showerror("Error", "Unable to load image.")
+            return
+        image.setflags(write=False)
+        if image.shape != self.image.shape:
+            self.image, self.result = image, None
+            self.executor.cancel()
+            self.show_image(image, "Loaded Image")
+            return
+
+        previous_image, self.image = self.image, image
+        if self.result is None:
+            # Незаконченный фильтр считал старое изображение
+            self.executor.cancel()
+            self.show_image(image, "Loaded Image")
+            return
+        # Сравнение и пересчёт изменившихся блоков идут в воркере, как и полный пересчёт
+        self.executor.submit_changes(self.name, previous_image, image, self.result)
+        self.result = None
+        self.status_label.config(text=f"{self.title}: updating changed regions...")
+        if not self.polling:
+            self.polling = True
+            self.root.after(POLL_MS, self.poll_results)
+
+    @profiling.instrument("lab_02.show_image")
     def show_image(self, img, title):
+        # Рисовать больше пикселей, чем есть на холсте, бессмысленно, а canvas.draw идёт в главном потоке
+        step = max(1, -(-max(img.shape[:2]) // DISPLAY_SIDE))
         self.figure.clear()
         ax = self.figure.add_subplot(111)
-        ax.imshow(img, cmap='gray')
+        ax.imshow(img[::step, ::step], cmap='gray')
         ax.set_title(title)
         ax.axis("off")
-        self.canvas.draw()
+        with profiling.stage("canvas.draw"):
+            self.canvas.draw()
 
-    def apply_bernsen(self):
+    def run_filter(self, name, title):
         if self.image is None:
             return
-        result = self.bernsen_threshold(self.image)
-        self.show_image(result, "Bernsen Threshold")
+        # Новый запрос отменяет ещё не законченный предыдущий
+        self.executor.submit(name, self.image)
+        self.name = name
+        self.title = title
+        self.result = None
+        self.status_label.config(text=f"{title}: computing...")
+        if not self.polling:
+            self.polling = True
+            self.root.after(POLL_MS, self.poll_results)
+
+    def poll_results(self):
+        for stage, result in self.executor.poll():
+            if stage == "error":
+                messagebox.showerror("Error", str(result))
+                self.status_label.config(text="")
+            elif stage == "preview":
+                self.show_image(result, f"{self.title} (preview)")
+                self.status_label.config(text=f"{self.title}: refining...")
+            else:
+                self.result = result
+                self.show_image(result, self.title)
+                self.status_label.config(text="")
+        if self.executor.busy:
+            self.root.after(POLL_MS, self.poll_results)
+        else:
+            self.polling = False
+
+    def apply_bernsen(self):
+        self.run_filter("bernsen", "Bernsen Threshold")
 
     def apply_niblack(self):
-        if self.image is None:
-            return
-        result = self.niblack_threshold(self.image)
-        self.show_image(result, "Niblack Threshold")
+        self.run_filter("niblack", "Niblack Threshold")
 
     def detect_points(self):
-        if self.image is None:
-            return
-        result = self.point_detection(self.image)
-        self.show_image(result, "Point Detection")
+        self.run_filter("points", "Point Detection")
 
     def detect_lines_45(self):
-        if self.image is None:
-            return
-        result = self.line_detection_45(self.image)
-        self.show_image(result, "45° Line Detection")
+        self.run_filter("lines45", "45° Line Detection")
 
     def detect_gradient(self):
-        if self.image is None:
+        self.run_filter("gradient", "Gradient Detection")
+
+    def toggle_stream(self):
+        if self.stream is not None:
+            self.stream.stop.set()
+            return
+        file_path = filedialog.askopenfilename(filetypes=[("Video Files", "*.mp4;*.avi;*.mov;*.mkv")])
+        if not file_path:
+            return
+        try:
+            source = VideoSource(file_path)
+        except ValueError as error:
+            messagebox.showerror("Error", str(error))
+            return
+        # Видео идёт в своём темпе: фильтр не успевает - кадр пропускается, на экран попадает последний готовый
+        self.stream_sink = LatestFrameSink("niblack", source.shape)
+        self.stream = FramePipeline(source, ["niblack"], self.stream_sink, realtime=True)
+        threading.Thread(target=self.stream.run, daemon=True).start()
+        self.stream_button.config(text="Stop Stream")
+        self.root.after(STREAM_POLL_MS, self.poll_stream)
+
+    def poll_stream(self):
+        if self.stream is None:
             return
-        result = self.gradient_detection(self.image)
-        self.show_image(result, "Gradient Detection")
-
-    def bernsen_threshold(self, image, window_size=15, contrast_threshold=15):
-        half_size = window_size // 2
-        output = np.zeros(image.shape, dtype=np.uint8)
-
-        for i in range(half_size, image.shape[0] - half_size):
-            for j in range(half_size, image.shape[1] - half_size):
-                local_region = image[i - half_size:i + half_size + 1, j - half_size:j + half_size + 1]
-                max_val = int(np.max(local_region))
-                min_val = int(np.min(local_region))
-                contrast = max_val - min_val
-                mid_gray = (max_val + min_val) // 2
-
-                if contrast < contrast_threshold:
-                    output[i, j] = 255 if mid_gray > 127 else 0
-                else:
-                    output[i, j] = 255 if image[i, j] > mid_gray else 0
-        return output
-
-    def niblack_threshold(self, image, window_size=15, k=-0.2):
-        mean = cv2.blur(image, (window_size, window_size))
-        sqmean = cv2.blur(image ** 2, (window_size, window_size))
-        stddev = np.sqrt(sqmean - mean ** 2)
-
-        threshold = mean + k * stddev
-        output = np.where(image > threshold, 255, 0).astype(np.uint8)
-        return output
-
-    def point_detection(self, image):
-        kernel = np.array([[-1, -1, -1],
-                           [-1, 8, -1],
-                           [-1, -1, -1]])
-        return cv2.filter2D(image, -1, kernel)
-
-    def line_detection_45(self, image):
-        kernel = np.array([[2, -1, -1],
-                           [-1, 2, -1],
-                           [-1, -1, 2]])
-        return cv2.filter2D(image, -1, kernel)
-
-    def gradient_detection(self, image, method="sobel"):
-        grad_x = cv2.Sobel(image, cv2.CV_64F, 1, 0, ksize=3)
-        grad_y = cv2.Sobel(image, cv2.CV_64F, 0, 1, ksize=3)
-        gradient_magnitude = cv2.magnitude(grad_x, grad_y)
-        return np.uint8(gradient_magnitude)
+        with self.stream_sink.lock:
+            index = self.stream_sink.index
+            frame = self.stream_sink.frame.copy() if index >= 0 else None
+        if frame is not None:
+            self.show_image(frame, f"Niblack Stream (frame {index})")
+        stats = self.stream.stats
+        self.status_label.config(text=f"{stats.fps:.1f} fps, {stats.dropped} dropped")
+        if stats.finished is None:
+            self.root.after(STREAM_POLL_MS, self.poll_stream)
+        else:
+            self.stream = None
+            self.stream_button.config(text="Stream Video (Niblack)")
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.stop.set()
+        self.executor.shutdown()
+        self.root.destroy()
 
 
 if __name__ == "__main__":
+    profiling.enable_from_environment()
     root = tk.Tk()
     app = ImageSegmentationApp(root)
     root.mainloop()
@@ -1,8 +1,10 @@
 import tkinter as tk
 from tkinter import messagebox
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.patches as patches
+
+from kg_core import profiling, raster
+from kg_core.render import PointRaster, to_ppm
+
+ZOOM_STEP = 1.25
 
 
 class RasterizationApp:
@@ -42,13 +44,33 @@ class RasterizationApp:
         self.circle_button = tk.Button(root, text="Bresenham Circle", command=self.bresenham_circle)
         self.circle_button.pack(pady=5)
 
+        self.wu_line_button = tk.Button(root, text="Wu Line", command=self.draw_wu_line)
+        self.wu_line_button.pack(pady=5)
+
+        self.wu_circle_button = tk.Button(root, text="Wu Circle", command=self.wu_circle)
+        self.wu_circle_button.pack(pady=5)
+
         self.quit_button = tk.Button(root, text="Quit", command=root.quit)
         self.quit_button.pack(pady=20)
 
-        # Widget for the plot
-        self.figure = Figure(figsize=(6, 6))
-        self.canvas = FigureCanvasTkAgg(self.figure, master=root)
-        self.canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=1)
+        # Widget for the plot: points are painted into a buffer once, zoom and pan only resample it
+        self.title_label = tk.Label(root, text="")
+        self.title_label.pack()
+        self.canvas = tk.Canvas(root, background="white", highlightthickness=0)
+        self.canvas.pack(side=tk.TOP, fill=tk.BOTH, expand=1)
+        self.photo = None
+        self.raster = None
+        self.zoom = 1.0
+        self.center = (0.0, 0.0)
+        self.drag_start = None
+
+        self.canvas.bind("<Configure>", lambda event: self.redraw())
+        self.canvas.bind("<MouseWheel>", lambda event: self.zoom_at(event, event.delta > 0))
+        self.canvas.bind("<Button-4>", lambda event: self.zoom_at(event, True))
+        self.canvas.bind("<Button-5>", lambda event: self.zoom_at(event, False))
+        self.canvas.bind("<ButtonPress-1>", self.start_pan)
+        self.canvas.bind("<B1-Motion>", self.pan)
+        self.canvas.bind("<Double-Button-1>", lambda event: self.fit_view())
 
     def draw_line(self):
         try:
@@ -57,7 +79,7 @@ class RasterizationApp:
             x2 = int(self.end_x_entry.get())
             y2 = int(self.end_y_entry.get())
 
-            points = self.bresenham(x1, y1, x2, y2)
+            points = raster.bresenham(x1, y1, x2, y2)
             self.plot_points(points, "Bresenham Line", x1, y1, x2, y2)
         except ValueError:
             messagebox.showerror("Input Error", "Please enter valid integer coordinates.")
@@ -68,91 +90,88 @@ class RasterizationApp:
             y_center = int(self.start_y_entry.get())
             radius = int(self.end_x_entry.get())  # Use End X as radius
 
-            points = self.bresenham_circle_algorithm(x_center, y_center, radius)
+            points = raster.bresenham_circle(x_center, y_center, radius)
             self.plot_points(points, "Bresenham Circle", x_center - radius, y_center - radius,
                              x_center + radius, y_center + radius)
         except ValueError:
             messagebox.showerror("Input Error", "Please enter valid integer coordinates.")
 
-    def bresenham(self, x1, y1, x2, y2):
-        points = []
-        dx = x2 - x1
-        dy = y2 - y1
-        sx = 1 if dx > 0 else -1
-        sy = 1 if dy > 0 else -1
-        dx = abs(dx)
-        dy = abs(dy)
-
-        if dx > dy:
-            err = dx / 2.0
-            while x1 != x2:
-                points.append((x1, y1))
-                err -= dy
-                if err < 0:
-                    y1 += sy
-                    err += dx
-                x1 += sx
-        else:
-            err = dy / 2.0
-            while y1 != y2:
-                points.append((x1, y1))
-                err -= dx
-                if err < 0:
-                    x1 += sx
-                    err += dy
-                y1 += sy
-        points.append((x2, y2))
-        return points
-
-    def bresenham_circle_algorithm(self, x_center, y_center, radius):
-        points = []
-        x = radius
-        y = 0
-        decision_parameter = 1 - radius
-
-        while x >= y:
-            points.extend([
-                (x_center + x, y_center + y),
-                (x_center - x, y_center + y),
-                (x_center + x, y_center - y),
-                (x_center - x, y_center - y),
-                (x_center + y, y_center + x),
-                (x_center - y, y_center + x),
-                (x_center + y, y_center - x),
-                (x_center - y, y_center - x)
-            ])
-            y += 1
-            if decision_parameter <= 0:
-                decision_parameter += 2 * y + 1
-            else:
-                x -= 1
-                decision_parameter += 2 * (y - x) + 1
-
-        return points
-
-    def plot_points(self, points, title, x_min, y_min, x_max, y_max):
-        self.figure.clear()  # Clear the previous plot
-        ax = self.figure.add_subplot(111)
-
-        # Draw squares instead of points
-        square_size = 1  # Size of the square
-        for (x, y) in points:
-            square = patches.Rectangle((x - square_size / 2, y - square_size / 2),
-                                       square_size, square_size,
-                                       color='red')
-            ax.add_patch(square)
-
-        ax.set_xlim(x_min - 10, x_max + 10)  # Add some padding
-        ax.set_ylim(y_min - 10, y_max + 10)  # Add some padding
-        ax.axhline(0, color='black', linewidth=0.5, ls='--')
-        ax.axvline(0, color='black', linewidth=0.5, ls='--')
-        ax.grid()
-        ax.set_title(title)
-        ax.set_aspect('equal', adjustable='box')
-        self.canvas.draw()  # Update the plot on the widget
+    def draw_wu_line(self):
+        try:
+            x1 = int(self.start_x_entry.get())
+            y1 = int(self.start_y_entry.get())
+            x2 = int(self.end_x_entry.get())
+            y2 = int(self.end_y_entry.get())
+
+            points, coverage, _ = raster.wu_line_batch([(x1, y1, x2, y2)])
+            self.plot_points(points, "Wu Line", x1, y1, x2, y2, coverage)
+        except ValueError:
+            messagebox.showerror("Input Error", "Please enter valid integer coordinates.")
+
+    def wu_circle(self):
+        try:
+            x_center = int(self.start_x_entry.get())
+            y_center = int(self.start_y_entry.get())
+            radius = int(self.end_x_entry.get())  # Use End X as radius
+
+            points, coverage, _ = raster.wu_circle_batch([(x_center, y_center, radius)])
+            self.plot_points(points, "Wu Circle", x_center - radius, y_center - radius,
+                             x_center + radius, y_center + radius, coverage)
+        except ValueError:
+            messagebox.showerror("Input Error", "Please enter valid integer coordinates.")
+
+    @profiling.instrument("lab_03.plot_points")
+    def plot_points(self, points, title, x_min, y_min, x_max, y_max, coverage=None):
+        self.title_label.config(text=title)
+        self.raster = PointRaster(points, x_min, y_min, x_max, y_max, coverage=coverage)
+        self.fit_view()
+
+    def fit_view(self):
+        if self.raster is None:
+            return
+        self.zoom = self.raster.fit_zoom(max(self.canvas.winfo_width(), 1), max(self.canvas.winfo_height(), 1))
+        self.center = self.raster.center
+        self.redraw()
+
+    @profiling.instrument("lab_03.redraw")
+    def redraw(self):
+        if self.raster is None:
+            return
+        width = max(self.canvas.winfo_width(), 1)
+        height = max(self.canvas.winfo_height(), 1)
+        rgb = self.raster.render(width, height, self.zoom, *self.center)
+        self.photo = tk.PhotoImage(data=to_ppm(rgb), format="ppm")
+        self.canvas.delete("all")
+        self.canvas.create_image(0, 0, image=self.photo, anchor=tk.NW)
+
+    def screen_to_world(self, x, y):
+        width = max(self.canvas.winfo_width(), 1)
+        height = max(self.canvas.winfo_height(), 1)
+        return self.center[0] + (x - width / 2) / self.zoom, self.center[1] - (y - height / 2) / self.zoom
+
+    def zoom_at(self, event, zoom_in):
+        if self.raster is None:
+            return
+        # Точка под курсором остаётся на месте
+        world_x, world_y = self.screen_to_world(event.x, event.y)
+        factor = ZOOM_STEP if zoom_in else 1 / ZOOM_STEP
+        self.zoom *= factor
+        self.center = (world_x - (world_x - self.center[0]) / factor, world_y - (world_y - self.center[1]) / factor)
+        self.redraw()
+
+    def start_pan(self, event):
+        self.drag_start = (event.x, event.y, self.center)
+
+    def pan(self, event):
+        if self.raster is None or self.drag_start is None:
+            return
+        x, y, (center_x, center_y) = self.drag_start
+        self.center = (center_x - (event.x - x) / self.zoom, center_y + (event.y - y) / self.zoom)
+        self.redraw()
 
 
 if __name__ == "__main__":
+    profiling.enable_from_environment()
     root = tk.Tk()
     app = RasterizationApp(root)
     root.mainloop()